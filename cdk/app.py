@@ -14,6 +14,16 @@ cdk_env = cdk.Environment(
 app = cdk.App()
 datbase_stack = DatabaseStack(app, "rtoapp-database", env=cdk_env)
 backend_stack = BackendStack(app, "rtoapp-backend", env=cdk_env)
+
+# Run a copy of the backend next to every replica of the global tables
+global_tables = (app.node.try_get_context("app_config") or {}).get("global_tables")
+for region in (global_tables or {}).get("replica_regions", []):
+    BackendStack(
+        app,
+        f"rtoapp-backend-{region}",
+        primary=False,
+        env=cdk.Environment(account=cdk_env.account, region=region),
+    )
 frontend_stack = FrontendStack(app, "rtoapp-frontend", env=cdk_env)
 
 app.synth()
@@ -1,8 +1,17 @@
-from aws_cdk import BundlingOptions, Duration, Stack
+import json
+
+from aws_cdk import BundlingOptions, Duration, RemovalPolicy, Stack
 from aws_cdk import aws_apigateway as apigw
 from aws_cdk import aws_certificatemanager as acm
 from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
+from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_lambda_event_sources as lambda_event_sources
+from aws_cdk import aws_route53 as route53
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_sqs as sqs
 from aws_cdk import aws_ssm as ssm
 from constructs import Construct
 
@@ -10,30 +19,81 @@ __BUNDLING_CMD__ = "pip install pipenv && pip install -r <(pipenv requirements)
 
 
 class BackendStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(
+        self, scope: Construct, construct_id: str, primary: bool = True, **kwargs
+    ) -> None:
         super().__init__(scope, construct_id, **kwargs)
         config = self.node.try_get_context("app_config")
         frontend_domain = config["frontend_domain"]
         backend_domain = config["backend_domain"]
         backend_acm = config["backend_acm"]
+        arm64 = config.get("arm64", False)
+        snapstart = config.get("snapstart", False)
+        provisioned_concurrency = config.get("provisioned_concurrency", 0)
+        archive_after_months = config.get("archive_after_months", 12)
+        archive_export = config.get("archive_export", False)
+        global_tables = config.get("global_tables")
+        checkin_queue = config.get("checkin_queue")
+        dev = config.get("dev", False)
+        log_sample_rates = config.get("log_sample_rates")
 
-        rto_table = dynamodb.Table.from_table_name(
-            self,
-            id="rto_table",
-            table_name=ssm.StringParameter.value_from_lookup(
+        write_table = None
+        if primary:
+            rto_table = dynamodb.Table.from_table_attributes(
                 self,
-                "/sktanapps/rtoapp/dynamodb/rto_tracker_table",
-            ),
-        )
+                id="rto_table",
+                table_name=ssm.StringParameter.value_from_lookup(
+                    self,
+                    "/sktanapps/rtoapp/dynamodb/rto_tracker_table",
+                ),
+                table_stream_arn=ssm.StringParameter.value_from_lookup(
+                    self,
+                    "/sktanapps/rtoapp/dynamodb/rto_tracker_table_stream",
+                ),
+            )
 
-        rto_idempotency_table = dynamodb.Table.from_table_name(
-            self,
-            id="rto_idempotency_table",
-            table_name=ssm.StringParameter.value_from_lookup(
+            rto_idempotency_table = dynamodb.Table.from_table_name(
                 self,
-                "/sktanapps/rtoapp/dynamodb/rto_idempotency_table",
-            ),
-        )
+                id="rto_idempotency_table",
+                table_name=ssm.StringParameter.value_from_lookup(
+                    self,
+                    "/sktanapps/rtoapp/dynamodb/rto_idempotency_table",
+                ),
+            )
+        else:
+            # The parameters only exist in the primary region, but global tables
+            # share their name with every replica
+            table_name = global_tables["table_name"]
+            rto_table = dynamodb.Table.from_table_name(
+                self, id="rto_table", table_name=table_name
+            )
+            rto_idempotency_table = dynamodb.Table.from_table_name(
+                self,
+                id="rto_idempotency_table",
+                table_name=f"{table_name}-idempotency",
+            )
+
+        write_region = None
+        if global_tables:
+            write_region = global_tables.get(
+                "write_region", global_tables["primary_region"]
+            )
+            backend_acm = global_tables.get("backend_acm", {}).get(
+                self.region, backend_acm
+            )
+            if write_region != self.region:
+                # Check-ins are written to a single region to avoid concurrent
+                # writes to the same month row being resolved by last writer wins
+                write_table = dynamodb.Table.from_table_arn(
+                    self,
+                    id="rto_write_table",
+                    table_arn=self.format_arn(
+                        service="dynamodb",
+                        region=write_region,
+                        resource="table",
+                        resource_name=global_tables["table_name"],
+                    ),
+                )
 
         bundling_options = BundlingOptions(
             image=lambda_.Runtime.PYTHON_3_11.bundling_image,
@@ -44,40 +104,235 @@ class BackendStack(Stack):
             ],
             user="root",
         )
+        backend_code = lambda_.Code.from_asset(
+            "../src",
+            bundling=bundling_options,
+        )
+        architecture = (
+            lambda_.Architecture.ARM_64 if arm64 else lambda_.Architecture.X86_64
+        )
+        # Layers can only be used by functions in the same region, and Powertools
+        # publishes the same layer version to every region
+        powertools_layer = lambda_.LayerVersion.from_layer_version_arn(
+            self,
+            id="lambda_powertools_layer",
+            layer_version_arn=(
+                f"arn:aws:lambda:{self.region}:017000801446:layer:"
+                + (
+                    "AWSLambdaPowertoolsPythonV2-Arm64:73"
+                    if arm64
+                    else "AWSLambdaPowertoolsPythonV2:73"
+                )
+            ),
+        )
         rto_backend_lambda = lambda_.Function(
             self,
             id="rto_backend_lambda",
             runtime=lambda_.Runtime.PYTHON_3_12,
             timeout=Duration.seconds(30),
-            code=lambda_.Code.from_asset(
-                "../src",
-                bundling=bundling_options,
-            ),
+            code=backend_code,
             handler="apigw.handler",
-            layers=[
-                lambda_.LayerVersion.from_layer_version_arn(
-                    self,
-                    id="lambda_powertools_layer",
-                    layer_version_arn="arn:aws:lambda:ap-southeast-2:017000801446:layer:AWSLambdaPowertoolsPythonV2:73",
-                )
-            ],
+            architecture=architecture,
+            layers=[powertools_layer],
             environment={
-                "IS_DEV": "true",
+                "LOG_PROFILE": "development" if dev else "production",
                 "RTO_TABLE_NAME": rto_table.table_name,
                 "RTO_IDEMPOTENCY_TABLE_NAME": rto_idempotency_table.table_name,
                 "CORS_ORIGIN": f"https://{frontend_domain}",
                 "OFFICE_IPS": ",".join(config["office_ips"]),
             },
         )
+        if write_region:
+            rto_backend_lambda.add_environment("RTO_WRITE_REGION", write_region)
+        if log_sample_rates:
+            rto_backend_lambda.add_environment(
+                "LOG_SAMPLE_RATES", json.dumps(log_sample_rates)
+            )
         rto_table.grant_read_write_data(rto_backend_lambda)
+        if write_table:
+            write_table.grant_read_write_data(rto_backend_lambda)
         rto_idempotency_table.grant_read_write_data(rto_backend_lambda)
 
+        # Check-ins are validated by the API and written in batches by the consumer
+        if checkin_queue:
+            rto_checkin_dlq = sqs.Queue(
+                self,
+                "rto_checkin_dlq",
+                retention_period=Duration.days(14),
+                enforce_ssl=True,
+            )
+            rto_ingest_lambda = lambda_.Function(
+                self,
+                id="rto_ingest_lambda",
+                runtime=lambda_.Runtime.PYTHON_3_12,
+                timeout=Duration.seconds(60),
+                code=backend_code,
+                handler="ingest.handler",
+                architecture=architecture,
+                layers=[powertools_layer],
+                environment={
+                    "RTO_TABLE_NAME": rto_table.table_name,
+                },
+            )
+            if write_region:
+                rto_ingest_lambda.add_environment("RTO_WRITE_REGION", write_region)
+            rto_table.grant_read_write_data(rto_ingest_lambda)
+            if write_table:
+                write_table.grant_read_write_data(rto_ingest_lambda)
+
+            rto_checkin_queue = sqs.Queue(
+                self,
+                "rto_checkin_queue",
+                # Lambda recommends six times the timeout of the consumer
+                visibility_timeout=Duration.seconds(360),
+                enforce_ssl=True,
+                dead_letter_queue=sqs.DeadLetterQueue(
+                    queue=rto_checkin_dlq,
+                    max_receive_count=checkin_queue.get("max_receive_count", 5),
+                ),
+            )
+            rto_ingest_lambda.add_event_source(
+                lambda_event_sources.SqsEventSource(
+                    rto_checkin_queue,
+                    batch_size=checkin_queue.get("batch_size", 100),
+                    max_batching_window=Duration.seconds(
+                        checkin_queue.get("max_batching_window_seconds", 1)
+                    ),
+                    report_batch_item_failures=True,
+                )
+            )
+            rto_checkin_queue.grant_send_messages(rto_backend_lambda)
+            rto_backend_lambda.add_environment(
+                "CHECKIN_QUEUE_URL", rto_checkin_queue.queue_url
+            )
+
+        # SnapStart and provisioned concurrency both run against a published version,
+        # so API Gateway is pointed at an alias whenever either is enabled
+        backend_target: lambda_.IFunction = rto_backend_lambda
+        if snapstart:
+            # The L2 construct does not allow SnapStart for Python runtimes yet
+            rto_backend_lambda.node.default_child.add_property_override(
+                "SnapStart", {"ApplyOn": "PublishedVersions"}
+            )
+        if snapstart or provisioned_concurrency:
+            backend_target = lambda_.Alias(
+                self,
+                id="rto_backend_lambda_live",
+                alias_name="live",
+                version=rto_backend_lambda.current_version,
+                provisioned_concurrent_executions=provisioned_concurrency or None,
+            )
+
+        # Folds the appended check-in events into the month snapshots, the stream is
+        # only consumed in the primary region so each event is folded exactly once
+        if primary:
+            rto_compactor_lambda = lambda_.Function(
+                self,
+                id="rto_compactor_lambda",
+                runtime=lambda_.Runtime.PYTHON_3_12,
+                timeout=Duration.seconds(60),
+                code=backend_code,
+                handler="compactor.handler",
+                architecture=architecture,
+                layers=[powertools_layer],
+                environment={
+                    "RTO_TABLE_NAME": rto_table.table_name,
+                },
+            )
+            rto_table.grant_read_write_data(rto_compactor_lambda)
+            rto_compactor_lambda.add_event_source(
+                lambda_event_sources.DynamoEventSource(
+                    rto_table,
+                    starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+                    batch_size=100,
+                    max_batching_window=Duration.seconds(30),
+                    bisect_batch_on_error=True,
+                    retry_attempts=3,
+                    filters=[
+                        lambda_.FilterCriteria.filter(
+                            {
+                                "eventName": lambda_.FilterRule.is_equal("INSERT"),
+                                "dynamodb": {
+                                    "Keys": {
+                                        "month": {
+                                            "S": lambda_.FilterRule.begins_with("evt#")
+                                        }
+                                    }
+                                },
+                            }
+                        )
+                    ],
+                )
+            )
+
+        # Moves old month rows into yearly summaries once a month
+        if primary:
+            rto_archive_lambda = lambda_.Function(
+                self,
+                id="rto_archive_lambda",
+                runtime=lambda_.Runtime.PYTHON_3_12,
+                timeout=Duration.minutes(15),
+                code=backend_code,
+                handler="archive.handler",
+                architecture=architecture,
+                layers=[powertools_layer],
+                environment={
+                    "RTO_TABLE_NAME": rto_table.table_name,
+                    "ARCHIVE_AFTER_MONTHS": str(archive_after_months),
+                },
+            )
+            rto_table.grant_read_write_data(rto_archive_lambda)
+            # Large tables are archived by a chain of invocations that hand off to
+            # each other. A separate policy keeps the function from depending on it.
+            iam.Policy(
+                self,
+                "rto_archive_handoff_policy",
+                roles=[rto_archive_lambda.role],
+                statements=[
+                    iam.PolicyStatement(
+                        actions=["lambda:InvokeFunction"],
+                        resources=[rto_archive_lambda.function_arn],
+                    )
+                ],
+            )
+            if archive_export:
+                archive_bucket = s3.Bucket(
+                    self,
+                    "rto_archive_bucket",
+                    encryption=s3.BucketEncryption.S3_MANAGED,
+                    block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                    enforce_ssl=True,
+                    removal_policy=RemovalPolicy.RETAIN,
+                    lifecycle_rules=[
+                        s3.LifecycleRule(
+                            transitions=[
+                                s3.Transition(
+                                    storage_class=s3.StorageClass.GLACIER_INSTANT_RETRIEVAL,
+                                    transition_after=Duration.days(30),
+                                )
+                            ]
+                        )
+                    ],
+                )
+                archive_bucket.grant_put(rto_archive_lambda)
+                rto_archive_lambda.add_environment(
+                    "RTO_ARCHIVE_BUCKET", archive_bucket.bucket_name
+                )
+
+            events.Rule(
+                self,
+                "rto_archive_schedule",
+                schedule=events.Schedule.cron(minute="0", hour="3", day="2"),
+                targets=[events_targets.LambdaFunction(rto_archive_lambda)],
+            )
+
         cors = apigw.CorsOptions(
             allow_origins=[f"https://{frontend_domain}", "http://localhost:3000"],
             allow_methods=["GET", "PUT", "POST", "DELETE"],
         )
 
         domain = backend_domain
+        hosted_zone_id = global_tables.get("hosted_zone_id") if global_tables else None
         cert = acm.Certificate.from_certificate_arn(
             self,
             id="backend_cert",
@@ -93,7 +348,14 @@ class BackendStack(Stack):
                 security_policy=apigw.SecurityPolicy.TLS_1_2,
             ),
             default_cors_preflight_options=cors,
-            endpoint_types=[apigw.EndpointType.EDGE],
+            # Latency based routing needs a regional endpoint in each region
+            endpoint_types=[
+                (
+                    apigw.EndpointType.REGIONAL
+                    if hosted_zone_id
+                    else apigw.EndpointType.EDGE
+                )
+            ],
         )
         api.add_gateway_response(
             id="backend_api_clienterrors",
@@ -108,6 +370,22 @@ class BackendStack(Stack):
 
         root_ep = api.root
         root_wildcard_ep = root_ep.add_resource("{proxy+}")
-        root_wildcard_ep.add_method("GET", apigw.LambdaIntegration(rto_backend_lambda))
-        root_wildcard_ep.add_method("POST", apigw.LambdaIntegration(rto_backend_lambda))
-        root_wildcard_ep.add_method("PUT", apigw.LambdaIntegration(rto_backend_lambda))
+        root_wildcard_ep.add_method("GET", apigw.LambdaIntegration(backend_target))
+        root_wildcard_ep.add_method("POST", apigw.LambdaIntegration(backend_target))
+        root_wildcard_ep.add_method("PUT", apigw.LambdaIntegration(backend_target))
+
+        if hosted_zone_id:
+            # Route users to the closest region that is running the backend
+            route53.CfnRecordSet(
+                self,
+                id="rtoapp_backend_latency_record",
+                hosted_zone_id=hosted_zone_id,
+                name=domain,
+                type="A",
+                set_identifier=self.region,
+                region=self.region,
+                alias_target=route53.CfnRecordSet.AliasTargetProperty(
+                    dns_name=api.domain_name.domain_name_alias_domain_name,
+                    hosted_zone_id=api.domain_name.domain_name_alias_hosted_zone_id,
+                ),
+            )
@@ -8,46 +8,103 @@ class DatabaseStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
-        # Create a DynamoDB table to track the RTO Statistics
-        rto_table = dynamodb.Table(
-            self,
-            "rto_tracker_table",
-            partition_key=dynamodb.Attribute(
-                name="id", type=dynamodb.AttributeType.STRING
-            ),
-            sort_key=dynamodb.Attribute(
-                name="month", type=dynamodb.AttributeType.STRING
-            ),
-            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
-            # Use AWS managed KMS key for encryption at rest
-            encryption=dynamodb.TableEncryption.AWS_MANAGED,
-            point_in_time_recovery=True,
-            deletion_protection=True,
+        config = self.node.try_get_context("app_config") or {}
+        global_tables = config.get("global_tables")
+
+        partition_key = dynamodb.Attribute(
+            name="id", type=dynamodb.AttributeType.STRING
         )
+        sort_key = dynamodb.Attribute(name="month", type=dynamodb.AttributeType.STRING)
+
+        if global_tables:
+            # Replicate the tables to every region that runs a copy of the backend
+            replicas = [
+                dynamodb.ReplicaTableProps(region=region)
+                for region in global_tables["replica_regions"]
+            ]
+
+        if global_tables and global_tables.get("detach_table"):
+            # Leaves the existing table out of the stack, without deleting it, so that
+            # it can be imported as a global table, see the README
+            rto_table = None
+        elif global_tables:
+            # Shares the construct ID of the regional table, so that deploying over an
+            # existing table fails rather than creating an empty table next to it
+            rto_table = dynamodb.TableV2(
+                self,
+                "rto_tracker_table",
+                table_name=global_tables["table_name"],
+                partition_key=partition_key,
+                sort_key=sort_key,
+                billing=dynamodb.Billing.on_demand(),
+                encryption=dynamodb.TableEncryptionV2.aws_managed_key(),
+                point_in_time_recovery=True,
+                deletion_protection=True,
+                time_to_live_attribute="expires_at",
+                # Global tables require both images to be streamed
+                dynamo_stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+                replicas=replicas,
+            )
+        else:
+            # Create a DynamoDB table to track the RTO Statistics
+            rto_table = dynamodb.Table(
+                self,
+                "rto_tracker_table",
+                partition_key=partition_key,
+                sort_key=sort_key,
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                # Use AWS managed KMS key for encryption at rest
+                encryption=dynamodb.TableEncryption.AWS_MANAGED,
+                point_in_time_recovery=True,
+                deletion_protection=True,
+                # Check-in events are removed once they are no longer needed for auditing
+                time_to_live_attribute="expires_at",
+                # Streams newly appended check-in events to the compactor
+                stream=dynamodb.StreamViewType.NEW_IMAGE,
+            )
 
         # Store RTO App Parameter for later reference
         # This reduces the cross-stack dependency between the Backend and DB stack
-        ssm.StringParameter(
-            self,
-            "rto_table_name",
-            parameter_name="/sktanapps/rtoapp/dynamodb/rto_tracker_table",
-            string_value=rto_table.table_name,
-        )
+        if rto_table is not None:
+            ssm.StringParameter(
+                self,
+                "rto_table_name",
+                parameter_name="/sktanapps/rtoapp/dynamodb/rto_tracker_table",
+                string_value=rto_table.table_name,
+            )
+            ssm.StringParameter(
+                self,
+                "rto_table_stream_arn",
+                parameter_name="/sktanapps/rtoapp/dynamodb/rto_tracker_table_stream",
+                string_value=rto_table.table_stream_arn,
+            )
 
         # Create a DynamoDB table to store any idompotency items
-        rto_idempotency_table = dynamodb.Table(
-            self,
-            "rto_idempotency_table",
-            partition_key=dynamodb.Attribute(
-                name="id", type=dynamodb.AttributeType.STRING
-            ),
-            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
-            # Use AWS managed KMS key for encryption at rest
-            encryption=dynamodb.TableEncryption.AWS_MANAGED,
-            removal_policy=RemovalPolicy.DESTROY,
-            time_to_live_attribute="expiration",
-            point_in_time_recovery=True,
-        )
+        if global_tables:
+            rto_idempotency_table = dynamodb.TableV2(
+                self,
+                "rto_idempotency_global_table",
+                table_name=f"{global_tables['table_name']}-idempotency",
+                partition_key=partition_key,
+                billing=dynamodb.Billing.on_demand(),
+                encryption=dynamodb.TableEncryptionV2.aws_managed_key(),
+                removal_policy=RemovalPolicy.DESTROY,
+                time_to_live_attribute="expiration",
+                point_in_time_recovery=True,
+                replicas=replicas,
+            )
+        else:
+            rto_idempotency_table = dynamodb.Table(
+                self,
+                "rto_idempotency_table",
+                partition_key=partition_key,
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                # Use AWS managed KMS key for encryption at rest
+                encryption=dynamodb.TableEncryption.AWS_MANAGED,
+                removal_policy=RemovalPolicy.DESTROY,
+                time_to_live_attribute="expiration",
+                point_in_time_recovery=True,
+            )
 
         # Store RTO App Parameter for later reference
         ssm.StringParameter(
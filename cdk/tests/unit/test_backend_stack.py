@@ -38,3 +38,259 @@ def describe_apigw_requirements():
                 },
             },
         )
+
+
+def describe_compactor_requirements():
+    def test_compactor_only_receives_checkin_events(template):
+        template.has_resource_properties(
+            "AWS::Lambda::EventSourceMapping",
+            {
+                "FilterCriteria": {
+                    "Filters": [
+                        {
+                            "Pattern": json.dumps(
+                                {
+                                    "eventName": ["INSERT"],
+                                    "dynamodb": {
+                                        "Keys": {"month": {"S": [{"prefix": "evt#"}]}}
+                                    },
+                                },
+                                separators=(",", ":"),
+                            )
+                        }
+                    ]
+                },
+            },
+        )
+
+
+def describe_lambda_initialisation():
+    @pytest.fixture(scope="function")
+    def warm_template():
+        warm_context = json.loads(json.dumps(context))
+        warm_context["app_config"].update(
+            {"arm64": True, "snapstart": True, "provisioned_concurrency": 2}
+        )
+        app = core.App(context=warm_context)
+        stack = BackendStack(
+            app,
+            "cdk",
+            env=core.Environment(account="123456789012", region="ap-southeast-2"),
+        )
+        yield assertions.Template.from_stack(stack)
+
+    def test_defaults_to_unversioned_x86(template):
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {"Handler": "apigw.handler", "Architectures": ["x86_64"]},
+        )
+        template.resource_count_is("AWS::Lambda::Alias", 0)
+
+    def test_arm64_and_snapstart(warm_template):
+        warm_template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "apigw.handler",
+                "Architectures": ["arm64"],
+                "SnapStart": {"ApplyOn": "PublishedVersions"},
+            },
+        )
+
+    def test_provisioned_concurrency_alias(warm_template):
+        warm_template.has_resource_properties(
+            "AWS::Lambda::Alias",
+            {
+                "Name": "live",
+                "ProvisionedConcurrencyConfig": {"ProvisionedConcurrentExecutions": 2},
+            },
+        )
+
+
+def describe_global_tables():
+    @pytest.fixture(scope="function")
+    def replica_template():
+        global_context = json.loads(json.dumps(context))
+        global_context["app_config"]["global_tables"] = {
+            "table_name": "rtoapp-tracker",
+            "primary_region": "ap-southeast-2",
+            "replica_regions": ["us-west-2"],
+            "hosted_zone_id": "Z0000000000000",
+        }
+        app = core.App(context=global_context)
+        stack = BackendStack(
+            app,
+            "cdk",
+            primary=False,
+            env=core.Environment(account="123456789012", region="us-west-2"),
+        )
+        yield assertions.Template.from_stack(stack)
+
+    def test_replica_writes_to_primary_region(replica_template):
+        replica_template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "apigw.handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {
+                            "RTO_TABLE_NAME": "rtoapp-tracker",
+                            "RTO_WRITE_REGION": "ap-southeast-2",
+                        }
+                    )
+                },
+            },
+        )
+
+    def test_replica_uses_powertools_layer_in_its_region(replica_template):
+        replica_template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "apigw.handler",
+                "Layers": [
+                    "arn:aws:lambda:us-west-2:017000801446:layer:"
+                    "AWSLambdaPowertoolsPythonV2:73"
+                ],
+            },
+        )
+
+    def test_replica_has_no_compactor(replica_template):
+        replica_template.resource_count_is("AWS::Lambda::EventSourceMapping", 0)
+
+    def test_latency_routing(replica_template):
+        replica_template.has_resource_properties(
+            "AWS::ApiGateway::RestApi",
+            {"EndpointConfiguration": {"Types": ["REGIONAL"]}},
+        )
+        replica_template.has_resource_properties(
+            "AWS::Route53::RecordSet",
+            {"SetIdentifier": "us-west-2", "Region": "us-west-2"},
+        )
+
+
+def describe_archive_requirements():
+    def test_archive_runs_monthly(template):
+        template.has_resource_properties(
+            "AWS::Lambda::Function", {"Handler": "archive.handler"}
+        )
+        template.has_resource_properties(
+            "AWS::Events::Rule", {"ScheduleExpression": "cron(0 3 2 * ? *)"}
+        )
+
+    def test_archive_can_hand_off_to_itself(template):
+        template.has_resource_properties(
+            "AWS::IAM::Policy",
+            {
+                "PolicyDocument": {
+                    "Statement": [
+                        assertions.Match.object_like(
+                            {"Action": "lambda:InvokeFunction", "Effect": "Allow"}
+                        )
+                    ]
+                }
+            },
+        )
+
+    def test_archive_export_is_optional(template):
+        template.resource_count_is("AWS::S3::Bucket", 0)
+
+
+def describe_checkin_queue():
+    @pytest.fixture(scope="function")
+    def queue_template():
+        queue_context = json.loads(json.dumps(context))
+        queue_context["app_config"]["checkin_queue"] = {"batch_size": 50}
+        app = core.App(context=queue_context)
+        stack = BackendStack(
+            app,
+            "cdk",
+            env=core.Environment(account="123456789012", region="ap-southeast-2"),
+        )
+        yield assertions.Template.from_stack(stack)
+
+    def test_checkin_queue_is_optional(template):
+        template.resource_count_is("AWS::SQS::Queue", 0)
+
+    def test_queue_has_dead_letter_queue(queue_template):
+        queue_template.resource_count_is("AWS::SQS::Queue", 2)
+        queue_template.has_resource_properties(
+            "AWS::SQS::Queue",
+            {
+                "RedrivePolicy": {
+                    "deadLetterTargetArn": assertions.Match.any_value(),
+                    "maxReceiveCount": 5,
+                }
+            },
+        )
+
+    def test_consumer_reports_batch_item_failures(queue_template):
+        queue_template.has_resource_properties(
+            "AWS::Lambda::Function", {"Handler": "ingest.handler"}
+        )
+        queue_template.has_resource_properties(
+            "AWS::Lambda::EventSourceMapping",
+            {
+                "BatchSize": 50,
+                "FunctionResponseTypes": ["ReportBatchItemFailures"],
+            },
+        )
+
+    def test_api_is_given_queue_url(queue_template):
+        queue_template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "apigw.handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {"CHECKIN_QUEUE_URL": assertions.Match.any_value()}
+                    )
+                },
+            },
+        )
+
+
+def describe_logging():
+    @pytest.fixture(scope="function")
+    def dev_template():
+        dev_context = json.loads(json.dumps(context))
+        dev_context["app_config"]["dev"] = True
+        dev_context["app_config"]["log_sample_rates"] = {"POST /checkin": 0.001}
+        app = core.App(context=dev_context)
+        stack = BackendStack(
+            app,
+            "cdk",
+            env=core.Environment(account="123456789012", region="ap-southeast-2"),
+        )
+        yield assertions.Template.from_stack(stack)
+
+    def test_api_uses_production_profile_by_default(template):
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "apigw.handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {
+                            "LOG_PROFILE": "production",
+                            "IS_DEV": assertions.Match.absent(),
+                            "LOG_SAMPLE_RATES": assertions.Match.absent(),
+                        }
+                    )
+                },
+            },
+        )
+
+    def test_dev_deployments_use_development_profile(dev_template):
+        dev_template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "apigw.handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {
+                            "LOG_PROFILE": "development",
+                            "LOG_SAMPLE_RATES": '{"POST /checkin": 0.001}',
+                        }
+                    )
+                },
+            },
+        )
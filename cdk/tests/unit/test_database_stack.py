@@ -31,3 +31,85 @@ def describe_dynamodb_standards():
         template.has_resource_properties(
             "AWS::DynamoDB::Table", {"DeletionProtectionEnabled": True}
         )
+
+    def test_dynamodb_checkin_events_expire(template):
+        template.has_resource_properties(
+            "AWS::DynamoDB::Table",
+            {
+                "TimeToLiveSpecification": {
+                    "AttributeName": "expires_at",
+                    "Enabled": True,
+                },
+                "StreamSpecification": {"StreamViewType": "NEW_IMAGE"},
+            },
+        )
+
+
+def describe_global_tables():
+    @pytest.fixture(scope="function")
+    def global_template():
+        app = core.App(
+            context={
+                "app_config": {
+                    "global_tables": {
+                        "table_name": "rtoapp-tracker",
+                        "primary_region": "ap-southeast-2",
+                        "replica_regions": ["us-west-2"],
+                    }
+                }
+            }
+        )
+        stack = DatabaseStack(
+            app,
+            "cdk",
+            env=core.Environment(account="123456789012", region="ap-southeast-2"),
+        )
+        yield assertions.Template.from_stack(stack)
+
+    def test_tables_are_replicated(global_template):
+        global_template.resource_count_is("AWS::DynamoDB::GlobalTable", 2)
+        global_template.has_resource_properties(
+            "AWS::DynamoDB::GlobalTable",
+            {
+                "TableName": "rtoapp-tracker",
+                "Replicas": assertions.Match.array_with(
+                    [assertions.Match.object_like({"Region": "us-west-2"})]
+                ),
+                "StreamSpecification": {"StreamViewType": "NEW_AND_OLD_IMAGES"},
+                "TimeToLiveSpecification": {
+                    "AttributeName": "expires_at",
+                    "Enabled": True,
+                },
+            },
+        )
+
+    def test_tracker_table_keeps_logical_id(template, global_template):
+        regional = template.find_resources("AWS::DynamoDB::Table")
+        replicated = global_template.find_resources("AWS::DynamoDB::GlobalTable")
+
+        assert set(regional) & set(replicated)
+
+    def test_tracker_table_can_be_detached():
+        app = core.App(
+            context={
+                "app_config": {
+                    "global_tables": {
+                        "table_name": "rtoapp-tracker",
+                        "primary_region": "ap-southeast-2",
+                        "replica_regions": [],
+                        "detach_table": True,
+                    }
+                }
+            }
+        )
+        stack = DatabaseStack(
+            app,
+            "cdk",
+            env=core.Environment(account="123456789012", region="ap-southeast-2"),
+        )
+        detached = assertions.Template.from_stack(stack)
+
+        detached.resource_count_is("AWS::DynamoDB::GlobalTable", 1)
+        detached.has_resource_properties(
+            "AWS::DynamoDB::GlobalTable", {"TableName": "rtoapp-tracker-idempotency"}
+        )
@@ -1,26 +1,53 @@
 package main
 
 import (
+	"crypto/rand"
+	"crypto/sha256"
+	"encoding/hex"
 	"encoding/json"
+	"errors"
 	"flag"
 	"fmt"
 	"io"
 	"log"
 	"math"
-	"math/rand"
+	mathrand "math/rand"
+	"net"
 	"net/http"
 	"net/url"
 	"os"
 	"path/filepath"
+	"sort"
+	"strconv"
+	"strings"
 	"time"
 )
 
 var action string
 var useConfig bool
 var noSleep bool
+var daemon bool
+var pollInterval time.Duration
 
 var currentDate = time.Now().Local()
 
+var statePath string
+
+// Retries of failed check-ins wait up to baseDelay * 2^attempt, capped at maxDelay
+const maxAttempts = 6
+const baseDelay = 2 * time.Second
+const maxDelay = 5 * time.Minute
+
+// The header the API sets once today is recorded as an office day, or to queued
+// while an office check-in is still waiting to be recorded
+const officeRecordedHeader = "X-Office-Recorded"
+
+// A daemon checks in again this often while its check-in is queued
+const queuedRecheckInterval = 10 * time.Minute
+
+// The header that tells the API which network a check-in came from
+const networkFingerprintHeader = "X-Network-Fingerprint"
+
 type config struct {
 	ApiUrl      string `json:"api_url"`
 	DashboardId string `json:"dashboard_id"`
@@ -35,12 +62,15 @@ func init() {
 	flag.StringVar(&rtoConfig.ApiUrl, "api", "", "API Endpoint in the https://rtoapi.example.com/ format")
 	flag.StringVar(&rtoConfig.DashboardId, "id", "", "Your Dashboard Id")
 	flag.BoolVar(&noSleep, "nosleep", false, "Whether to perform a random sleep before checking in")
+	flag.BoolVar(&daemon, "daemon", false, "Keep running and check in once whenever the network changes")
+	flag.DurationVar(&pollInterval, "interval", 30*time.Second, "How often the daemon looks for network changes")
 
 	flag.Parse()
 
 	ex, _ := os.Executable()
 	pwd := filepath.Dir(ex)
 	configPath := filepath.Join(pwd, "rtoconfig.json")
+	statePath = filepath.Join(pwd, "rtostate.json")
 
 	if action == "init" {
 		_, err := os.Open(configPath)
@@ -81,21 +111,104 @@ func init() {
 	}
 }
 
-func checkin(parsedUri *url.URL) {
+// The dates that each dashboard was last recorded as being in the office, and the
+// networks that each dashboard is known to have been in the office on
+type state struct {
+	LastCheckin map[string]string  `json:"last_checkin"`
+	Offices     map[string]offices `json:"offices"`
+}
 
-	if !noSleep {
-		r := rand.Intn(60)
-		fmt.Println("Sleeping for :", r, "seconds")
-		time.Sleep(time.Duration(r) * time.Second)
+type offices struct {
+	Networks []string `json:"office_networks"`
+	ETag     string   `json:"etag"`
+	Fetched  string   `json:"fetched"`
+	// Networks that a check-in was not recorded from, with the date it was tried
+	Elsewhere map[string]string `json:"elsewhere"`
+}
+
+func loadState() state {
+	rtoState := state{}
+
+	stateBytes, err := os.ReadFile(statePath)
+	if err == nil {
+		json.Unmarshal(stateBytes, &rtoState)
+	}
+	if rtoState.LastCheckin == nil {
+		rtoState.LastCheckin = map[string]string{}
+	}
+	if rtoState.Offices == nil {
+		rtoState.Offices = map[string]offices{}
 	}
 
-	fullUrl, _ := url.JoinPath("https://", parsedUri.Host, "/checkin/", rtoConfig.DashboardId)
+	return rtoState
+}
 
-	fmt.Println("Checkin URL detected to be:", fullUrl)
+func saveState(rtoState state) error {
+	stateBytes, err := json.Marshal(rtoState)
+	if err != nil {
+		return err
+	}
+
+	// Written to a temporary file first so that an interrupted write can't corrupt it
+	tempPath := statePath + ".tmp"
+	if err := os.WriteFile(tempPath, stateBytes, 0600); err != nil {
+		return err
+	}
+	return os.Rename(tempPath, statePath)
+}
+
+func today() string {
+	return time.Now().Local().Format("2006-01-02")
+}
+
+func checkedInToday() bool {
+	return loadState().LastCheckin[rtoConfig.DashboardId] == today()
+}
+
+func newIdempotencyKey() string {
+	key := make([]byte, 16)
+	rand.Read(key)
+	return hex.EncodeToString(key)
+}
+
+// Waits with full jitter, or for as long as the API asked with Retry-After
+func backoff(attempt int, retryAfter string) time.Duration {
+	if seconds, err := strconv.Atoi(retryAfter); err == nil && seconds > 0 {
+		return time.Duration(seconds) * time.Second
+	}
 
-	req, err := http.NewRequest("POST", fullUrl, nil)
+	delay := baseDelay << attempt
+	if delay > maxDelay {
+		delay = maxDelay
+	}
+	return time.Duration(mathrand.Int63n(int64(delay)))
+}
+
+func contains(values []string, value string) bool {
+	for _, v := range values {
+		if v == value {
+			return true
+		}
+	}
+	return false
+}
+
+// Refreshes the office networks of the dashboard at most once a day
+func refreshOffices(parsedUri *url.URL) offices {
+	rtoState := loadState()
+	known := rtoState.Offices[rtoConfig.DashboardId]
+	if known.Fetched == today() {
+		return known
+	}
+
+	fullUrl, _ := url.JoinPath("https://", parsedUri.Host, "/dashboard/", rtoConfig.DashboardId, "/offices")
+
+	req, err := http.NewRequest("GET", fullUrl, nil)
 	if err != nil {
-		panic(err)
+		return known
+	}
+	if known.ETag != "" {
+		req.Header.Set("If-None-Match", known.ETag)
 	}
 
 	client := http.Client{
@@ -104,10 +217,242 @@ func checkin(parsedUri *url.URL) {
 
 	res, err := client.Do(req)
 	if err != nil {
-		panic("client: error making http request: " + err.Error())
+		return known
+	}
+	defer res.Body.Close()
+
+	if res.StatusCode == http.StatusOK {
+		bodyBytes, err := io.ReadAll(res.Body)
+		if err != nil {
+			return known
+		}
+		fetched := offices{}
+		json.Unmarshal(bodyBytes, &fetched)
+		known.Networks = fetched.Networks
+		known.ETag = res.Header.Get("ETag")
+	} else if res.StatusCode != http.StatusNotModified {
+		return known
+	}
+
+	known.Fetched = today()
+	rtoState.Offices[rtoConfig.DashboardId] = known
+	saveState(rtoState)
+
+	return known
+}
+
+// The API decides whether a check-in is from the office, this only skips the
+// networks that a check-in wasn't recorded from earlier today. Fingerprints only
+// cover the subnets, so a home network can share one with an office, and a network
+// is never skipped for longer than the rest of the day.
+func plausiblyAtOffice(parsedUri *url.URL, fingerprint string) bool {
+	if fingerprint == "" {
+		return true
+	}
+
+	known := refreshOffices(parsedUri)
+	if contains(known.Networks, fingerprint) {
+		return true
+	}
+
+	return known.Elsewhere[fingerprint] != today()
+}
+
+// Remembers whether the network of a check-in was in the office, and whether today
+// was recorded as an office day
+func rememberNetwork(fingerprint string, office bool, recorded bool) error {
+	rtoState := loadState()
+	known := rtoState.Offices[rtoConfig.DashboardId]
+	if known.Elsewhere == nil {
+		known.Elsewhere = map[string]string{}
+	}
+	// Only today's entries are used, so earlier ones are dropped
+	for network, tried := range known.Elsewhere {
+		if tried != today() {
+			delete(known.Elsewhere, network)
+		}
+	}
+
+	if recorded {
+		rtoState.LastCheckin[rtoConfig.DashboardId] = today()
+	}
+	if office {
+		if fingerprint != "" && !contains(known.Networks, fingerprint) {
+			known.Networks = append(known.Networks, fingerprint)
+		}
+		delete(known.Elsewhere, fingerprint)
+	} else if fingerprint != "" {
+		known.Elsewhere[fingerprint] = today()
 	}
 
-	fmt.Println("Checkin was successful with a response code of:", res.Status)
+	rtoState.Offices[rtoConfig.DashboardId] = known
+	return saveState(rtoState)
+}
+
+// A check-in that the API answered with an error, and the Retry-After it asked for
+type checkinError struct {
+	status     string
+	retryAfter string
+}
+
+func (e *checkinError) Error() string {
+	return "checkin failed with a response code of: " + e.status
+}
+
+// Checks in unless today was already recorded, returning whether the check-in was
+// queued by the API rather than recorded
+func checkin(parsedUri *url.URL) (bool, error) {
+
+	if checkedInToday() {
+		fmt.Println("Already checked in today, skipping")
+		return false, nil
+	}
+
+	fingerprint := networkFingerprint()
+	if !plausiblyAtOffice(parsedUri, fingerprint) {
+		fmt.Println("Not on an office network, skipping")
+		return false, nil
+	}
+
+	if !noSleep && !daemon {
+		r := mathrand.Intn(60)
+		fmt.Println("Sleeping for :", r, "seconds")
+		time.Sleep(time.Duration(r) * time.Second)
+	}
+
+	fullUrl, _ := url.JoinPath("https://", parsedUri.Host, "/checkin/", rtoConfig.DashboardId)
+
+	fmt.Println("Checkin URL detected to be:", fullUrl)
+
+	client := http.Client{
+		Timeout: 30 * time.Second,
+	}
+
+	// Every retry uses the same key so that the API can't record it twice
+	idempotencyKey := newIdempotencyKey()
+
+	for attempt := 0; ; attempt++ {
+		req, err := http.NewRequest("POST", fullUrl, nil)
+		if err != nil {
+			return false, err
+		}
+		req.Header.Set("Idempotency-Key", idempotencyKey)
+		if fingerprint != "" {
+			req.Header.Set(networkFingerprintHeader, fingerprint)
+		}
+
+		retryAfter := ""
+		res, err := client.Do(req)
+		if err == nil {
+			res.Body.Close()
+
+			if res.StatusCode >= 200 && res.StatusCode <= 299 {
+				fmt.Println("Checkin was successful with a response code of:", res.Status)
+				switch res.Header.Get(officeRecordedHeader) {
+				case "true":
+					return false, rememberNetwork(fingerprint, true, true)
+				case "queued":
+					// Only remembered as checked in once a later check-in sees it recorded
+					fmt.Println("Queued to be recorded as an office day")
+					return true, rememberNetwork(fingerprint, true, false)
+				default:
+					fmt.Println("Not recorded as an office day")
+					return false, rememberNetwork(fingerprint, false, false)
+				}
+			}
+			if res.StatusCode != http.StatusTooManyRequests && res.StatusCode < 500 {
+				return false, &checkinError{status: res.Status}
+			}
+
+			retryAfter = res.Header.Get("Retry-After")
+			err = &checkinError{status: res.Status, retryAfter: retryAfter}
+		}
+
+		if attempt+1 >= maxAttempts {
+			return false, err
+		}
+
+		delay := backoff(attempt, retryAfter)
+		fmt.Println("Checkin failed:", err, "- retrying in", delay.Round(time.Second))
+		time.Sleep(delay)
+	}
+}
+
+// Identifies the networks that the machine is connected to by the subnets of its
+// interfaces, hashed with the dashboard id so it can't be linked across users
+func networkFingerprint() string {
+	addrs, err := net.InterfaceAddrs()
+	if err != nil {
+		return ""
+	}
+
+	var networks []string
+	for _, addr := range addrs {
+		ipNet, ok := addr.(*net.IPNet)
+		if !ok || ipNet.IP.IsLoopback() || ipNet.IP.IsLinkLocalUnicast() {
+			continue
+		}
+		ones, _ := ipNet.Mask.Size()
+		networks = append(networks, fmt.Sprintf("%s/%d", ipNet.IP.Mask(ipNet.Mask), ones))
+	}
+	if len(networks) == 0 {
+		return ""
+	}
+	sort.Strings(networks)
+
+	hash := sha256.Sum256([]byte(rtoConfig.DashboardId + "\n" + strings.Join(networks, ",")))
+	return hex.EncodeToString(hash[:])
+}
+
+// Checks in whenever the network or the day changes, instead of on a schedule
+func runDaemon(parsedUri *url.URL) {
+	lastNetwork := ""
+	lastDay := ""
+	// Set while a queued check-in hasn't been seen recorded yet, or until a failed
+	// check-in is retried
+	var recheckAt time.Time
+	failures := 0
+
+	for {
+		network := networkFingerprint()
+		day := today()
+		recheck := !recheckAt.IsZero() && time.Now().After(recheckAt)
+		// The network and day are only moved on from once a check-in succeeds, so a
+		// failed one is retried once its backoff has passed
+		backingOff := failures > 0 && !recheck
+
+		if network != "" && !backingOff && (network != lastNetwork || day != lastDay || recheck) {
+			if failures > 0 {
+				fmt.Println("Retrying the failed checkin")
+			} else if recheck {
+				fmt.Println("Checking whether the queued checkin was recorded")
+			} else {
+				fmt.Println("Network or day changed, checking in")
+			}
+			queued, err := checkin(parsedUri)
+			recheckAt = time.Time{}
+			if err != nil {
+				retryAfter := ""
+				var failed *checkinError
+				if errors.As(err, &failed) {
+					retryAfter = failed.retryAfter
+				}
+				delay := backoff(failures, retryAfter)
+				failures++
+				fmt.Println("Checkin failed:", err, "- retrying in", delay.Round(time.Second))
+				recheckAt = time.Now().Add(delay)
+			} else {
+				failures = 0
+				if queued {
+					recheckAt = time.Now().Add(queuedRecheckInterval)
+				}
+				lastNetwork = network
+				lastDay = day
+			}
+		}
+
+		time.Sleep(pollInterval)
+	}
 }
 
 type RtoStats struct {
@@ -153,8 +498,12 @@ func main() {
 		panic(err)
 	}
 
-	if action == "checkin" {
-		checkin(parsedUri)
+	if action == "checkin" && daemon {
+		runDaemon(parsedUri)
+	} else if action == "checkin" {
+		if _, err := checkin(parsedUri); err != nil {
+			log.Fatal(err)
+		}
 	} else if action == "stats" {
 		stats(parsedUri)
 	} else {
@@ -0,0 +1,152 @@
+import axios, { type AxiosResponse } from 'axios'
+
+// Responses are kept in localStorage so a returning visitor sees their dashboard
+// straight away, while the API is asked for the latest copy in the background.
+// The API sends ETags with Cache-Control: no-cache, so the browser already turns
+// those background requests into conditional ones and a 304 costs next to nothing.
+const STORAGE_PREFIX = 'rto-cache:'
+// Month URLs change every month, so old entries are dropped rather than kept forever
+const MAX_AGE = 62 * 24 * 60 * 60 * 1000
+
+interface CachedResponse<T> {
+  data: T
+  stored: number
+}
+
+const inFlight = new Map<string, Promise<AxiosResponse>>()
+
+const storage = (): Storage | null => {
+  try {
+    return window.localStorage
+  } catch {
+    // Storage can be disabled entirely, for example by privacy settings
+    return null
+  }
+}
+
+const store = <T>(url: string, data: T) => {
+  const entry: CachedResponse<T> = { data, stored: Date.now() }
+  try {
+    storage()?.setItem(STORAGE_PREFIX + url, JSON.stringify(entry))
+  } catch {
+    // A full storage only costs the instant render on the next visit
+  }
+}
+
+const forget = (url: string) => {
+  storage()?.removeItem(STORAGE_PREFIX + url)
+}
+
+/**
+ * Gets the last response that was received from a URL
+ *
+ * @param url The URL of the request
+ * @returns The response body, or undefined if there is none
+ */
+export const cached = <T>(url: string): T | undefined => {
+  const value = storage()?.getItem(STORAGE_PREFIX + url)
+  if (!value) {
+    return undefined
+  }
+
+  try {
+    return (JSON.parse(value) as CachedResponse<T>).data
+  } catch {
+    forget(url)
+    return undefined
+  }
+}
+
+/**
+ * Sends a GET request, sharing the response with any identical request in flight
+ *
+ * Both 200 and 404 responses resolve, every other status rejects.
+ *
+ * @param url The URL of the request
+ * @returns The response
+ */
+export const get = <T>(url: string): Promise<AxiosResponse<T>> => {
+  let request = inFlight.get(url)
+  if (request === undefined) {
+    request = axios
+      .get<T>(url, { validateStatus: (status) => status === 200 || status === 404 })
+      .finally(() => inFlight.delete(url))
+    inFlight.set(url, request)
+  }
+  return request as Promise<AxiosResponse<T>>
+}
+
+/**
+ * Fetches the latest response from a URL and keeps it for the next visit
+ *
+ * @param url The URL of the request
+ * @param onData Called with the response body when it differs from the kept one
+ * @returns The status of the response
+ */
+export const revalidate = async <T>(url: string, onData: (data: T) => void): Promise<number> => {
+  const response = await get<T>(url)
+  if (response.status === 404) {
+    forget(url)
+    return response.status
+  }
+
+  const previous = cached<T>(url)
+  store(url, response.data)
+  // Unchanged data is not handed over again, which would re-render for nothing
+  if (previous === undefined || JSON.stringify(previous) !== JSON.stringify(response.data)) {
+    onData(response.data)
+  }
+  return response.status
+}
+
+/**
+ * Renders the kept response from a URL at once, then revalidates it in the background
+ *
+ * If the request fails, the kept response stays on screen and the error is only
+ * raised when there was nothing to show.
+ *
+ * @param url The URL of the request
+ * @param onData Called with the kept response body, and again with the latest one
+ *   when it has changed
+ * @returns The status of the response, or 200 if a kept response is shown after
+ *   the request failed
+ */
+export const load = async <T>(url: string, onData: (data: T) => void): Promise<number> => {
+  const stale = cached<T>(url)
+  if (stale !== undefined) {
+    onData(stale)
+  }
+
+  try {
+    return await revalidate(url, onData)
+  } catch (error) {
+    if (stale === undefined) {
+      throw error
+    }
+    return 200
+  }
+}
+
+/**
+ * Drops the kept responses that have not been refreshed for a while
+ */
+export const prune = () => {
+  const local = storage()
+  if (local === null) {
+    return
+  }
+
+  const expired = Date.now() - MAX_AGE
+  for (let index = local.length - 1; index >= 0; index -= 1) {
+    const key = local.key(index)
+    if (key?.startsWith(STORAGE_PREFIX)) {
+      try {
+        if ((JSON.parse(local.getItem(key)!) as CachedResponse<unknown>).stored < expired) {
+          local.removeItem(key)
+        }
+      } catch {
+        local.removeItem(key)
+      }
+    }
+  }
+}
@@ -1,12 +1,17 @@
 import os
+import re
+import time
 import uuid
-import zoneinfo
+from calendar import monthrange
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 
 import boto3
 from aws_lambda_powertools import Logger
-from aws_lambda_powertools.event_handler import APIGatewayRestResolver, CORSConfig
+from aws_lambda_powertools.event_handler import CORSConfig
 from aws_lambda_powertools.event_handler.api_gateway import Response
 from aws_lambda_powertools.logging import correlation_paths
 from aws_lambda_powertools.utilities.idempotency import (
@@ -20,26 +25,65 @@ from aws_lambda_powertools.utilities.idempotency.serialization.pydantic import (
 from aws_lambda_powertools.utilities.parser import BaseModel
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
+import archive
+import bootstrap
+import capacity
+import coalescer
+import http_client
 import location
+import log_config
+import projection
+import storage
+import timezones
+from checkin_guard import CheckinCache, RateLimiter
+from http_cache import (
+    cache_headers,
+    generate_etag,
+    is_not_modified,
+    is_past_month,
+)
+from resolver import RequestScopedResolver
 
 persistence_layer = DynamoDBPersistenceLayer(
     table_name=os.environ.get("RTO_IDEMPOTENCY_TABLE_NAME", "rto-idempotency-table")
 )
+capacity.instrument(persistence_layer.client)
 idempotency_config = IdempotencyConfig()
 
-from models import BaseRecord, BaseRecordHolidays, MonthRecord
+from models import (
+    BaseRecord,
+    BaseRecordHolidays,
+    CheckinMessage,
+    MonthRecord,
+    YearSummary,
+)
+from policy import MonthStats, evaluate_month, evaluate_months
 from tracker import (
+    generate_checkin_event,
     generate_tracker_base_entry,
     generate_tracker_month_entry,
+    get_country_codes,
     get_current_date,
+    get_month_holidays,
 )
 from tracker import get_public_holidays as get_public_holidays_orig
 
-tracker_table = boto3.resource("dynamodb").Table(
-    os.environ.get("RTO_TABLE_NAME", "rto-table")
+# DynamoDB unless RTO_STORAGE selects the in-memory or SQLite backend
+repository = storage.create_repository()
+# Check-ins are only validated and queued for ingest.py to write when this is set
+checkin_queue_url = os.environ.get("CHECKIN_QUEUE_URL")
+sqs_client = boto3.client("sqs") if checkin_queue_url else None
+# Set by servers that handle many requests per process, so that bursts of check-ins
+# are written together, see asgi.py
+write_coalescer: coalescer.WriteCoalescer | None = None
+# The buffered writes of the request being resolved, which such servers wait for
+# once the request has been resolved rather than while resolving it
+deferred_writes: ContextVar[list["DeferredWrite"] | None] = ContextVar(
+    "deferred_writes", default=None
 )
 
-is_dev = os.environ.get("IS_DEV", None) is not None
+office_ips = [ip for ip in os.environ.get("OFFICE_IPS", "").split(",") if ip]
+is_dev = log_config.is_dev
 extra_origins = ["http://localhost:3000"] if is_dev else None
 cors_origin = os.environ.get("CORS_ORIGIN", "https://example.com")
 
@@ -47,8 +91,37 @@ cors_origin = os.environ.get("CORS_ORIGIN", "https://example.com")
 cors_config = CORSConfig(
     allow_origin=cors_origin, extra_origins=extra_origins, max_age=300
 )
-app = APIGatewayRestResolver(cors=cors_config, enable_validation=True, debug=is_dev)
-logger = Logger()
+
+# Set on check-in responses once today is recorded as an office day, or to queued
+# while an office check-in waits for the ingest consumer
+OFFICE_RECORDED_HEADER = "X-Office-Recorded"
+# Sent by clients with a hash of their local network, so that they can learn which
+# networks are in the office and skip check-ins from anywhere else
+NETWORK_FINGERPRINT_HEADER = "X-Network-Fingerprint"
+NETWORK_FINGERPRINT = re.compile(r"^[0-9a-f]{64}$")
+OFFICE_NETWORKS_MAX = int(os.environ.get("OFFICE_NETWORKS_MAX", 10))
+# Office check-ins from several devices at once can race to add their networks
+OFFICE_NETWORK_ATTEMPTS = 3
+
+# Kept per container so that repeat pings can be answered without DynamoDB
+checkin_cache = CheckinCache()
+rate_limiter = RateLimiter()
+
+# The holidays of the base row are only needed to create month rows, and the request
+# ID of the month row is only needed to deduplicate check-ins
+BASE_RECORD_FIELDS = [
+    field
+    for field in BaseRecord.__fields__
+    if field not in ("holidays", "office_networks")
+]
+OFFICE_FIELDS = ["office_networks"]
+MONTH_RECORD_FIELDS = [
+    field for field in MonthRecord.__fields__ if field != "last_request_id"
+]
+
+# Servers that handle many requests per process resolve them at the same time
+app = RequestScopedResolver(cors=cors_config, enable_validation=True, debug=is_dev)
+logger = Logger(level=log_config.LOG_LEVEL)
 
 
 def create_new_month_entry(base_record: BaseRecord, timezone: str) -> MonthRecord:
@@ -61,13 +134,7 @@ def create_new_month_entry(base_record: BaseRecord, timezone: str) -> MonthRecor
 
     dt = get_current_date(timezone)
     date_row = generate_tracker_month_entry(base_record.id, dt.year, dt.month)
-
-    for day, holiday in base_record.holidays.items():
-        if not day.startswith(f"{date_row.month}-"):
-            continue
-        if not holiday.is_global and base_record.county not in holiday.counties:
-            continue
-        date_row.holidays[day] = holiday.name
+    date_row.holidays = get_month_holidays(base_record, date_row.month)
 
     return date_row
 
@@ -101,6 +168,73 @@ def get_public_holidays(kwargs: PublicHolidaysArgs) -> dict[str, dict[str, Any]]
     return get_public_holidays_orig(kwargs.country, kwargs.year)
 
 
+# Countries seen by earlier signups in this container, keyed by timezone
+timezone_countries: dict[str, str] = {}
+signup_executor = ThreadPoolExecutor(max_workers=4)
+
+
+@dataclass
+class SignupLookup:
+    location: location.IpApiResponse
+    timezone: str
+    holidays: dict[str, dict[str, Any]]
+
+
+def lookup_signup(source_ip: str, timezone: str | None) -> SignupLookup:
+    """Looks up the location and public holidays of a new user
+
+    The holiday lookup is overlapped with the location lookup whenever the country
+    can be guessed from an earlier signup in the same timezone.
+
+    Args:
+        source_ip (str): The IP address the user signed up from
+        timezone (str | None): The timezone the user chose, defaults to the timezone
+            of their location
+
+    Returns:
+        SignupLookup: The location, timezone and holidays, with no holidays when the
+            timezone of the location is not valid
+    """
+    location_future = signup_executor.submit(get_ip_location, ipaddr=source_ip)
+    holidays_args: PublicHolidaysArgs | None = None
+    holidays_future: Future | None = None
+    if timezone in timezone_countries:
+        holidays_args = PublicHolidaysArgs(
+            country=timezone_countries[timezone],
+            year=get_current_date(timezone).year,
+        )
+        holidays_future = signup_executor.submit(
+            get_public_holidays, kwargs=holidays_args
+        )
+
+    location = location_future.result()
+    if timezone is None:
+        timezone = location.timezone
+
+    if not timezones.is_valid_timezone(timezone):
+        return SignupLookup(location=location, timezone=timezone, holidays={})
+
+    timezone_countries[timezone] = location.country
+
+    args = PublicHolidaysArgs(
+        country=location.country, year=get_current_date(timezone).year
+    )
+    if holidays_future is not None and holidays_args == args:
+        holidays = holidays_future.result()
+    else:
+        holidays = get_public_holidays(kwargs=args)
+
+    return SignupLookup(location=location, timezone=timezone, holidays=holidays)
+
+
+def invalid_timezone_response() -> Response:
+    return Response(
+        status_code=422,
+        content_type="application/json",
+        body={"error": "Invalid timezone"},
+    )
+
+
 @app.put("/dashboard")
 def handle_new_user(
     dashboard: Optional[NewUserPayload] = NewUserPayload(),
@@ -110,103 +244,282 @@ def handle_new_user(
     guid = str(uuid.uuid4())
 
     timezone = dashboard.timezone
-    location = get_ip_location(
-        ipaddr=app.current_event.request_context.identity.source_ip
-    )
+    if timezone is not None and not timezones.is_valid_timezone(timezone):
+        return invalid_timezone_response()
 
-    if timezone is None:
-        timezone = location.timezone
-
-    if timezone not in zoneinfo.available_timezones():
-        return Response(
-            status_code=422,
-            content_type="application/json",
-            body={"error": "Invalid timezone"},
-        )
+    request_context = app.current_event.request_context
+    lookup = lookup_signup(request_context.identity.source_ip, timezone)
+    timezone = lookup.timezone
+    if not timezones.is_valid_timezone(timezone):
+        return invalid_timezone_response()
 
     base_row = generate_tracker_base_entry(guid, timezone)
-    base_row.county = f"{location.countryCode}-{location.region}"
-    base_row.country = location.country
-    base_row.office_ips = os.environ.get("OFFICE_IPS", "").split(",")
-
-    dt = get_current_date(timezone)
-    holidays = get_public_holidays(
-        kwargs=PublicHolidaysArgs(country=base_row.country, year=dt.year)
-    )
-
+    base_row.county = f"{lookup.location.countryCode}-{lookup.location.region}"
+    base_row.country = lookup.location.country
+    base_row.office_ips = list(office_ips)
     base_row.holidays = {
-        date: BaseRecordHolidays(**holiday) for date, holiday in holidays.items()
+        date: BaseRecordHolidays(**holiday) for date, holiday in lookup.holidays.items()
     }
 
     month_row = create_new_month_entry(base_row, timezone)
-    tracker_table.put_item(Item=base_row.dict())
-    tracker_table.put_item(Item=month_row.dict())
+    base_row.version += 1
+    month_row.version += 1
+    repository.batch_put([base_row.dict(), month_row.dict()])
 
     return Response(status_code=200, content_type="application/json", body=base_row)
 
 
-@app.get("/dashboard/<guid>")
-def handle_get_user(guid: str) -> BaseRecord:
-    """Handles the retrieval of the user's dashboard"""
-    base_row = tracker_table.get_item(Key={"id": guid, "month": "_base"})
-    if "Item" not in base_row:
-        return Response(status_code=404, content_type="application/json")
+def invalid_fields_response(error: projection.InvalidFieldsError) -> Response:
+    return Response(
+        status_code=422,
+        content_type="application/json",
+        body={"error": str(error)},
+    )
+
 
+def projected_response(body: dict[str, Any], headers: dict[str, str]) -> Response:
+    """Creates a JSON response that is compressed when the body is large
+
+    Args:
+        body (dict[str, Any]): The projected record
+        headers (dict[str, str]): The caching headers
+
+    Returns:
+        Response: The response
+    """
     return Response(
         status_code=200,
         content_type="application/json",
-        body=BaseRecord(**base_row["Item"]),
+        body=body,
+        headers=headers,
+        compress=projection.should_compress(body),
     )
 
 
-@app.get("/dashboard/<guid>/<year>/<month>")
-def handle_get_month(guid: str, year: str, month: str) -> MonthRecord:
-    """Handles the retrieval of the user's dashboard"""
-    month_row = tracker_table.get_item(
-        Key={"id": guid, "month": f"{year}-{int(month):02d}"}
+@app.get("/dashboard/<guid>")
+def handle_get_user(guid: str) -> Dict[str, Any]:
+    """Handles the retrieval of the user's dashboard
+
+    The holidays are left out unless requested with the fields= parameter, for
+    example ?fields=timezone,holidays or ?fields=* for the whole row.
+    """
+    try:
+        fields = projection.parse_fields(
+            BaseRecord,
+            app.current_event.get_query_string_value("fields"),
+            BASE_RECORD_FIELDS,
+        )
+    except projection.InvalidFieldsError as error:
+        return invalid_fields_response(error)
+
+    base_row = repository.get_base(guid, fields)
+    if base_row is None:
+        return Response(status_code=404, content_type="application/json")
+
+    body = projection.project(BaseRecord, base_row, fields)
+    headers = cache_headers(
+        generate_etag(
+            body["month"],
+            body["version"],
+            projection.representation(fields, BASE_RECORD_FIELDS),
+        )
     )
-    if "Item" not in month_row:
+    if is_not_modified(
+        headers["ETag"], app.current_event.get_header_value("If-None-Match")
+    ):
+        return Response(status_code=304, headers=headers)
+
+    return projected_response(body, headers)
+
+
+@app.get("/dashboard/<guid>/offices")
+def handle_get_offices(guid: str) -> Dict[str, Any]:
+    """Handles the retrieval of the networks that the user has been in the office on
+
+    Clients cache the response and only check in from these networks. The API still
+    decides whether a check-in is from the office, so a stale list is harmless.
+    """
+    fields = projection.parse_fields(BaseRecord, None, OFFICE_FIELDS)
+    base_row = repository.get_base(guid, fields)
+    if base_row is None:
         return Response(status_code=404, content_type="application/json")
 
+    body = projection.project(BaseRecord, base_row, fields)
+    headers = cache_headers(
+        generate_etag(
+            body["month"],
+            body["version"],
+            projection.representation(fields, BASE_RECORD_FIELDS),
+        )
+    )
+    if is_not_modified(
+        headers["ETag"], app.current_event.get_header_value("If-None-Match")
+    ):
+        return Response(status_code=304, headers=headers)
+
     return Response(
-        status_code=200,
-        content_type="application/json",
-        body=MonthRecord(**month_row["Item"]),
+        status_code=200, content_type="application/json", body=body, headers=headers
     )
 
 
-class StatsResponse(BaseModel):
-    attendance: float
+@app.get("/dashboard/<guid>/<year>/<month>")
+def handle_get_month(guid: str, year: str, month: str) -> Dict[str, Any]:
+    """Handles the retrieval of the user's dashboard
+
+    Supports the same fields= parameter as the dashboard itself.
+    """
+    try:
+        fields = projection.parse_fields(
+            MonthRecord,
+            app.current_event.get_query_string_value("fields"),
+            MONTH_RECORD_FIELDS,
+        )
+    except projection.InvalidFieldsError as error:
+        return invalid_fields_response(error)
+
+    month_key = f"{year}-{int(month):02d}"
+    month_row = repository.get_month(guid, month_key, fields)
+    if month_row is None:
+        month_record = archive.get_archived_month(repository, guid, month_key)
+        if month_record is None:
+            return Response(status_code=404, content_type="application/json")
+        month_row = month_record.dict()
+
+    body = projection.project(MonthRecord, month_row, fields)
+    headers = cache_headers(
+        generate_etag(
+            body["month"],
+            body["version"],
+            projection.representation(fields, MONTH_RECORD_FIELDS),
+        ),
+        past_month=is_past_month(int(year), int(month)),
+    )
+    if is_not_modified(
+        headers["ETag"], app.current_event.get_header_value("If-None-Match")
+    ):
+        return Response(status_code=304, headers=headers)
+
+    return projected_response(body, headers)
 
 
 @app.get("/stats/<guid>/<year>/<month>")
-def handle_calculate_stats(guid: str, year: str, month: str) -> StatsResponse:
+def handle_calculate_stats(guid: str, year: str, month: str) -> MonthStats:
     """Handles the calculation of the statistics for the specified month
 
     Args:
-        event (dict[str, Any]): The event
-        context (Any): The context
+        guid (str): The GUID of the user
+        year (str): The year
+        month (str): The month
     """
-    month_row = tracker_table.get_item(
-        Key={"id": guid, "month": f"{year}-{int(month):02d}"}
+    month_key = f"{year}-{int(month):02d}"
+    summary_key = archive.summary_key(year)
+    rows = repository.batch_get(guid, ["_base", month_key, summary_key])
+    if month_key in rows:
+        month_record = MonthRecord(**rows[month_key])
+    elif summary_key in rows:
+        month_record = archive.restore_months(YearSummary(**rows[summary_key])).get(
+            month_key
+        )
+    else:
+        month_record = None
+
+    if "_base" not in rows or month_record is None:
+        return Response(status_code=404, content_type="application/json")
+
+    base_record = BaseRecord(**rows["_base"])
+    stats = evaluate_month(
+        base_record, month_record, get_current_date(base_record.timezone).date()
     )
-    if "Item" not in month_row:
+
+    return Response(status_code=200, content_type="application/json", body=stats)
+
+
+class YearStatsResponse(BaseModel):
+    months: List[MonthStats]
+
+
+@app.get("/stats/<guid>/<year>")
+def handle_calculate_year_stats(guid: str, year: str) -> YearStatsResponse:
+    """Handles the calculation of the statistics for every month of the year
+
+    Args:
+        guid (str): The GUID of the user
+        year (str): The year
+    """
+    summary_key = archive.summary_key(year)
+    rows = repository.batch_get(guid, ["_base", summary_key])
+    if "_base" not in rows:
         return Response(status_code=404, content_type="application/json")
 
-    month_record = MonthRecord(**month_row["Item"])
-    days = month_record.days
-    attended = len(days) - list(days.values()).count(None)
-    not_counted = len(days) - month_record.business_days + len(month_record.holidays)
+    base_record = BaseRecord(**rows["_base"])
+    month_records: dict[str, MonthRecord] = {}
+    if summary_key in rows:
+        month_records = archive.restore_months(YearSummary(**rows[summary_key]))
+
+    for row in repository.query_months(guid, f"{int(year):04d}-"):
+        month_records[row["month"]] = MonthRecord(**row)
 
-    total_eligible_days = len(days) - not_counted
+    stats = evaluate_months(
+        base_record,
+        [month_records[month] for month in sorted(month_records)],
+        get_current_date(base_record.timezone).date(),
+    )
 
     return Response(
         status_code=200,
         content_type="application/json",
-        body=StatsResponse(attendance=(attended / total_eligible_days) * 100),
+        body=YearStatsResponse(months=stats),
     )
 
 
+class LeavePayload(BaseModel):
+    days: Dict[str, Optional[str]] = {}
+
+
+@app.put("/dashboard/<guid>/<year>/<month>/leave")
+def handle_put_leave(guid: str, year: str, month: str, leave: LeavePayload):
+    """Handles the declaration of the user's leave days for the specified month
+
+    Args:
+        guid (str): The GUID of the user
+        year (str): The year
+        month (str): The month
+        leave (LeavePayload): The days of the month the user is on leave
+    """
+    days_in_month = monthrange(int(year), int(month))[1]
+    if any(
+        not day.isdigit() or not 1 <= int(day) <= days_in_month for day in leave.days
+    ):
+        return Response(
+            status_code=422,
+            content_type="application/json",
+            body={"error": "Invalid day"},
+        )
+
+    month_key = f"{year}-{int(month):02d}"
+    days = {str(int(day)): reason for day, reason in leave.days.items()}
+    if repository.set_leave(guid, month_key, days):
+        return Response(status_code=200, content_type="application/json")
+
+    # Leave is often declared for months that nobody has checked in to yet
+    base_row = repository.get_base(guid)
+    if base_row is None:
+        return Response(status_code=404, content_type="application/json")
+
+    base_record = BaseRecord(**base_row)
+    month_record = generate_tracker_month_entry(guid, int(year), int(month))
+    month_record.holidays = get_month_holidays(base_record, month_key)
+    month_record.leave = days
+    month_record.version += 1
+    # Fails when created concurrently, in which case the leave is set on that row
+    if not repository.put_new(month_record.dict()) and not repository.set_leave(
+        guid, month_key, days
+    ):
+        return Response(status_code=404, content_type="application/json")
+
+    return Response(status_code=200, content_type="application/json")
+
+
 @app.post("/checkin/<guid>")
 def post_ping(guid: str) -> MonthRecord:
     """Handles a PING sent from a client to the RTO system
@@ -214,36 +527,354 @@ def post_ping(guid: str) -> MonthRecord:
     Args:
         guid (str): The GUID of the user
     """
-    base_row = tracker_table.get_item(Key={"id": guid, "month": "_base"})
-    if "Item" not in base_row:
+    if not rate_limiter.allow(guid):
+        return Response(
+            status_code=429,
+            content_type="application/json",
+            headers={"Retry-After": str(rate_limiter.retry_after(guid))},
+        )
+
+    # Clients may retry with the same key, which must not be recorded twice
+    request_id = app.current_event.get_header_value("Idempotency-Key")
+
+    cached = checkin_cache.get(guid)
+    if cached is not None:
+        cached_timezone, cached_date, cached_request_id = cached
+        if get_current_date(cached_timezone).date().isoformat() == cached_date:
+            return checkin_response(request_id, cached_request_id)
+
+    base_row = repository.get_base(guid)
+    if base_row is None:
         return Response(status_code=404, content_type="application/json")
 
-    base_record = BaseRecord(**base_row["Item"])
+    base_record = BaseRecord(**base_row)
 
     dt = get_current_date(base_record.timezone)
-    month_row = tracker_table.get_item(
-        Key={"id": guid, "month": f"{dt.year}-{dt.month:02d}"}
-    )
+    today = dt.date().isoformat()
+    month_row = repository.get_month(guid, f"{dt.year}-{dt.month:02d}")
+    month_record = MonthRecord(**month_row) if month_row is not None else None
+    if (
+        month_record is not None
+        and request_id is not None
+        and month_record.last_request_id == request_id
+    ):
+        return checkin_status(200, recorded=True)
+
+    user_ip = app.current_event.request_context.identity.source_ip
+    is_office = user_ip in base_record.office_ips
+    if is_office:
+        remember_office_network(
+            base_record,
+            app.current_event.get_header_value(NETWORK_FINGERPRINT_HEADER),
+        )
+
+    if checkin_queue_url:
+        return enqueue_checkin(
+            base_record, month_record, dt, user_ip, is_office, request_id
+        )
 
-    month_record: MonthRecord
-    if "Item" not in month_row:
-        month_record = create_new_month_entry(base_record, base_record.timezone)
+    # Every ping is kept as a small append-only event, the month snapshot is only
+    # written when the ping changes it
+    event = generate_checkin_event(guid, dt, user_ip, is_office).dict()
+    if write_coalescer is None:
+        repository.batch_put([event])
     else:
-        month_record = MonthRecord(**month_row["Item"])
+        defer_write(DeferredWrite(write_coalescer.submit_put(event)))
 
-    if month_record.days[str(dt.day)] is not None:
-        return Response(status_code=202, content_type="application/json")
+    created = month_record is None and create_month_row(
+        base_record, dt, user_ip if is_office else None, request_id
+    )
+    if month_record is not None and month_record.days[str(dt.day)] is not None:
+        checkin_cache.remember(
+            guid, base_record.timezone, today, month_record.last_request_id
+        )
+        return checkin_status(202, recorded=True)
 
-    user_ip = app.current_event.request_context.identity.source_ip
-    if user_ip in base_record.office_ips:
-        month_record.days[str(dt.day)] = user_ip
+    # A month row created by this ping already holds the check-in
+    if is_office and not created and write_coalescer is not None:
+        checkin = write_coalescer.submit_checkin(
+            guid, f"{dt.year}-{dt.month:02d}", str(dt.day), user_ip, request_id
+        )
+        status_code = defer_write(
+            DeferredWrite(
+                checkin,
+                on_success=lambda: checkin_cache.remember(
+                    guid, base_record.timezone, today, request_id
+                ),
+                on_conflict=lambda exc: checkin_conflict_response(
+                    request_id, exc
+                ).status_code,
+            )
+        )
+        return checkin_status(status_code or 200, recorded=True)
+    if is_office and not created:
+        try:
+            repository.record_checkin(
+                guid, f"{dt.year}-{dt.month:02d}", str(dt.day), user_ip, request_id
+            )
+        except storage.ConditionFailedError as exc:
+            # A concurrent ping has already recorded today
+            return checkin_conflict_response(request_id, exc)
 
-    tracker_table.put_item(Item=month_record.dict())
-    return Response(status_code=200, content_type="application/json")
+    if is_office:
+        checkin_cache.remember(guid, base_record.timezone, today, request_id)
+    return checkin_status(200, recorded=is_office)
+
+
+def remember_office_network(base_record: BaseRecord, fingerprint: str | None) -> None:
+    """Adds the network of a check-in from the office to the user's office networks
+
+    Args:
+        base_record (BaseRecord): The user's base row
+        fingerprint (str | None): The network fingerprint sent by the client, if any
+    """
+    if fingerprint is None or not NETWORK_FINGERPRINT.match(fingerprint):
+        return
+
+    networks, version = base_record.office_networks, base_record.version
+    for _ in range(OFFICE_NETWORK_ATTEMPTS):
+        if fingerprint in networks:
+            return
+        try:
+            # The oldest networks are dropped first, as offices are rarely revisited
+            repository.set_office_networks(
+                base_record.id,
+                [*networks, fingerprint][-OFFICE_NETWORKS_MAX:],
+                version,
+            )
+            return
+        except storage.ConditionFailedError as exc:
+            stored = exc.item or repository.get_base(
+                base_record.id, [*OFFICE_FIELDS, "version"]
+            )
+            if stored is None:
+                return
+            networks, version = stored.get("office_networks", []), stored["version"]
+
+    # Clients only use the networks to skip check-ins, so the check-in goes ahead
+    logger.warning("Unable to remember office network", guid=base_record.id)
+
+
+def enqueue_checkin(
+    base_record: BaseRecord,
+    month_record: MonthRecord | None,
+    dt: datetime,
+    ip: str,
+    office: bool,
+    request_id: str | None,
+) -> Response:
+    """Queues a validated check-in for the ingest consumer to write
+
+    A missing month row is created here, so that the consumer only has to record
+    days against existing rows.
+
+    Args:
+        base_record (BaseRecord): The user's base row
+        month_record (MonthRecord | None): The month row of the check-in, if any
+        dt (datetime): The local time of the check-in
+        ip (str): The IP address the check-in came from
+        office (bool): Whether the IP address is an office IP address
+        request_id (str | None): The Idempotency-Key of the check-in
+
+    Returns:
+        Response: 202 once the check-in has been queued, only telling clients that
+            the day is recorded once its month row shows it
+    """
+    if month_record is None:
+        create_month_row(base_record, dt, None, None)
+
+    message = CheckinMessage(
+        id=base_record.id,
+        at=dt.isoformat(),
+        ip=ip,
+        office=office,
+        request_id=request_id,
+    )
+    sqs_client.send_message(QueueUrl=checkin_queue_url, MessageBody=message.json())
+
+    today = dt.date().isoformat()
+    if month_record is not None and month_record.days[str(dt.day)] is not None:
+        checkin_cache.remember(
+            base_record.id, base_record.timezone, today, month_record.last_request_id
+        )
+        return checkin_status(202, recorded=True)
+    # The message can still fail and end up in the dead-letter queue, so clients
+    # keep checking in until a later check-in finds the day in the month row
+    return checkin_status(202, recorded=False, queued=office)
+
+
+def create_month_row(
+    base_record: BaseRecord, dt: datetime, ip: str | None, request_id: str | None
+) -> bool:
+    """Creates the month row of a check-in if it does not exist yet
+
+    Args:
+        base_record (BaseRecord): The user's base row
+        dt (datetime): The local time of the check-in
+        ip (str | None): The office IP address to record for the day, if any
+        request_id (str | None): The Idempotency-Key of the check-in
+
+    Returns:
+        bool: Whether the row was created, False if another request created it first
+    """
+    month_record = create_new_month_entry(base_record, base_record.timezone)
+    if ip is not None:
+        month_record.days[str(dt.day)] = ip
+        month_record.last_request_id = request_id
+    month_record.version += 1
+
+    # Fails when created concurrently, or elsewhere and not yet replicated here
+    return repository.put_new(month_record.dict())
+
+
+def checkin_response(request_id: str | None, recorded_request_id: str | None):
+    """Generates the response for a check-in of a day that was already recorded
+
+    Args:
+        request_id (str | None): The Idempotency-Key of this request
+        recorded_request_id (str | None): The Idempotency-Key that recorded the day
+
+    Returns:
+        Response: 200 when this is a retry of the recording request, otherwise 202
+    """
+    if request_id is not None and request_id == recorded_request_id:
+        return checkin_status(200, recorded=True)
+    return checkin_status(202, recorded=True)
+
+
+def checkin_conflict_response(
+    request_id: str | None, exc: storage.ConditionFailedError
+) -> Response:
+    """Generates the response for a check-in that lost to a concurrent one
+
+    Args:
+        request_id (str | None): The Idempotency-Key of this request
+        exc (storage.ConditionFailedError): The error of the failed write
+
+    Returns:
+        Response: The response of a check-in of a day that was already recorded
+    """
+    stored = exc.item or {}
+    return checkin_response(request_id, stored.get("last_request_id"))
+
+
+def checkin_status(status_code: int, recorded: bool, queued: bool = False) -> Response:
+    """Generates the response of a check-in
+
+    Args:
+        status_code (int): The status code
+        recorded (bool): Whether today is recorded as an office day, which lets
+            clients stop checking in until tomorrow
+        queued (bool): Whether an office check-in was queued but not recorded yet
+
+    Returns:
+        Response: The response
+    """
+    headers = None
+    if recorded:
+        headers = {OFFICE_RECORDED_HEADER: "true"}
+    elif queued:
+        headers = {OFFICE_RECORDED_HEADER: "queued"}
+    return Response(
+        status_code=status_code, content_type="application/json", headers=headers
+    )
+
+
+@dataclass
+class DeferredWrite:
+    """A buffered write that the response of a request depends on
+
+    Attributes:
+        future (Future): Done once the write has been flushed
+        on_success (Callable[[], None] | None): Called once the write is stored
+        on_conflict (Callable[[storage.ConditionFailedError], int] | None): Gives
+            the status code to respond with if the write's condition failed,
+            otherwise the error is raised
+    """
+
+    future: Future
+    on_success: Callable[[], None] | None = None
+    on_conflict: Callable[[storage.ConditionFailedError], int] | None = None
+
+
+def defer_write(write: DeferredWrite) -> int | None:
+    """Leaves a buffered write to be settled once the request has been resolved
+
+    The write is settled straight away when the server does not defer writes.
+
+    Args:
+        write (DeferredWrite): The write
+
+    Returns:
+        int | None: The status code to respond with instead when the write was
+            settled straight away, if any
+    """
+    writes = deferred_writes.get()
+    if writes is None:
+        return settle_write(write)
+    writes.append(write)
+    return None
+
+
+def settle_write(write: DeferredWrite) -> int | None:
+    """Waits for a buffered write and applies its outcome
+
+    Args:
+        write (DeferredWrite): The write
+
+    Returns:
+        int | None: The status code to respond with instead, if any
+    """
+    try:
+        write.future.result()
+    except storage.ConditionFailedError as exc:
+        if write.on_conflict is None:
+            raise
+        return write.on_conflict(exc)
+    if write.on_success is not None:
+        write.on_success()
+    return None
+
+
+@bootstrap.on_init
+def warm_static_state() -> None:
+    """Builds the per-container state that does not depend on the network"""
+    timezones.available_timezones()
+    # Exercise the model validators so the first request doesn't pay for it
+    create_new_month_entry(generate_tracker_base_entry("warmup", "UTC"), "UTC")
+
+
+@bootstrap.on_restore
+def refresh_clients() -> None:
+    """Recreates the clients and caches that must not be shared between restores"""
+    global sqs_client
+
+    repository.reconnect()
+    if checkin_queue_url:
+        sqs_client = boto3.client("sqs")
+    persistence_layer.client = boto3.client("dynamodb")
+    capacity.instrument(persistence_layer.client)
+
+    http_client.client.close()
+    checkin_cache.clear()
+    rate_limiter.clear()
+
+    get_country_codes.cache_clear()
+    try:
+        get_country_codes()
+    except http_client.HttpClientError:
+        logger.warning("Unable to prefetch country codes, will retry on use")
+
+
+bootstrap.run_init()
 
 
 @logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
 def handler(event: dict, context: LambdaContext):
     """Handles HTTP requests and sends it to the router"""
+    started = time.perf_counter()
     idempotency_config.register_lambda_context(context)
-    return app.resolve(event, context)
+    with capacity.measure() as consumed:
+        response = app.resolve(event, context)
+    log_config.log_request(logger, event, response, started, consumed, app.matched_rule)
+    return response
@@ -0,0 +1,339 @@
+import json
+import os
+from calendar import monthrange
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
+
+import boto3
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from boto3.dynamodb.conditions import Attr, Key
+
+import storage
+from models import ArchivedMonth, MonthRecord, YearSummary
+
+# Months are archived once they are this many months old, which must be longer than
+# the check-in events are kept so that the compactor never targets an archived month
+ARCHIVE_AFTER_MONTHS = int(os.environ.get("ARCHIVE_AFTER_MONTHS", 12))
+ARCHIVE_BUCKET = os.environ.get("RTO_ARCHIVE_BUCKET")
+ARCHIVE_PREFIX = "sum#"
+
+# Stands in for the IP address of an attended day once the month has been archived
+ARCHIVED_DAY = "archived"
+
+# Once an invocation has less than this much time left, it hands the rest of the
+# users over to a new invocation rather than timing out part way through the table
+HANDOFF_MILLIS = int(os.environ.get("ARCHIVE_HANDOFF_MILLIS", 2 * 60 * 1000))
+SCAN_PAGE_SIZE = int(os.environ.get("ARCHIVE_SCAN_PAGE_SIZE", 500))
+# Summaries that lose the race with another write are re-read this many times in total
+SAVE_ATTEMPTS = 3
+
+tracker_table = boto3.resource("dynamodb").Table(
+    os.environ.get("RTO_TABLE_NAME", "rto-table")
+)
+
+logger = Logger()
+
+
+def pack_days(days: Iterable[int]) -> int:
+    """Packs days of the month into a bitmap
+
+    Args:
+        days (Iterable[int]): The days of the month
+
+    Returns:
+        int: The bitmap, with bit n set for day n + 1
+    """
+    bitmap = 0
+    for day in days:
+        bitmap |= 1 << (day - 1)
+    return bitmap
+
+
+def unpack_days(bitmap: int) -> list[int]:
+    """Unpacks a bitmap created by pack_days
+
+    Args:
+        bitmap (int): The bitmap
+
+    Returns:
+        list[int]: The days of the month, in order
+    """
+    return [bit + 1 for bit in range(bitmap.bit_length()) if bitmap >> bit & 1]
+
+
+def summary_key(year: int | str) -> str:
+    """Gets the sort key of the yearly summary row
+
+    Args:
+        year (int | str): The year
+
+    Returns:
+        str: The sort key
+    """
+    return f"{ARCHIVE_PREFIX}{int(year):04d}"
+
+
+def summarise_month(month_record: MonthRecord) -> ArchivedMonth:
+    """Reduces a month row to what is needed to display it and evaluate its policy
+
+    Args:
+        month_record (MonthRecord): The month row
+
+    Returns:
+        ArchivedMonth: The summary of the month
+    """
+    attended = [int(day) for day, ip in month_record.days.items() if ip is not None]
+    return ArchivedMonth(
+        attended=len(attended),
+        office_days=pack_days(attended),
+        business_days=month_record.business_days,
+        holidays=month_record.holidays,
+        leave=month_record.leave,
+        version=month_record.version,
+    )
+
+
+def restore_month(guid: str, month: str, archived: ArchivedMonth) -> MonthRecord:
+    """Rebuilds a month row from its summary
+
+    The IP addresses and the first and last seen times are not kept in the summary,
+    they are only available from the export.
+
+    Args:
+        guid (str): The GUID of the user
+        month (str): The month in the YYYY-MM format
+        archived (ArchivedMonth): The summary of the month
+
+    Returns:
+        MonthRecord: The month row
+    """
+    year, month_number = (int(part) for part in month.split("-"))
+    attended = set(unpack_days(archived.office_days))
+    return MonthRecord(
+        id=guid,
+        month=month,
+        days={
+            str(day): ARCHIVED_DAY if day in attended else None
+            for day in range(1, monthrange(year, month_number)[1] + 1)
+        },
+        business_days=archived.business_days,
+        holidays=archived.holidays,
+        leave=archived.leave,
+        version=archived.version,
+    )
+
+
+def restore_months(summary: YearSummary) -> dict[str, MonthRecord]:
+    """Rebuilds every month row held by a yearly summary
+
+    Args:
+        summary (YearSummary): The yearly summary
+
+    Returns:
+        dict[str, MonthRecord]: The month rows, keyed by month
+    """
+    return {
+        month: restore_month(summary.id, month, archived)
+        for month, archived in sorted(summary.months.items())
+    }
+
+
+def get_archived_month(
+    repository: storage.Repository, guid: str, month: str
+) -> MonthRecord | None:
+    """Gets an archived month row from the yearly summary
+
+    Args:
+        repository (storage.Repository): The repository to read from
+        guid (str): The GUID of the user
+        month (str): The month in the YYYY-MM format
+
+    Returns:
+        MonthRecord | None: The month row, if it has been archived
+    """
+    summary_row = repository.get_month(guid, summary_key(month[:4]))
+    if summary_row is None:
+        return None
+
+    archived = YearSummary(**summary_row).months.get(month)
+    return restore_month(guid, month, archived) if archived else None
+
+
+def archive_cutoff(now: datetime | None = None) -> str:
+    """Gets the oldest month that is kept as a month row
+
+    Args:
+        now (datetime | None): The current time, defaults to now in UTC
+
+    Returns:
+        str: The month in the YYYY-MM format
+    """
+    now = now or datetime.now(timezone.utc)
+    months = now.year * 12 + now.month - 1 - ARCHIVE_AFTER_MONTHS
+    return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+
+def export_months(guid: str, year: str, month_records: list[MonthRecord]) -> str:
+    """Exports the full month rows to S3 as newline delimited JSON
+
+    Args:
+        guid (str): The GUID of the user
+        year (str): The year of the month rows
+        month_records (list[MonthRecord]): The month rows
+
+    Returns:
+        str: The key of the exported object
+    """
+    key = f"{guid}/{year}/{month_records[0].month}_{month_records[-1].month}.ndjson"
+    boto3.client("s3").put_object(
+        Bucket=ARCHIVE_BUCKET,
+        Key=key,
+        Body="\n".join(record.json() for record in month_records).encode(),
+        ContentType="application/x-ndjson",
+    )
+    return key
+
+
+def save_summary(guid: str, year: str, month_records: list[MonthRecord]) -> None:
+    """Adds month rows to the yearly summary
+
+    Args:
+        guid (str): The GUID of the user
+        year (str): The year of the month rows
+        month_records (list[MonthRecord]): The month rows
+
+    Raises:
+        ConditionalCheckFailedException: When the summary kept changing underneath
+            every attempt
+    """
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        summary_row = tracker_table.get_item(
+            Key={"id": guid, "month": summary_key(year)}
+        )
+        summary = (
+            YearSummary(**summary_row["Item"])
+            if "Item" in summary_row
+            else YearSummary(id=guid, month=summary_key(year))
+        )
+
+        previous_version = summary.version
+        for month_record in month_records:
+            summary.months[month_record.month] = summarise_month(month_record)
+        summary.version += 1
+
+        try:
+            tracker_table.put_item(
+                Item=summary.dict(),
+                ConditionExpression="attribute_not_exists(version) OR "
+                "version = :version",
+                ExpressionAttributeValues={":version": previous_version},
+            )
+        except tracker_table.meta.client.exceptions.ConditionalCheckFailedException:
+            if attempt == SAVE_ATTEMPTS:
+                raise
+        else:
+            return
+
+
+def archive_user(guid: str, cutoff: str) -> int:
+    """Moves the user's month rows older than the cutoff into yearly summaries
+
+    The summary is written before the month rows are deleted, so an interrupted run
+    can safely be repeated.
+
+    Args:
+        guid (str): The GUID of the user
+        cutoff (str): The oldest month to keep, in the YYYY-MM format
+
+    Returns:
+        int: The number of month rows archived
+    """
+    years: dict[str, list[MonthRecord]] = defaultdict(list)
+    # Month rows sort before the base, event and summary rows
+    query = {"KeyConditionExpression": Key("id").eq(guid) & Key("month").lt(cutoff)}
+    while True:
+        response = tracker_table.query(**query)
+        for item in response["Items"]:
+            years[item["month"][:4]].append(MonthRecord(**item))
+        if "LastEvaluatedKey" not in response:
+            break
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    archived = 0
+    for year, month_records in years.items():
+        if ARCHIVE_BUCKET:
+            export_months(guid, year, month_records)
+        save_summary(guid, year, month_records)
+
+        with tracker_table.batch_writer() as batch:
+            for month_record in month_records:
+                batch.delete_item(Key={"id": guid, "month": month_record.month})
+        archived += len(month_records)
+
+    return archived
+
+
+def get_users(cursor: dict[str, str] | None = None) -> Iterator[str]:
+    """Gets the GUID of every user
+
+    Args:
+        cursor (dict[str, str] | None): The key of the base row to continue the
+            scan after, defaults to the start of the table
+
+    Yields:
+        Iterator[str]: The GUID of a user
+    """
+    scan: dict[str, Any] = {
+        "FilterExpression": Attr("month").eq("_base"),
+        "ProjectionExpression": "id",
+        "Limit": SCAN_PAGE_SIZE,
+    }
+    if cursor:
+        scan["ExclusiveStartKey"] = cursor
+    while True:
+        response = tracker_table.scan(**scan)
+        for item in response["Items"]:
+            yield item["id"]
+        if "LastEvaluatedKey" not in response:
+            return
+        scan["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def hand_off(context: LambdaContext, cutoff: str, cursor: dict[str, str]) -> None:
+    """Continues the archival in a new invocation of this function
+
+    Args:
+        context (LambdaContext): The context of the current invocation
+        cutoff (str): The cutoff of the current run, kept so a run that spans the
+            start of a month is consistent
+        cursor (dict[str, str]): The key of the last user that was archived
+    """
+    boto3.client("lambda").invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps({"cutoff": cutoff, "cursor": cursor}).encode(),
+    )
+
+
+@logger.inject_lambda_context
+def handler(event: dict, context: LambdaContext):
+    """Handles the scheduled archival of old month rows
+
+    A table too large to archive in one invocation is archived by a chain of them,
+    each continuing the scan from where the previous one handed off.
+    """
+    cutoff = event.get("cutoff") or archive_cutoff()
+    archived = 0
+    for guid in get_users(event.get("cursor")):
+        archived += archive_user(guid, cutoff)
+        if context.get_remaining_time_in_millis() < HANDOFF_MILLIS:
+            cursor = {"id": guid, "month": "_base"}
+            hand_off(context, cutoff, cursor)
+            logger.info(
+                "Handed off archival", cutoff=cutoff, archived=archived, cursor=cursor
+            )
+            return
+
+    logger.info("Archived month rows", cutoff=cutoff, archived=archived)
@@ -0,0 +1,244 @@
+"""Serves the API as an ASGI application, for deployments outside of Lambda
+
+Run with an ASGI server such as `uvicorn asgi:app --workers 4 --proxy-headers`
+from the src directory. Each worker process keeps its own connections and caches,
+which are shared by every request that the worker serves. Requests are resolved
+at the same time on the default thread pool, as the storage and HTTP clients block.
+
+The routes, the repository and the HTTP client are shared with the Lambda function
+and are synchronous, so only the ASGI layer itself is async. A request holds a
+thread while it waits on DynamoDB or ip-api.com, which bounds the requests a worker
+resolves at the same time to the size of its thread pool.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qsl
+
+import apigw
+import bootstrap
+import capacity
+import coalescer
+import http_client
+import log_config
+import storage
+
+# The longest a request may take, standing in for the Lambda timeout
+REQUEST_TIMEOUT = float(os.environ.get("ASGI_REQUEST_TIMEOUT", 30))
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class RequestContext:
+    """The parts of the Lambda context that the API uses"""
+
+    timeout: float = REQUEST_TIMEOUT
+    function_name: str = "rtoapp-asgi"
+    memory_limit_in_mb: int = 0
+    invoked_function_arn: str = ""
+    aws_request_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    started: float = field(default_factory=time.monotonic)
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(int((self.started + self.timeout - time.monotonic()) * 1000), 0)
+
+
+def to_event(scope: Scope, body: bytes, request_id: str) -> dict[str, Any]:
+    """Converts an ASGI HTTP request into an API Gateway REST proxy event
+
+    Args:
+        scope (Scope): The ASGI connection scope
+        body (bytes): The request body
+        request_id (str): The ID of the request
+
+    Returns:
+        dict[str, Any]: The event
+    """
+    headers: dict[str, list[str]] = {}
+    for name, value in scope["headers"]:
+        headers.setdefault(name.decode("latin-1"), []).append(value.decode("latin-1"))
+
+    query: dict[str, list[str]] = {}
+    for name, value in parse_qsl(
+        scope["query_string"].decode(), keep_blank_values=True
+    ):
+        query.setdefault(name, []).append(value)
+
+    client = scope.get("client")
+    return {
+        "resource": "/{proxy+}",
+        "path": scope["path"],
+        "httpMethod": scope["method"],
+        "headers": {name: values[-1] for name, values in headers.items()},
+        "multiValueHeaders": headers,
+        "queryStringParameters": {name: values[-1] for name, values in query.items()}
+        or None,
+        "multiValueQueryStringParameters": query or None,
+        "pathParameters": None,
+        "requestContext": {
+            "requestId": request_id,
+            "path": scope["path"],
+            "httpMethod": scope["method"],
+            "identity": {"sourceIp": client[0] if client else None},
+        },
+        "body": body.decode() if body else None,
+        "isBase64Encoded": False,
+    }
+
+
+def resolve(event: dict[str, Any], context: RequestContext) -> dict[str, Any]:
+    """Resolves an event with the API's routes
+
+    Args:
+        event (dict[str, Any]): The API Gateway REST proxy event
+        context (RequestContext): The context of the request
+
+    Returns:
+        dict[str, Any]: The API Gateway proxy response
+    """
+    started = time.perf_counter()
+    writes: list[apigw.DeferredWrite] = []
+    token = apigw.deferred_writes.set(writes)
+    try:
+        with capacity.measure() as consumed:
+            apigw.idempotency_config.register_lambda_context(context)
+            response = apigw.app.resolve(event, context)
+    finally:
+        apigw.deferred_writes.reset(token)
+
+    # Waited for once the request is resolved, so that the writes of other requests
+    # resolved meanwhile can join the same flush
+    failed = False
+    for write in writes:
+        try:
+            status_code = apigw.settle_write(write)
+        except Exception:
+            apigw.logger.exception("Failed to write a buffered write")
+            failed = True
+            continue
+        if status_code is not None:
+            response["statusCode"] = status_code
+    if failed:
+        response = server_error_response(response)
+    log_config.log_request(
+        apigw.logger, event, response, started, consumed, apigw.app.matched_rule
+    )
+    return response
+
+
+def server_error_response(response: dict[str, Any]) -> dict[str, Any]:
+    """Replaces a resolved response once its buffered writes have failed
+
+    Args:
+        response (dict[str, Any]): The API Gateway proxy response
+
+    Returns:
+        dict[str, Any]: A JSON 500 response, keeping the CORS headers
+    """
+    headers = {
+        name: values
+        for name, values in (response.get("multiValueHeaders") or {}).items()
+        if name.lower().startswith("access-control-")
+    }
+    headers["Content-Type"] = ["application/json"]
+    return {
+        "statusCode": 500,
+        "multiValueHeaders": headers,
+        "body": json.dumps({"error": "Internal Server Error"}),
+        "isBase64Encoded": False,
+    }
+
+
+def create_coalescer(repository: storage.Repository) -> coalescer.WriteCoalescer:
+    """Creates the write coalescer of the check-ins resolved by this worker
+
+    Args:
+        repository (storage.Repository): The repository to write to
+
+    Returns:
+        coalescer.WriteCoalescer: The coalescer
+    """
+    return coalescer.WriteCoalescer(repository)
+
+
+async def lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Each worker is a fresh process, like a restored Lambda environment
+            await asyncio.to_thread(bootstrap.run_restore)
+            if coalescer.COALESCE_SECONDS > 0:
+                apigw.write_coalescer = create_coalescer(apigw.repository)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if apigw.write_coalescer is not None:
+                await asyncio.to_thread(apigw.write_coalescer.close)
+            http_client.client.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    """The ASGI application"""
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported scope type: {scope['type']}")
+
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    context = RequestContext()
+    event = to_event(scope, body, context.aws_request_id)
+    response = await asyncio.to_thread(resolve, event, context)
+
+    response_headers = dict(response.get("multiValueHeaders") or {})
+    for name, value in (response.get("headers") or {}).items():
+        response_headers.setdefault(name, [value])
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, values in response_headers.items()
+        for value in values
+    ]
+    response_body = response.get("body") or ""
+    if response.get("isBase64Encoded"):
+        response_body = base64.b64decode(response_body)
+    elif isinstance(response_body, str):
+        response_body = response_body.encode()
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": int(response["statusCode"]),
+            "headers": headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": response_body})
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Install uvicorn to serve the API, pip install uvicorn")
+
+    uvicorn.run(
+        "asgi:app",
+        host=os.environ.get("ASGI_HOST", "127.0.0.1"),
+        port=int(os.environ.get("ASGI_PORT", 8000)),
+        workers=int(os.environ.get("ASGI_WORKERS", os.cpu_count() or 1)),
+        proxy_headers=True,
+    )
@@ -0,0 +1,86 @@
+"""Measures the request rate of the API routes without AWS
+
+Run from the src directory with `python benchmarks/bench_api.py [memory|sqlite]`.
+The routes are called through the Lambda handler against the in-memory or SQLite
+storage backend, so the results exclude API Gateway and network latency.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+os.environ["RTO_STORAGE"] = sys.argv[1] if len(sys.argv) > 1 else "memory"
+os.environ.setdefault("RTO_SQLITE_PATH", str(Path(tempfile.mkdtemp()) / "rto.sqlite3"))
+# Signups are not benchmarked, so the DynamoDB idempotency store is never needed
+os.environ["POWERTOOLS_IDEMPOTENCY_DISABLED"] = "1"
+os.environ.setdefault("CHECKIN_RATE_CAPACITY", "1000000")
+
+REQUESTS = 2000
+USERS = 200
+
+
+@dataclass
+class LambdaContext:
+    function_name: str = "apigw"
+    memory_limit_in_mb: int = 128
+    invoked_function_arn: str = (
+        "arn:aws:lambda:ap-southeast-2:123456789012:function:apigw"
+    )
+    aws_request_id: str = "FB48BB8B-FD74-40D2-83F8-5E289249C4C0".lower()
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 30000
+
+
+def event(method: str, path: str) -> dict:
+    return {
+        "path": path,
+        "httpMethod": method,
+        "requestContext": {
+            "identity": {"sourceIp": "1.2.3.4"},
+            "requestId": str(uuid.uuid4()),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import apigw
+    from tracker import generate_tracker_base_entry, get_current_date
+
+    users = [str(uuid.uuid4()) for _ in range(USERS)]
+    for guid in users:
+        base_row = generate_tracker_base_entry(guid, "Australia/Sydney")
+        base_row.office_ips = ["1.2.3.4"]
+        month_row = apigw.create_new_month_entry(base_row, base_row.timezone)
+        apigw.repository.batch_put([base_row.dict(), month_row.dict()])
+
+    dt = get_current_date("Australia/Sydney")
+    routes = {
+        "GET /dashboard/<guid>": ("GET", "/dashboard/{guid}"),
+        "GET /dashboard/<guid>/<year>/<month>": (
+            "GET",
+            f"/dashboard/{{guid}}/{dt.year}/{dt.month}",
+        ),
+        "GET /stats/<guid>/<year>/<month>": (
+            "GET",
+            f"/stats/{{guid}}/{dt.year}/{dt.month}",
+        ),
+        "POST /checkin/<guid>": ("POST", "/checkin/{guid}"),
+    }
+
+    context = LambdaContext()
+    print(f"storage backend: {os.environ['RTO_STORAGE']}")
+    for name, (method, path) in routes.items():
+        started = time.perf_counter()
+        for index in range(REQUESTS):
+            guid = users[index % USERS]
+            response = apigw.handler(event(method, path.format(guid=guid)), context)
+            assert response["statusCode"] < 300, response
+        elapsed = time.perf_counter() - started
+        print(f"{name:<40} {REQUESTS / elapsed:>10.0f} req/s")
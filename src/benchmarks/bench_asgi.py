@@ -0,0 +1,97 @@
+"""Compares the ASGI application with Lambda event emulation on the same machine
+
+Run from the src directory with `python benchmarks/bench_asgi.py [memory|sqlite]`.
+Both modes run in-process against a local storage backend, so the results show
+the overhead of each entry point rather than of a server or the network.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+os.environ["RTO_STORAGE"] = sys.argv[1] if len(sys.argv) > 1 else "memory"
+os.environ.setdefault("RTO_SQLITE_PATH", str(Path(tempfile.mkdtemp()) / "rto.sqlite3"))
+os.environ["POWERTOOLS_IDEMPOTENCY_DISABLED"] = "1"
+os.environ.setdefault("CHECKIN_RATE_CAPACITY", "1000000")
+
+REQUESTS = 2000
+CONCURRENCY = 50
+USERS = 200
+
+
+def lambda_mode(paths: list[str]) -> float:
+    import apigw
+    import asgi
+
+    started = time.perf_counter()
+    for path in paths:
+        event = {
+            "path": path,
+            "httpMethod": "GET",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": str(uuid.uuid4()),
+            },
+        }
+        apigw.handler(event, asgi.RequestContext())
+    return time.perf_counter() - started
+
+
+async def asgi_request(path: str, query: str = "") -> int:
+    import asgi
+
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [],
+        "client": ("1.2.3.4", 50000),
+    }
+    await asgi.app(scope, receive, send)
+    return sent[0]["status"]
+
+
+async def asgi_mode(paths: list[str]) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(path: str):
+        async with semaphore:
+            return await asgi_request(path)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(bounded(path) for path in paths))
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    import apigw
+    from tracker import generate_tracker_base_entry
+
+    users = [str(uuid.uuid4()) for _ in range(USERS)]
+    for guid in users:
+        base_row = generate_tracker_base_entry(guid, "Australia/Sydney")
+        month_row = apigw.create_new_month_entry(base_row, base_row.timezone)
+        apigw.repository.batch_put([base_row.dict(), month_row.dict()])
+
+    paths = [f"/dashboard/{users[index % USERS]}" for index in range(REQUESTS)]
+
+    print(f"storage backend: {os.environ['RTO_STORAGE']}")
+    elapsed = lambda_mode(paths)
+    print(f"{'lambda event emulation':<40} {REQUESTS / elapsed:>10.0f} req/s")
+    elapsed = asyncio.run(asgi_mode(paths))
+    print(f"{'asgi':<40} {REQUESTS / elapsed:>10.0f} req/s")
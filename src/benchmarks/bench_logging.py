@@ -0,0 +1,74 @@
+"""Measures the handler CPU time of each logging profile
+
+Run from the src directory with `python benchmarks/bench_logging.py [memory|sqlite]`.
+Each profile runs in its own process, since the profile is read when the API is
+imported, and the logs are discarded so that only the cost of producing them is
+measured.
+"""
+
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bench_api import USERS, LambdaContext, event
+
+REQUESTS = 5000
+
+PROFILES = {
+    "development": {"LOG_PROFILE": "development"},
+    "production": {"LOG_PROFILE": "production"},
+    "off": {
+        "LOG_PROFILE": "production",
+        "LOG_SAMPLE_RATE": "0",
+        "POWERTOOLS_LOG_LEVEL": "WARNING",
+    },
+}
+
+
+def run_profile() -> None:
+    """Times the dashboard and check-in routes in the current process"""
+    import apigw
+    from tracker import generate_tracker_base_entry
+
+    users = [str(uuid.uuid4()) for _ in range(USERS)]
+    for guid in users:
+        base_row = generate_tracker_base_entry(guid, "Australia/Sydney")
+        base_row.office_ips = ["1.2.3.4"]
+        month_row = apigw.create_new_month_entry(base_row, base_row.timezone)
+        apigw.repository.batch_put([base_row.dict(), month_row.dict()])
+
+    context = LambdaContext()
+    for method, path in (("GET", "/dashboard/{guid}"), ("POST", "/checkin/{guid}")):
+        for i in range(100):
+            apigw.handler(event(method, path.format(guid=users[i % USERS])), context)
+        started = time.process_time()
+        for i in range(REQUESTS):
+            apigw.handler(event(method, path.format(guid=users[i % USERS])), context)
+        elapsed = time.process_time() - started
+        print(
+            f"{method} {path}: {elapsed / REQUESTS * 1e6:8.1f} us CPU/request",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    if os.environ.get("BENCH_LOGGING_PROFILE"):
+        run_profile()
+        sys.exit()
+
+    storage = sys.argv[1] if len(sys.argv) > 1 else "memory"
+    print(f"storage backend: {storage}, {REQUESTS} requests per route")
+    for name, profile_env in PROFILES.items():
+        print(f"profile: {name}", flush=True)
+        env = {**os.environ, **profile_env, "BENCH_LOGGING_PROFILE": name}
+        env.pop("IS_DEV", None)
+        subprocess.run(
+            [sys.executable, __file__, storage],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
@@ -0,0 +1,63 @@
+"""Performance regression suite for the tracker and statistics maths
+
+Run from the src directory against the stored baseline with
+
+    pytest benchmarks/bench_policy.py --benchmark-storage=benchmarks/.benchmarks \\
+        --benchmark-compare=0001 --benchmark-compare-fail=mean:25%
+
+and store a new baseline with --benchmark-save=baseline. Baselines are kept per
+machine, so the comparison only runs on the machine the baseline was saved on.
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import policy
+from models import BaseRecord, BaseRecordHolidays
+from tracker import generate_tracker_month_entry, get_month_holidays
+
+BASE_RECORD = BaseRecord(
+    id="guid",
+    timezone="Australia/Sydney",
+    created_at="2024-01-01",
+    holidays={
+        f"2024-{month:02d}-{day:02d}": BaseRecordHolidays(
+            name="Holiday", is_global=day % 2 == 0, counties=["AU-NSW"]
+        )
+        for month in range(1, 13)
+        for day in (1, 10, 20)
+    },
+)
+
+
+def attended_month(version: int = 0):
+    month_record = generate_tracker_month_entry("guid", 2024, 5)
+    month_record.holidays = get_month_holidays(BASE_RECORD, month_record.month)
+    for day in range(1, 32, 2):
+        month_record.days[str(day)] = "1.2.3.4"
+    month_record.version = version
+    return month_record
+
+
+def describe_tracker():
+    def generate_month_entry(benchmark):
+        benchmark(generate_tracker_month_entry, "guid", 2024, 5)
+
+    def filter_month_holidays(benchmark):
+        benchmark(get_month_holidays, BASE_RECORD, "2024-05")
+
+
+def describe_policy():
+    def evaluate_uncached_month(benchmark):
+        month_record = attended_month()
+        benchmark(policy.evaluate_month, BASE_RECORD, month_record, date(2024, 5, 15))
+
+    def evaluate_cached_month(benchmark):
+        month_record = attended_month(version=1)
+        benchmark(policy.evaluate_month, BASE_RECORD, month_record, date(2024, 5, 15))
+
+    def evaluate_year(benchmark):
+        month_records = [attended_month() for _ in range(12)]
+        benchmark(policy.evaluate_months, BASE_RECORD, month_records, date(2024, 5, 15))
@@ -0,0 +1,78 @@
+"""Measures the stats, rollup and export paths against years of synthetic history
+
+Run from the src directory with `python benchmarks/bench_scale.py [memory|sqlite]`.
+Users with five years of history are generated by `synthetic.py`, with every month
+older than a year rolled into yearly summaries as the archiver would leave them.
+"""
+
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+from bench_api import LambdaContext, event
+
+USERS = 1000
+YEARS = 5
+SAMPLE = 200
+
+
+def timed(name: str, count: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    print(f"{name:<40} {count / elapsed:>10.0f} /s")
+
+
+if __name__ == "__main__":
+    import synthetic
+
+    import apigw
+    import archive
+    from models import MonthRecord
+
+    config = synthetic.DatasetConfig(
+        users=USERS, years=YEARS, archive_after_months=archive.ARCHIVE_AFTER_MONTHS
+    )
+    started = time.perf_counter()
+    users = list(synthetic.generate(config))
+    timed("generated rows", sum(len(rows) for rows in users), started)
+    started = time.perf_counter()
+    rows = synthetic.load(apigw.repository, users)
+    timed("loaded rows", rows, started)
+
+    # Users that signed up before the archived years, so every path has data
+    guids = [
+        rows[-1]["id"]
+        for rows in users
+        if rows[-1]["created_at"] < f"{date.today().year - 2}-01-01"
+    ][:SAMPLE]
+    context = LambdaContext()
+    this_year = date.today().year
+    for name, year in (
+        ("year stats, month rows", this_year),
+        ("year stats, archived", this_year - 2),
+    ):
+        started = time.perf_counter()
+        for guid in guids:
+            response = apigw.handler(event("GET", f"/stats/{guid}/{year}"), context)
+            assert response["statusCode"] == 200, response
+        timed(name, len(guids), started)
+
+    month_records = {
+        guid: [MonthRecord(**row) for row in apigw.repository.query_months(guid, "2")]
+        for guid in guids
+    }
+    months = sum(len(records) for records in month_records.values())
+
+    started = time.perf_counter()
+    for records in month_records.values():
+        for record in records:
+            archive.summarise_month(record)
+    timed("rolled up months", months, started)
+
+    started = time.perf_counter()
+    for records in month_records.values():
+        "\n".join(record.json() for record in records).encode()
+    timed("exported months", months, started)
@@ -0,0 +1,43 @@
+"""Micro-benchmark of signup timezone validation and check-in date resolution
+
+Run from the src directory with `python benchmarks/bench_timezones.py`
+"""
+
+import sys
+import timeit
+import zoneinfo
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import timezones
+
+TIMEZONE = "Australia/Sydney"
+
+
+def validate_uncached():
+    return TIMEZONE in zoneinfo.available_timezones()
+
+
+def validate_cached():
+    return timezones.is_valid_timezone(TIMEZONE)
+
+
+def resolve_date_uncached():
+    return datetime.now(zoneinfo.ZoneInfo(TIMEZONE)).date()
+
+
+def resolve_date_cached():
+    return timezones.local_now(TIMEZONE).date()
+
+
+def report(name: str, func, number: int) -> None:
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"{name:<28} {seconds / number * 1_000_000:>12.2f} us/call")
+
+
+if __name__ == "__main__":
+    report("validate (per request)", validate_uncached, 20)
+    report("validate (cached set)", validate_cached, 100_000)
+    report("local date (new ZoneInfo)", resolve_date_uncached, 100_000)
+    report("local date (memoised)", resolve_date_cached, 100_000)
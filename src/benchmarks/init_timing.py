@@ -0,0 +1,32 @@
+"""Reports how long each phase of the API's initialisation takes
+
+Run from the src directory with `python benchmarks/init_timing.py`. The restore
+phase makes network calls, pass `--no-restore` to only time the first phase.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+
+
+def report(phase: str, total: float, timings: dict[str, float]) -> None:
+    print(f"{phase:<40} {total * 1000:>10.2f} ms")
+    for hook, seconds in timings.items():
+        print(f"  {hook:<38} {seconds * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    import apigw  # noqa: F401
+    import bootstrap
+
+    report("imports + init", time.perf_counter() - started, bootstrap.timings["init"])
+
+    if "--no-restore" not in sys.argv:
+        started = time.perf_counter()
+        bootstrap.run_restore()
+        report("restore", time.perf_counter() - started, bootstrap.timings["restore"])
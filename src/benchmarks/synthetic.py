@@ -0,0 +1,498 @@
+"""Generates realistic users and loads them into a storage backend for scale testing
+
+Run from the src directory with
+`python benchmarks/synthetic.py --users 100000 --years 5 --backend sqlite`. Use
+`--backend dynamodb --create-table` with `AWS_ENDPOINT_URL_DYNAMODB` pointing at
+DynamoDB Local, or `--backend moto` to load an in-process mock. The same seed always
+generates the same dataset, and benchmarks can import `generate` and `load` to build
+their own fixtures.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from calendar import monthrange
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from functools import cache, partial
+from pathlib import Path
+from typing import Iterable, Iterator
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+
+import archive
+import storage
+from models import BaseRecord, BaseRecordHolidays, MonthRecord, YearSummary
+from tracker import generate_tracker_month_entry, get_month_holidays
+
+# The chance of attending the office on each weekday, from Monday to Friday
+PATTERNS: dict[str, tuple[float, ...]] = {
+    "office": (0.9, 0.9, 0.9, 0.9, 0.85),
+    "hybrid": (0.3, 0.85, 0.85, 0.8, 0.15),
+    "irregular": (0.4, 0.4, 0.4, 0.4, 0.4),
+    "remote": (0.02, 0.05, 0.05, 0.05, 0.02),
+}
+
+# The timezone and regions that regional holidays apply to, of each country
+COUNTRIES: dict[str, tuple[str, list[str]]] = {
+    "Australia": ("Australia/Sydney", ["AU-NSW", "AU-VIC", "AU-QLD", "AU-WA"]),
+    "New Zealand": ("Pacific/Auckland", ["NZ-AUK", "NZ-WGN", "NZ-CAN"]),
+    "United Kingdom": ("Europe/London", ["GB-ENG", "GB-SCT", "GB-WLS"]),
+    "United States": ("America/New_York", ["US-NY", "US-CA", "US-TX"]),
+    "Singapore": ("Asia/Singapore", []),
+}
+
+BUSINESS_DAYS_PER_YEAR = 250
+# The users generated from each seed, and by each process at a time
+CHUNK_USERS = 100
+
+
+@dataclass
+class DatasetConfig:
+    """The shape of a generated dataset"""
+
+    users: int = 1000
+    # The months of history, counted back from the end date
+    years: int = 5
+    patterns: dict[str, float] = field(
+        default_factory=lambda: {
+            "hybrid": 0.6,
+            "office": 0.15,
+            "irregular": 0.15,
+            "remote": 0.1,
+        }
+    )
+    countries: dict[str, float] = field(
+        default_factory=lambda: {
+            "Australia": 0.6,
+            "New Zealand": 0.1,
+            "United Kingdom": 0.15,
+            "United States": 0.1,
+            "Singapore": 0.05,
+        }
+    )
+    holidays_per_year: int = 12
+    # The share of the holidays that only apply to some regions of a country
+    regional_holidays: float = 0.3
+    leave_days_per_year: int = 20
+    # Months older than this are rolled into yearly summaries, as the archiver does
+    archive_after_months: int | None = None
+    seed: int = 0
+    end: date = field(default_factory=date.today)
+
+
+def parse_weights(value: str) -> dict[str, float]:
+    """Parses weights given on the command line, such as "hybrid=3,remote=1"
+
+    Args:
+        value (str): The comma separated name=weight pairs
+
+    Returns:
+        dict[str, float]: The weights keyed by name
+    """
+    weights = {}
+    for pair in value.split(","):
+        name, _, weight = pair.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+@cache
+def holiday_calendar(
+    seed: int, holidays_per_year: int, regional_holidays: float, country: str, year: int
+) -> dict[str, BaseRecordHolidays]:
+    """Generates the public holidays of a country, the same for every user
+
+    Args:
+        seed (int): The seed of the dataset
+        holidays_per_year (int): The number of holidays
+        regional_holidays (float): The share of the holidays that are regional
+        country (str): The country
+        year (int): The year
+
+    Returns:
+        dict[str, BaseRecordHolidays]: The holidays keyed by ISO date
+    """
+    rng = random.Random(f"{seed}:{country}:{year}")
+    counties = COUNTRIES[country][1]
+    holidays = {
+        f"{year}-01-01": BaseRecordHolidays(
+            name="New Year's Day", is_global=True, counties=None
+        ),
+        f"{year}-12-25": BaseRecordHolidays(
+            name="Christmas Day", is_global=True, counties=None
+        ),
+    }
+    while len(holidays) < holidays_per_year:
+        month = rng.randint(1, 12)
+        day = date(year, month, rng.randint(1, monthrange(year, month)[1]))
+        regional = counties and rng.random() < regional_holidays
+        holidays.setdefault(
+            day.isoformat(),
+            BaseRecordHolidays(
+                name=f"Holiday {len(holidays) + 1}",
+                is_global=not regional,
+                counties=(
+                    rng.sample(counties, rng.randint(1, len(counties)))
+                    if regional
+                    else None
+                ),
+            ),
+        )
+    return holidays
+
+
+def _choose(rng: random.Random, weights: dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _months(start: date, end: date) -> Iterator[tuple[int, int]]:
+    for index in range(start.year * 12 + start.month - 1, end.year * 12 + end.month):
+        yield index // 12, index % 12 + 1
+
+
+def generate_month(
+    rng: random.Random,
+    base_record: BaseRecord,
+    year: int,
+    month: int,
+    pattern: tuple[float, ...],
+    leave_rate: float,
+    first: date,
+    last: date,
+) -> MonthRecord:
+    """Generates a month row as check-ins and leave would have filled it in
+
+    Args:
+        rng (random.Random): The random number generator of the user
+        base_record (BaseRecord): The user's base row, holding the year's holidays
+        year (int): The year
+        month (int): The month
+        pattern (tuple[float, ...]): The chance of attending on each weekday
+        leave_rate (float): The chance of being on leave on a business day
+        first (date): The first day the user could check in
+        last (date): The last day of the dataset
+
+    Returns:
+        MonthRecord: The month row
+    """
+    month_record = generate_tracker_month_entry(base_record.id, year, month)
+    month_record.holidays = get_month_holidays(base_record, f"{year}-{month:02d}")
+    for day in list(month_record.days):
+        dt = date(year, month, int(day))
+        if dt.weekday() >= 5 or dt.isoformat() in month_record.holidays:
+            continue
+        if rng.random() < leave_rate:
+            month_record.leave[day] = "Annual leave"
+            month_record.version += 1
+            continue
+        if not first <= dt <= last or rng.random() >= pattern[dt.weekday()]:
+            continue
+
+        month_record.days[day] = base_record.office_ips[0]
+        month_record.first_seen[day] = f"08:{rng.randint(0, 59):02d}:00"
+        month_record.last_seen[day] = f"17:{rng.randint(0, 59):02d}:00"
+        month_record.version += 1
+    return month_record
+
+
+def generate_user(rng: random.Random, config: DatasetConfig) -> list[storage.Item]:
+    """Generates the base row and the history of a user
+
+    Args:
+        rng (random.Random): The random number generator
+        config (DatasetConfig): The dataset configuration
+
+    Returns:
+        list[storage.Item]: The rows of the user
+    """
+    guid = str(uuid.UUID(int=rng.getrandbits(128), version=4)).upper()
+    country = _choose(rng, config.countries)
+    timezone, counties = COUNTRIES[country]
+    pattern = PATTERNS[_choose(rng, config.patterns)]
+
+    # Users sign up at any point of the history
+    start_month = config.end.year * 12 + config.end.month - 1 - config.years * 12
+    created_month = rng.randint(start_month, start_month + config.years * 12)
+    created_year, created_month = created_month // 12, created_month % 12 + 1
+    created = date(
+        created_year,
+        created_month,
+        rng.randint(1, monthrange(created_year, created_month)[1]),
+    )
+    if created > config.end:
+        created = config.end
+
+    base_record = BaseRecord(
+        id=guid,
+        timezone=timezone,
+        created_at=created.isoformat(),
+        country=country,
+        county=rng.choice(counties) if counties else "",
+        office_ips=[f"203.0.113.{rng.randint(1, 254)}"],
+        percentage=rng.choice([40, 50, 60]),
+        rounding=rng.choice(["up", "down", "nearest"]),
+    )
+
+    leave_rate = config.leave_days_per_year / BUSINESS_DAYS_PER_YEAR
+    cutoff = None
+    if config.archive_after_months is not None:
+        months = (
+            config.end.year * 12 + config.end.month - 1 - config.archive_after_months
+        )
+        cutoff = f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+    rows: list[storage.Item] = []
+    summaries: dict[str, YearSummary] = {}
+    holiday_year = None
+    for year, month in _months(created, config.end):
+        # The base row ends up holding the holidays of the last year, like the API's
+        if year != holiday_year:
+            base_record.holidays = holiday_calendar(
+                config.seed,
+                config.holidays_per_year,
+                config.regional_holidays,
+                country,
+                year,
+            )
+            holiday_year = year
+        month_record = generate_month(
+            rng, base_record, year, month, pattern, leave_rate, created, config.end
+        )
+        if cutoff and month_record.month < cutoff:
+            summary = summaries.setdefault(
+                str(year),
+                YearSummary(id=guid, month=archive.summary_key(year), version=1),
+            )
+            summary.months[month_record.month] = archive.summarise_month(month_record)
+        else:
+            rows.append(month_record.dict())
+
+    rows.extend(summary.dict() for summary in summaries.values())
+    rows.append(base_record.dict())
+    return rows
+
+
+def generate_chunk(config: DatasetConfig, chunk: int) -> list[list[storage.Item]]:
+    """Generates the rows of a chunk of the users
+
+    Every chunk has its own seed, so the dataset is the same however many processes
+    generate it.
+
+    Args:
+        config (DatasetConfig): The dataset configuration
+        chunk (int): The index of the chunk
+
+    Returns:
+        list[list[storage.Item]]: The rows of each user of the chunk
+    """
+    rng = random.Random(f"{config.seed}:{chunk}")
+    users = min(CHUNK_USERS, config.users - chunk * CHUNK_USERS)
+    return [generate_user(rng, config) for _ in range(users)]
+
+
+def generate(config: DatasetConfig, processes: int = 1) -> Iterator[list[storage.Item]]:
+    """Generates the rows of every user of the dataset
+
+    Args:
+        config (DatasetConfig): The dataset configuration
+        processes (int): The number of processes generating users at once
+
+    Yields:
+        Iterator[list[storage.Item]]: The rows of a user
+    """
+    chunks = range(-(-config.users // CHUNK_USERS))
+    if processes <= 1:
+        for chunk in chunks:
+            yield from generate_chunk(config, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for users in executor.map(partial(generate_chunk, config), chunks):
+            yield from users
+
+
+def load(
+    repository: storage.Repository,
+    users: Iterable[list[storage.Item]],
+    workers: int = 8,
+    batch_size: int = storage.BATCH_WRITE_SIZE * 4,
+) -> int:
+    """Writes generated rows with parallel batch writes
+
+    Args:
+        repository (storage.Repository): The repository to load
+        users (Iterable[list[storage.Item]]): The rows of each user
+        workers (int): The number of batches written at once
+        batch_size (int): The rows written by each batch
+
+    Returns:
+        int: The number of rows written
+    """
+    written = 0
+    batch: list[storage.Item] = []
+    pending: set[Future] = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        def submit(rows: list[storage.Item]) -> None:
+            # Generation is only allowed to run a little ahead of the writes
+            while len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    pending.remove(future)
+            pending.add(executor.submit(repository.batch_put, rows))
+
+        for rows in users:
+            batch.extend(rows)
+            written += len(rows)
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+        for future in pending:
+            future.result()
+
+    return written
+
+
+def create_table(table_name: str = storage.table_name) -> None:
+    """Creates the tracker table, for DynamoDB Local and moto
+
+    Args:
+        table_name (str): The name of the table
+    """
+    client = storage.create_tables()[0].meta.client
+    if table_name in client.list_tables()["TableNames"]:
+        return
+    client.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "id", "KeyType": "HASH"},
+            {"AttributeName": "month", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "month", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+@contextmanager
+def open_repository(backend: str, create: bool = False) -> Iterator[storage.Repository]:
+    """Opens the repository of a storage backend to load a dataset into
+
+    Args:
+        backend (str): "dynamodb", "moto", "memory" or "sqlite"
+        create (bool): Whether to create the DynamoDB table if it does not exist
+
+    Yields:
+        Iterator[storage.Repository]: The repository
+    """
+    if backend != "moto":
+        if backend == "dynamodb" and create:
+            create_table()
+        # The SQLite database is RTO_SQLITE_PATH, so the API can be run against it
+        yield storage.create_repository(backend)
+        return
+
+    from moto import mock_aws
+
+    with mock_aws():
+        create_table()
+        yield storage.DynamoDBRepository()
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument(
+        "--backend",
+        choices=["dynamodb", "moto", "memory", "sqlite"],
+        default=os.environ.get("RTO_STORAGE", "sqlite"),
+    )
+    parser.add_argument(
+        "--create-table", action="store_true", help="create the DynamoDB table"
+    )
+    parser.add_argument(
+        "--patterns",
+        type=parse_weights,
+        help=f"weights of the attendance patterns: {', '.join(PATTERNS)}",
+    )
+    parser.add_argument(
+        "--countries",
+        type=parse_weights,
+        help=f"weights of the countries: {', '.join(COUNTRIES)}",
+    )
+    parser.add_argument("--holidays", type=int, default=12, help="holidays per year")
+    parser.add_argument(
+        "--regional-holidays",
+        type=float,
+        default=0.3,
+        help="share of the holidays that are regional",
+    )
+    parser.add_argument("--leave", type=int, default=20, help="leave days per year")
+    parser.add_argument(
+        "--archive-after", type=int, help="roll up months older than this"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="parallel writes")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="processes generating users",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> DatasetConfig:
+    config = DatasetConfig(
+        users=args.users,
+        years=args.years,
+        holidays_per_year=args.holidays,
+        regional_holidays=args.regional_holidays,
+        leave_days_per_year=args.leave,
+        archive_after_months=args.archive_after,
+        seed=args.seed,
+    )
+    if args.patterns:
+        config.patterns = args.patterns
+    if args.countries:
+        config.countries = args.countries
+    unknown = (set(config.patterns) - set(PATTERNS)) | (
+        set(config.countries) - set(COUNTRIES)
+    )
+    if unknown:
+        raise ValueError(f"Unknown patterns or countries: {', '.join(sorted(unknown))}")
+    return config
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    config = config_from_args(args)
+
+    with open_repository(args.backend, args.create_table) as repository:
+        started = time.perf_counter()
+        rows = load(repository, generate(config, args.processes), args.workers)
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.backend}: {config.users} users, {rows} rows in {elapsed:.1f}s")
+    print(f"{rows / elapsed:.0f} rows/s")
+    if args.backend == "sqlite":
+        print(f"database: {storage.SQLITE_PATH}")
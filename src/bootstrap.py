@@ -0,0 +1,78 @@
+import time
+from typing import Callable
+
+from aws_lambda_powertools import Logger
+
+logger = Logger()
+
+_init_hooks: list[Callable[[], None]] = []
+_restore_hooks: list[Callable[[], None]] = []
+
+# The seconds taken by each hook the last time its phase ran
+timings: dict[str, dict[str, float]] = {"init": {}, "restore": {}}
+
+
+def on_init(func: Callable[[], None]) -> Callable[[], None]:
+    """Registers a hook for the first phase of initialisation
+
+    Init hooks must be deterministic and must not make network calls, so that their
+    results are safe to snapshot or pre-warm with provisioned concurrency.
+
+    Args:
+        func (Callable[[], None]): The hook
+    """
+    _init_hooks.append(func)
+    return func
+
+
+def on_restore(func: Callable[[], None]) -> Callable[[], None]:
+    """Registers a hook that runs after the execution environment is restored
+
+    Restore hooks recreate anything that must not be shared between restored
+    environments, such as connections, credentials and per-container caches.
+
+    Args:
+        func (Callable[[], None]): The hook
+    """
+    _restore_hooks.append(func)
+    return func
+
+
+def _run(hooks: list[Callable[[], None]]) -> dict[str, float]:
+    timings: dict[str, float] = {}
+    for hook in hooks:
+        started = time.perf_counter()
+        hook()
+        timings[f"{hook.__module__}.{hook.__name__}"] = time.perf_counter() - started
+
+    return timings
+
+
+def run_init() -> dict[str, float]:
+    """Runs the network-free initialisation phase
+
+    Returns:
+        dict[str, float]: The seconds taken by each hook
+    """
+    timings["init"] = _run(_init_hooks)
+    return timings["init"]
+
+
+def run_restore() -> dict[str, float]:
+    """Runs the post-restore initialisation phase
+
+    Returns:
+        dict[str, float]: The seconds taken by each hook
+    """
+    timings["restore"] = _run(_restore_hooks)
+    logger.debug("Restored execution environment", timings=timings["restore"])
+    return timings["restore"]
+
+
+try:
+    # Only available inside the Lambda runtime when SnapStart is enabled
+    from snapshot_restore_py import register_after_restore
+except ImportError:
+    pass
+else:
+    register_after_restore(run_restore)
@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+# Operations that consume read capacity, every other item operation consumes writes
+READ_OPERATIONS = {"GetItem", "BatchGetItem", "Query", "Scan", "TransactGetItems"}
+
+
+@dataclass
+class Consumption:
+    """The DynamoDB capacity consumed while handling a request"""
+
+    rcu: float = 0
+    wcu: float = 0
+    # The number of items written, which a batch write counts once per item
+    writes: int = 0
+    calls: dict[str, int] = field(default_factory=dict)
+
+    def add(self, operation: str, units: float, items: int) -> None:
+        """Adds the capacity consumed by a call
+
+        Args:
+            operation (str): The name of the DynamoDB operation
+            units (float): The capacity units consumed
+            items (int): The number of items the call wrote
+        """
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if operation in READ_OPERATIONS:
+            self.rcu += units
+        else:
+            self.wcu += units
+            self.writes += items
+
+    def log_fields(self) -> dict[str, Any]:
+        """Gets the fields that are added to the request log"""
+        return {
+            "rcu": round(self.rcu, 2),
+            "wcu": round(self.wcu, 2),
+            "writes": self.writes,
+            "dynamodb_calls": self.calls,
+        }
+
+
+_consumption: ContextVar[Consumption | None] = ContextVar("consumption", default=None)
+
+
+@contextmanager
+def measure() -> Iterator[Consumption]:
+    """Measures the capacity consumed by the calls made within the context
+
+    Calls made from other threads, such as the writes of the coalescer, are not
+    measured as they are shared between requests.
+
+    Yields:
+        Iterator[Consumption]: The capacity consumed so far
+    """
+    consumption = Consumption()
+    token = _consumption.set(consumption)
+    try:
+        yield consumption
+    finally:
+        _consumption.reset(token)
+
+
+def instrument(client: Any) -> None:
+    """Makes a DynamoDB client report the capacity consumed by each call
+
+    Args:
+        client (Any): The boto3 DynamoDB client, such as the client of a resource
+    """
+    client.meta.events.register(
+        "provide-client-params.dynamodb.*",
+        _return_consumed_capacity,
+        unique_id="rto-return-consumed-capacity",
+    )
+    client.meta.events.register(
+        "after-call.dynamodb.*", _record_consumed_capacity, unique_id="rto-capacity"
+    )
+
+
+def _return_consumed_capacity(
+    params: dict[str, Any], model: Any, context: dict[str, Any], **kwargs
+) -> None:
+    if "ReturnConsumedCapacity" not in model.input_shape.members:
+        return
+    params.setdefault("ReturnConsumedCapacity", "TOTAL")
+    if model.name == "BatchWriteItem":
+        context["rto_items"] = sum(
+            len(requests) for requests in params["RequestItems"].values()
+        )
+    elif model.name == "TransactWriteItems":
+        context["rto_items"] = len(params["TransactItems"])
+
+
+def _record_consumed_capacity(
+    parsed: dict[str, Any], model: Any, context: dict[str, Any], **kwargs
+) -> None:
+    consumption = _consumption.get()
+    # Failed conditions are charged too, but their errors carry no consumed capacity
+    if consumption is None or "ConsumedCapacity" not in parsed:
+        return
+
+    consumed = parsed["ConsumedCapacity"]
+    # Batch and transaction calls return the capacity consumed per table
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    consumption.add(
+        model.name,
+        sum(table.get("CapacityUnits", 0) for table in consumed),
+        context.get("rto_items", 1),
+    )
@@ -0,0 +1,242 @@
+"""Estimates the DynamoDB cost of the API from its request logs
+
+Run from the src directory with
+`python capacity_report.py --users 500 --checkins 4 api.log [...]`, where the logs
+are the JSON lines written by the API function, for example from
+`aws logs tail /aws/lambda/<function> --since 7d > api.log`. Only sampled requests
+are logged, so every request is weighted by the inverse of its sample rate. A
+sample is only representative of a route as a whole, so the capacity is not broken
+down any further, such as by dashboard.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, TextIO
+
+CHECKIN_ROUTE = "POST /checkin/<guid>"
+
+# On-demand prices per million request units in us-east-1, in USD
+READ_PRICE = 0.125
+WRITE_PRICE = 0.625
+
+# A write consumes one unit per KB of the item, so writes that consume more than
+# this are rewriting a large item to change a small part of it
+LARGE_WRITE_WCU = 1.0
+# Routes whose share of the cost is this many times their share of the requests
+DISPROPORTIONATE_RATIO = 2.0
+
+
+@dataclass
+class Usage:
+    """The capacity consumed by the logged requests of a route"""
+
+    requests: float = 0
+    rcu: float = 0
+    wcu: float = 0
+    writes: float = 0
+
+    def add(self, record: dict[str, Any]) -> None:
+        """Adds a logged request, weighted by its sample rate
+
+        Args:
+            record (dict[str, Any]): The request log
+        """
+        weight = 1 / (record.get("sample_rate") or 1)
+        self.requests += weight
+        self.rcu += record.get("rcu", 0) * weight
+        self.wcu += record.get("wcu", 0) * weight
+        self.writes += record.get("writes", 0) * weight
+
+    def cost(self, read_price: float, write_price: float) -> float:
+        """Gets the on-demand cost of the capacity
+
+        Args:
+            read_price (float): The price per million read request units
+            write_price (float): The price per million write request units
+
+        Returns:
+            float: The cost
+        """
+        return (self.rcu * read_price + self.wcu * write_price) / 1_000_000
+
+
+def parse_records(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Reads the request logs that include the consumed capacity
+
+    Args:
+        lines (Iterable[str]): The log lines, which may be prefixed by a timestamp
+            and log stream
+
+    Yields:
+        Iterator[dict[str, Any]]: The request logs
+    """
+    for line in lines:
+        start = line.find("{")
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if (
+            isinstance(record, dict)
+            and record.get("message") == "Handled request"
+            and "rcu" in record
+        ):
+            yield record
+
+
+def summarise(records: Iterable[dict[str, Any]]) -> dict[str, Usage]:
+    """Adds up the capacity consumed per route
+
+    Args:
+        records (Iterable[dict[str, Any]]): The request logs
+
+    Returns:
+        dict[str, Usage]: The usage of each route
+    """
+    routes: dict[str, Usage] = {}
+    for record in records:
+        routes.setdefault(record["route"], Usage()).add(record)
+    return routes
+
+
+def project(
+    routes: dict[str, Usage], users: int, checkins: float, days: float
+) -> dict[str, float]:
+    """Projects the monthly requests of each route
+
+    Check-ins are projected from the number of users, and every other route keeps
+    its observed ratio to the check-ins.
+
+    Args:
+        routes (dict[str, Usage]): The observed usage of each route
+        users (int): The number of users
+        checkins (float): The check-ins per user per day
+        days (float): The days per month that clients check in
+
+    Returns:
+        dict[str, float]: The monthly requests of each route
+    """
+    observed = routes.get(CHECKIN_ROUTE)
+    if observed is None or observed.requests == 0:
+        raise ValueError("No check-ins were logged to project from")
+
+    scale = users * checkins * days / observed.requests
+    return {route: usage.requests * scale for route, usage in routes.items()}
+
+
+def flag(
+    usage: Usage, routes: dict[str, Usage], read_price: float, write_price: float
+) -> list[str]:
+    """Explains why a route is more expensive than it should be
+
+    Args:
+        usage (Usage): The usage of the route
+        routes (dict[str, Usage]): The usage of every route
+        read_price (float): The price per million read request units
+        write_price (float): The price per million write request units
+
+    Returns:
+        list[str]: The reasons, if any
+    """
+    reasons = []
+    if usage.writes and usage.wcu / usage.writes > LARGE_WRITE_WCU:
+        reasons.append(
+            f"each write consumes {usage.wcu / usage.writes:.1f} WCU, so whole items "
+            "are rewritten to change part of them"
+        )
+
+    total_cost = sum(u.cost(read_price, write_price) for u in routes.values())
+    total_requests = sum(u.requests for u in routes.values())
+    if total_cost and total_requests:
+        cost_share = usage.cost(read_price, write_price) / total_cost
+        request_share = usage.requests / total_requests
+        if cost_share > request_share * DISPROPORTIONATE_RATIO:
+            reasons.append(
+                f"{cost_share:.0%} of the cost from {request_share:.0%} of the requests"
+            )
+    return reasons
+
+
+def report(routes: dict[str, Usage], args: argparse.Namespace, out: TextIO) -> None:
+    """Writes the capacity and cost report
+
+    Args:
+        routes (dict[str, Usage]): The usage of each route
+        args (argparse.Namespace): The command line arguments
+        out (TextIO): Where to write the report
+    """
+    projected = project(routes, args.users, args.checkins, args.days)
+    width = max(len(route) for route in routes) + 2
+    print(
+        f"{'route':<{width}}{'requests':>10}{'RCU/req':>9}{'WCU/req':>9}"
+        f"{'monthly req':>13}{'monthly USD':>13}",
+        file=out,
+    )
+    total = 0.0
+    for route, usage in sorted(
+        routes.items(),
+        key=lambda item: -item[1].cost(args.read_price, args.write_price),
+    ):
+        monthly = projected[route] / usage.requests
+        cost = usage.cost(args.read_price, args.write_price) * monthly
+        total += cost
+        print(
+            f"{route:<{width}}{usage.requests:>10.0f}{usage.rcu / usage.requests:>9.2f}"
+            f"{usage.wcu / usage.requests:>9.2f}{projected[route]:>13.0f}"
+            f"{cost:>13.2f}",
+            file=out,
+        )
+        for reason in flag(usage, routes, args.read_price, args.write_price):
+            print(f"  ! {reason}", file=out)
+
+    print(
+        f"\nProjected monthly cost at {args.users} users and {args.checkins} "
+        f"check-ins per day: {total:.2f} USD (request units only)",
+        file=out,
+    )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="*", help="log files, standard input if none")
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument(
+        "--checkins", type=float, default=1, help="check-ins per user per day"
+    )
+    parser.add_argument(
+        "--days", type=float, default=30, help="days per month with check-ins"
+    )
+    parser.add_argument(
+        "--read-price", type=float, default=READ_PRICE, help="USD per million RRU"
+    )
+    parser.add_argument(
+        "--write-price", type=float, default=WRITE_PRICE, help="USD per million WRU"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    records: list[dict[str, Any]] = []
+    for path in args.logs or ["-"]:
+        if path == "-":
+            records.extend(parse_records(sys.stdin))
+            continue
+        with open(path, encoding="utf-8") as log_file:
+            records.extend(parse_records(log_file))
+
+    routes = summarise(records)
+    try:
+        report(routes, args, sys.stdout)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+CHECKIN_CACHE_SIZE = int(os.environ.get("CHECKIN_CACHE_SIZE", 10000))
+CHECKIN_RATE_CAPACITY = float(os.environ.get("CHECKIN_RATE_CAPACITY", 10))
+CHECKIN_RATE_PER_MINUTE = float(os.environ.get("CHECKIN_RATE_PER_MINUTE", 1))
+
+
+class CheckinCache:
+    """Remembers which users have already had today's check-in recorded
+
+    Entries are kept per container, so a cold container falls back to reading the
+    month row from DynamoDB.
+
+    Args:
+        max_size (int): The number of users to remember before evicting the oldest
+    """
+
+    def __init__(self, max_size: int = CHECKIN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[str, str, str | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, guid: str) -> tuple[str, str, str | None] | None:
+        """Gets the timezone, local date and request ID of the user's last check-in
+
+        Args:
+            guid (str): The GUID of the user
+
+        Returns:
+            tuple[str, str, str | None] | None: The timezone, ISO date and the
+                Idempotency-Key that recorded it, if known
+        """
+        with self._lock:
+            entry = self._entries.get(guid)
+            if entry is not None:
+                self._entries.move_to_end(guid)
+            return entry
+
+    def remember(
+        self, guid: str, timezone: str, date: str, request_id: str | None = None
+    ) -> None:
+        """Records that the user's check-in for the date has been stored
+
+        Args:
+            guid (str): The GUID of the user
+            timezone (str): The timezone of the user
+            date (str): The local ISO date that was recorded
+            request_id (str | None): The Idempotency-Key that recorded the date
+        """
+        with self._lock:
+            self._entries[guid] = (timezone, date, request_id)
+            self._entries.move_to_end(guid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RateLimiter:
+    """A token bucket per key that limits how often a client may call an endpoint
+
+    Args:
+        capacity (float): The burst size of each bucket
+        refill_per_minute (float): The tokens added back to each bucket per minute
+        max_size (int): The number of buckets to keep before evicting the oldest
+        clock (Callable[[], float]): The source of the current time in seconds
+    """
+
+    def __init__(
+        self,
+        capacity: float = CHECKIN_RATE_CAPACITY,
+        refill_per_minute: float = CHECKIN_RATE_PER_MINUTE,
+        max_size: int = CHECKIN_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.refill_rate = refill_per_minute / 60
+        self.max_size = max_size
+        self.clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """Takes a token from the key's bucket if one is available
+
+        Args:
+            key (str): The key to rate limit, such as the GUID of the user
+
+        Returns:
+            bool: Whether the request is allowed
+        """
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+
+            return allowed
+
+    def retry_after(self, key: str) -> int:
+        """Gets the seconds until the key's bucket has a token available
+
+        Args:
+            key (str): The key to rate limit
+
+        Returns:
+            int: The seconds to wait
+        """
+        with self._lock:
+            tokens, _ = self._buckets.get(key, (self.capacity, 0))
+
+        if tokens >= 1:
+            return 0
+        if self.refill_rate <= 0:
+            return 60
+        return int((1 - tokens) / self.refill_rate) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import storage
+
+# How long the first buffered write waits for others to join its flush
+COALESCE_SECONDS = float(os.environ.get("WRITE_COALESCE_MS", 5)) / 1000
+# Flushed straight away once this many writes are buffered
+COALESCE_MAX_BATCH = int(os.environ.get("WRITE_COALESCE_MAX_BATCH", 100))
+# Month rows are updated individually, so a flush updates this many at a time
+COALESCE_WORKERS = int(os.environ.get("WRITE_COALESCE_WORKERS", 16))
+
+
+@dataclass
+class PendingCheckin:
+    """A check-in that is waiting to be flushed"""
+
+    guid: str
+    month: str
+    day: str
+    ip: str
+    request_id: str | None
+    future: Future = field(default_factory=Future)
+    submitted: float = field(default_factory=time.monotonic)
+
+
+class WriteCoalescer:
+    """Buffers check-in writes for a few milliseconds and flushes them together
+
+    For servers handling many requests per process, such as the ASGI application or
+    the queue consumer, where a burst of check-ins would otherwise each make their own
+    round trips. Check-in events are written with batch writes, and check-ins to the
+    same month row are merged into a single conditional update. Callers are only
+    acknowledged once their write has been stored.
+
+    Args:
+        repository (storage.Repository): The repository to flush the writes to
+        window (float): How long to buffer writes for, in seconds
+        max_batch (int): The number of buffered writes that triggers a flush
+        workers (int): The number of month rows to update at the same time
+        background (bool): Whether writes are flushed by a background thread,
+            otherwise they are only written by flush()
+    """
+
+    def __init__(
+        self,
+        repository: storage.Repository,
+        window: float = COALESCE_SECONDS,
+        max_batch: int = COALESCE_MAX_BATCH,
+        workers: int = COALESCE_WORKERS,
+        background: bool = True,
+    ):
+        self.repository = repository
+        self.window = window
+        self.max_batch = max_batch
+        self.background = background
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="coalescer"
+        )
+        self._condition = threading.Condition()
+        self._puts: list[tuple[storage.Item, Future]] = []
+        self._checkins: list[PendingCheckin] = []
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def submit_put(self, item: storage.Item) -> Future:
+        """Buffers a row to be created or replaced
+
+        Args:
+            item (storage.Item): The row
+
+        Returns:
+            Future: Done once the row has been stored
+        """
+        future: Future = Future()
+        with self._condition:
+            self._puts.append((item, future))
+            self._notify()
+        return future
+
+    def submit_checkin(
+        self, guid: str, month: str, day: str, ip: str, request_id: str | None
+    ) -> Future:
+        """Buffers an office IP address to be recorded against a day
+
+        Args:
+            guid (str): The GUID of the user
+            month (str): The month in the YYYY-MM format
+            day (str): The day of the month
+            ip (str): The office IP address
+            request_id (str | None): The Idempotency-Key of the check-in
+
+        Returns:
+            Future: Done once the day has been recorded, or with a
+                storage.ConditionFailedError if it already had been
+        """
+        checkin = PendingCheckin(guid, month, day, ip, request_id)
+        with self._condition:
+            self._checkins.append(checkin)
+            self._notify()
+        return checkin.future
+
+    def batch_put(self, items: Iterable[storage.Item]) -> None:
+        """Creates or replaces rows, like storage.Repository.batch_put"""
+        for future in [self.submit_put(item) for item in items]:
+            self._result(future)
+
+    def record_checkin(
+        self, guid: str, month: str, day: str, ip: str, request_id: str | None
+    ) -> None:
+        """Records a check-in, like storage.Repository.record_checkin"""
+        self._result(self.submit_checkin(guid, month, day, ip, request_id))
+
+    def flush(self) -> None:
+        """Writes everything that is buffered from the calling thread"""
+        with self._condition:
+            puts, checkins = self._take()
+        self._flush(puts, checkins)
+
+    def close(self) -> None:
+        """Flushes the remaining writes and stops the flushing thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self._executor.shutdown()
+
+    def _result(self, future: Future) -> None:
+        future.result()
+
+    def _notify(self) -> None:
+        if not self.background:
+            return
+        if self._thread is None:
+            # Started on first use so that idle processes have no extra thread
+            self._thread = threading.Thread(
+                target=self._run, name="coalescer-flush", daemon=True
+            )
+            self._thread.start()
+        self._condition.notify()
+
+    def _size(self) -> int:
+        return len(self._puts) + len(self._checkins)
+
+    def _take(self) -> tuple[list[tuple[storage.Item, Future]], list[PendingCheckin]]:
+        puts, checkins = self._puts, self._checkins
+        self._puts, self._checkins = [], []
+        return puts, checkins
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._size() and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+                deadline = time.monotonic() + self.window
+                while self._size() < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                puts, checkins = self._take()
+
+            self._flush(puts, checkins)
+
+    def _flush(
+        self, puts: list[tuple[storage.Item, Future]], checkins: list[PendingCheckin]
+    ) -> None:
+        rows: dict[tuple[str, str], dict[str, list[PendingCheckin]]] = {}
+        for checkin in checkins:
+            days = rows.setdefault((checkin.guid, checkin.month), {})
+            days.setdefault(checkin.day, []).append(checkin)
+
+        updates = [
+            self._executor.submit(self._record_row, guid, month, days)
+            for (guid, month), days in rows.items()
+        ]
+        if puts:
+            # A batch write rejects repeated keys, and the last put would win anyway
+            items = {(item["id"], item["month"]): item for item, _ in puts}
+            try:
+                self.repository.batch_put(items.values())
+            except Exception as exc:
+                for _, future in puts:
+                    future.set_exception(exc)
+            else:
+                for _, future in puts:
+                    future.set_result(None)
+        wait(updates)
+
+    def _record_row(
+        self, guid: str, month: str, days: dict[str, list[PendingCheckin]]
+    ) -> None:
+        # Only the first check-in of a day can record it, the rest are told the day
+        # was already recorded by it, as they would have been by the condition
+        first = {day: checkins[0] for day, checkins in days.items()}
+        latest = max(first.values(), key=lambda checkin: checkin.submitted)
+        try:
+            self.repository.record_days(
+                guid,
+                month,
+                {day: checkin.ip for day, checkin in first.items()},
+                latest.request_id,
+            )
+        except storage.ConditionFailedError as exc:
+            if len(days) > 1:
+                # One of the days was already recorded, so record them one by one
+                for day, checkins in days.items():
+                    self._record_row(guid, month, {day: checkins})
+                return
+            for checkins in days.values():
+                for checkin in checkins:
+                    checkin.future.set_exception(exc)
+            return
+        except Exception as exc:
+            for checkins in days.values():
+                for checkin in checkins:
+                    checkin.future.set_exception(exc)
+            return
+
+        for checkins in days.values():
+            checkins[0].future.set_result(None)
+            for duplicate in checkins[1:]:
+                duplicate.future.set_exception(
+                    storage.ConditionFailedError(
+                        {
+                            "id": guid,
+                            "month": month,
+                            "days": {duplicate.day: checkins[0].ip},
+                            "last_request_id": checkins[0].request_id,
+                        }
+                    )
+                )
@@ -0,0 +1,162 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
+import boto3
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.data_classes import (
+    DynamoDBStreamEvent,
+    event_source,
+)
+from aws_lambda_powertools.utilities.typing import LambdaContext
+from boto3.dynamodb.conditions import Key
+
+from models import CheckinEvent, MonthRecord
+from tracker import CHECKIN_EVENT_PREFIX
+
+tracker_table = boto3.resource("dynamodb").Table(
+    os.environ.get("RTO_TABLE_NAME", "rto-table")
+)
+
+logger = Logger()
+
+# Compactions that lose the race with another write re-read the row this many times
+# in total before the stream batch is failed and retried
+COMPACT_ATTEMPTS = 3
+
+
+def fold_events(month_record: MonthRecord, events: Iterable[CheckinEvent]) -> set[str]:
+    """Folds office check-in events into the month snapshot
+
+    Args:
+        month_record (MonthRecord): The month snapshot to update
+        events (Iterable[CheckinEvent]): The events of the month
+
+    Returns:
+        set[str]: The attributes of the snapshot that were changed
+    """
+    changed: set[str] = set()
+    for event in events:
+        if not event.office:
+            continue
+
+        dt = datetime.fromisoformat(event.month.removeprefix(CHECKIN_EVENT_PREFIX))
+        day = str(dt.day)
+        seen = dt.strftime("%H:%M:%S")
+
+        if month_record.days.get(day) is None:
+            month_record.days[day] = event.ip
+            changed.add("days")
+        if day not in month_record.first_seen or seen < month_record.first_seen[day]:
+            month_record.first_seen[day] = seen
+            changed.add("first_seen")
+        if day not in month_record.last_seen or seen > month_record.last_seen[day]:
+            month_record.last_seen[day] = seen
+            changed.add("last_seen")
+
+    return changed
+
+
+def get_month_events(guid: str, month: str) -> list[CheckinEvent]:
+    """Gets the check-in events of the month that have not yet expired
+
+    Args:
+        guid (str): The GUID of the user
+        month (str): The month in the YYYY-MM format
+
+    Returns:
+        list[CheckinEvent]: The check-in events
+    """
+    events: list[CheckinEvent] = []
+    query = {
+        "KeyConditionExpression": Key("id").eq(guid)
+        & Key("month").begins_with(f"{CHECKIN_EVENT_PREFIX}{month}"),
+    }
+    while True:
+        response = tracker_table.query(**query)
+        events.extend(CheckinEvent(**item) for item in response["Items"])
+        if "LastEvaluatedKey" not in response:
+            return events
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def compact_month(
+    guid: str, month: str, events: list[CheckinEvent] | None = None
+) -> bool:
+    """Folds the check-in events of a month into its snapshot row
+
+    Only the attributes that changed are written, so the routine pings that just
+    move last_seen do not rewrite the days and holidays of the month.
+
+    Args:
+        guid (str): The GUID of the user
+        month (str): The month in the YYYY-MM format
+        events (list[CheckinEvent] | None): The events to fold, defaults to every
+            event of the month
+
+    Raises:
+        ConditionalCheckFailedException: When the row kept changing underneath
+            every attempt, so the stream retries the batch
+
+    Returns:
+        bool: Whether the snapshot was changed
+    """
+    if events is None:
+        events = get_month_events(guid, month)
+
+    for attempt in range(1, COMPACT_ATTEMPTS + 1):
+        month_row = tracker_table.get_item(Key={"id": guid, "month": month})
+        if "Item" not in month_row:
+            logger.warning("No month row to compact into", guid=guid, month=month)
+            return False
+
+        month_record = MonthRecord(**month_row["Item"])
+        changed = fold_events(month_record, events)
+        if not changed:
+            return False
+
+        values = {
+            f":{attribute}": getattr(month_record, attribute)
+            for attribute in sorted(changed)
+        }
+        try:
+            # Only update the snapshot if no check-in has been written since it
+            # was read
+            tracker_table.update_item(
+                Key={"id": guid, "month": month},
+                UpdateExpression="SET "
+                + ", ".join(f"#{name} = :{name}" for name in sorted(changed))
+                + ", version = :next_version",
+                ConditionExpression="attribute_not_exists(version) OR "
+                "version = :version",
+                ExpressionAttributeNames={f"#{name}": name for name in changed},
+                ExpressionAttributeValues={
+                    **values,
+                    ":version": month_record.version,
+                    ":next_version": month_record.version + 1,
+                },
+            )
+        except tracker_table.meta.client.exceptions.ConditionalCheckFailedException:
+            if attempt == COMPACT_ATTEMPTS:
+                raise
+        else:
+            return True
+
+
+@logger.inject_lambda_context
+@event_source(data_class=DynamoDBStreamEvent)
+def handler(event: DynamoDBStreamEvent, context: LambdaContext):
+    """Handles the DynamoDB stream of newly appended check-in events"""
+    months: dict[tuple[str, str], list[CheckinEvent]] = defaultdict(list)
+    for record in event.records:
+        image = record.dynamodb.new_image if record.dynamodb else None
+        if not image or not image["month"].startswith(CHECKIN_EVENT_PREFIX):
+            continue
+
+        checkin = CheckinEvent(**image)
+        month = checkin.month.removeprefix(CHECKIN_EVENT_PREFIX)[:7]
+        months[(checkin.id, month)].append(checkin)
+
+    for (guid, month), events in months.items():
+        compact_month(guid, month, events)
@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+# Past months no longer receive check-ins, so the browser and any CDN in front of
+# the API can reuse them for a while. They can still change through leave edits,
+# compaction and archiving, so they are revalidated with their ETag after this.
+PAST_MONTH_MAX_AGE = int(os.environ.get("PAST_MONTH_MAX_AGE", 60 * 5))
+
+# The furthest behind UTC that a timezone can be, used to decide when a month has
+# finished for every user regardless of their timezone
+_LATEST_UTC_OFFSET = timedelta(hours=12)
+
+
+def generate_etag(month: str, version: int, representation: str | None = None) -> str:
+    """Generates an ETag for a record from its version attribute
+
+    Args:
+        month (str): The sort key of the record
+        version (int): The version of the record
+        representation (str | None): Identifies a non-default projection of the record
+
+    Returns:
+        str: The quoted ETag
+    """
+    if representation:
+        return f'"{month}.{version}.{representation}"'
+    return f'"{month}.{version}"'
+
+
+def is_not_modified(etag: str, if_none_match: str | None) -> bool:
+    """Checks whether the client already has the current representation
+
+    Args:
+        etag (str): The current ETag of the record
+        if_none_match (str | None): The If-None-Match request header
+
+    Returns:
+        bool: Whether a 304 Not Modified can be returned
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def is_past_month(year: int, month: int, now: datetime | None = None) -> bool:
+    """Checks whether the month has finished in every timezone
+
+    Args:
+        year (int): The year
+        month (int): The month
+        now (datetime | None): The current time, defaults to now in UTC
+
+    Returns:
+        bool: Whether the month is in the past
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    latest = now.astimezone(timezone.utc) - _LATEST_UTC_OFFSET
+    return (year, month) < (latest.year, latest.month)
+
+
+def cache_headers(etag: str, past_month: bool = False) -> dict[str, str]:
+    """Generates the caching headers for a response
+
+    Args:
+        etag (str): The ETag of the response
+        past_month (bool): Whether the response is for a month that has finished
+
+    Returns:
+        dict[str, str]: The response headers
+    """
+    if past_month:
+        cache_control = f"public, max-age={PAST_MONTH_MAX_AGE}"
+    else:
+        cache_control = "no-cache"
+
+    # Large bodies are gzipped depending on the request's Accept-Encoding
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
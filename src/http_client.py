@@ -0,0 +1,255 @@
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 1.0))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 3.0))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 2))
+
+# Status codes that are worth retrying as the upstream may recover
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClientError(Exception):
+    """Raised when an upstream request could not be completed"""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(HttpClientError):
+    """Raised when an upstream is failing and requests are not being attempted"""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after repeated failures until it has had time to recover
+
+    Args:
+        failure_threshold (int): The consecutive failures before the circuit opens
+        reset_timeout (float): The seconds to wait before allowing a trial request
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Checks whether a request may be attempted
+
+        Returns:
+            bool: Whether the circuit is closed or ready for a trial request
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open, let a single request through to test the upstream
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """A small HTTP client that keeps connections alive between requests
+
+    Args:
+        connect_timeout (float): The seconds to wait for a connection
+        read_timeout (float): The seconds to wait for each read of the response
+        max_retries (int): The retries after the first attempt fails
+        backoff (float): The base delay in seconds used for the retry jitter
+        max_idle (int): The idle connections to keep per host
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = 0.2,
+        max_idle: int = 4,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_idle = max_idle
+        self._pools: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        """Gets the circuit breaker for the specified host
+
+        Args:
+            host (str): The host
+
+        Returns:
+            CircuitBreaker: The circuit breaker
+        """
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+
+    def get_json(self, url: str) -> Any:
+        """Sends a GET request and decodes the JSON response
+
+        Args:
+            url (str): The URL to request
+
+        Returns:
+            Any: The decoded response body
+
+        Raises:
+            HttpClientError: The request failed, was not successful or wasn't JSON
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        breaker = self.breaker(parts.netloc)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {parts.netloc}")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                status, body = self._request(parts.scheme, parts.netloc, path)
+            except (OSError, http.client.HTTPException) as exc:
+                error = HttpClientError(f"Request to {parts.netloc} failed: {exc}")
+            else:
+                if 200 <= status < 300:
+                    breaker.record_success()
+                    try:
+                        return json.loads(body)
+                    except ValueError as exc:
+                        raise HttpClientError(
+                            f"Request to {parts.netloc} returned invalid JSON: {exc}",
+                            status=status,
+                        ) from exc
+
+                error = HttpClientError(
+                    f"Request to {parts.netloc} returned {status}", status=status
+                )
+                if status not in RETRYABLE_STATUSES:
+                    # The upstream is healthy, the request itself was rejected
+                    breaker.record_success()
+                    raise error
+
+            if attempt < self.max_retries:
+                # Full jitter so that concurrent callers don't retry in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+        breaker.record_failure()
+        raise error
+
+    def close(self) -> None:
+        """Closes all of the idle connections"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+
+        for connections in pools.values():
+            for connection in connections:
+                connection.close()
+
+    def _request(self, scheme: str, netloc: str, path: str) -> tuple[int, bytes]:
+        connection, reused = self._acquire(scheme, netloc)
+        try:
+            try:
+                response = self._send(connection, path)
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                if not reused:
+                    raise
+                # The server closed the idle keep-alive connection, try a fresh one
+                connection.close()
+                connection = self._connect(scheme, netloc)
+                response = self._send(connection, path)
+
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(scheme, netloc, connection)
+
+        return response.status, body
+
+    def _send(
+        self, connection: http.client.HTTPConnection, path: str
+    ) -> http.client.HTTPResponse:
+        if connection.sock is None:
+            connection.connect()
+            if connection.sock is not None:
+                connection.sock.settimeout(self.read_timeout)
+
+        connection.request(
+            "GET",
+            path,
+            headers={"Accept": "application/json", "Connection": "keep-alive"},
+        )
+        return connection.getresponse()
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.connect_timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.connect_timeout)
+
+    def _acquire(
+        self, scheme: str, netloc: str
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._pools.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+
+        return self._connect(scheme, netloc), False
+
+    def _release(
+        self, scheme: str, netloc: str, connection: http.client.HTTPConnection
+    ) -> None:
+        with self._lock:
+            idle = self._pools.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+
+        connection.close()
+
+
+# Shared between invocations so that warm containers reuse their connections
+client = HttpClient()
+
+
+def get_json(url: str) -> Any:
+    """Sends a GET request using the shared client and decodes the JSON response
+
+    Args:
+        url (str): The URL to request
+
+    Returns:
+        Any: The decoded response body
+    """
+    return client.get_json(url)
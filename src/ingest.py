@@ -0,0 +1,92 @@
+from concurrent.futures import Future
+from datetime import datetime
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.data_classes import SQSEvent, event_source
+from aws_lambda_powertools.utilities.parser import ValidationError
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+import storage
+from coalescer import WriteCoalescer
+from models import CheckinMessage
+from tracker import generate_checkin_event
+
+repository = storage.create_repository()
+# Every batch is flushed at once, so the coalescer needs no thread of its own
+write_coalescer = WriteCoalescer(repository, background=False)
+
+logger = Logger()
+
+
+def submit_message(message: CheckinMessage) -> list[Future]:
+    """Buffers the writes of a queued check-in
+
+    Args:
+        message (CheckinMessage): The check-in
+
+    Returns:
+        list[Future]: The futures of the check-in event and, for office check-ins,
+            of recording the day
+    """
+    dt = datetime.fromisoformat(message.at)
+    event = generate_checkin_event(message.id, dt, message.ip, message.office)
+    writes = [write_coalescer.submit_put(event.dict())]
+    if message.office:
+        writes.append(
+            write_coalescer.submit_checkin(
+                message.id,
+                f"{dt.year}-{dt.month:02d}",
+                str(dt.day),
+                message.ip,
+                message.request_id,
+            )
+        )
+    return writes
+
+
+def failed(writes: list[Future]) -> bool:
+    """Checks whether any of the writes of a check-in has to be retried
+
+    Args:
+        writes (list[Future]): The futures of the writes
+
+    Returns:
+        bool: Whether a write failed, days that were already recorded are not failures
+    """
+    for future in writes:
+        exc = future.exception()
+        if isinstance(exc, storage.ConditionFailedError):
+            if exc.item is None:
+                logger.warning("No month row to record the check-in against")
+        elif exc is not None:
+            logger.error("Failed to write check-in", exc_info=exc)
+            return True
+    return False
+
+
+@logger.inject_lambda_context
+@event_source(data_class=SQSEvent)
+def handler(event: SQSEvent, context: LambdaContext) -> dict:
+    """Handles a batch of check-ins queued by the API
+
+    The check-ins are grouped by user and month, so that each month row is updated
+    once per batch. Only the messages whose writes failed are returned to the queue.
+    """
+    failures: list[str] = []
+    pending: list[tuple[str, list[Future]]] = []
+    for record in event.records:
+        try:
+            message = CheckinMessage.parse_raw(record.body)
+        except ValidationError:
+            # Retried until the queue moves it to the dead-letter queue
+            logger.exception("Invalid check-in message", message_id=record.message_id)
+            failures.append(record.message_id)
+            continue
+        pending.append((record.message_id, submit_message(message)))
+
+    write_coalescer.flush()
+    failures.extend(message_id for message_id, writes in pending if failed(writes))
+
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]
+    }
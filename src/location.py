@@ -1,8 +1,7 @@
-import json
-import urllib.request
-
 from aws_lambda_powertools.utilities.parser import BaseModel
 
+import http_client
+
 
 class IpApiResponse(BaseModel):
     status: str
@@ -21,7 +20,6 @@ def get_ip_location(ipaddr: str) -> IpApiResponse:
         ipaddr (str): The IP address
     """
 
-    with urllib.request.urlopen(f"http://ip-api.com/json/{ipaddr}") as response:
-        data = json.loads(response.read())
+    data = http_client.get_json(f"http://ip-api.com/json/{ipaddr}")
 
     return IpApiResponse(**data)
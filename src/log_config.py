@@ -0,0 +1,118 @@
+import json
+import os
+import random
+import time
+from typing import Any
+
+from aws_lambda_powertools import Logger
+
+import capacity
+
+
+def is_enabled(value: str | None) -> bool:
+    """Parses a boolean environment variable
+
+    Args:
+        value (str | None): The value of the variable
+
+    Returns:
+        bool: Whether it is set to a true value such as "true" or "1"
+    """
+    return value is not None and value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# "development" returns tracebacks from the API and logs every request, while
+# "production" only logs a sample of successful requests
+LOG_PROFILE = os.environ.get(
+    "LOG_PROFILE",
+    "development" if is_enabled(os.environ.get("IS_DEV")) else "production",
+)
+is_dev = LOG_PROFILE == "development"
+
+LOG_LEVEL = os.environ.get("POWERTOOLS_LOG_LEVEL", "DEBUG" if is_dev else "INFO")
+
+# Sample rates keyed by the method and the rule of the route, such as
+# "POST /checkin/<guid>", or by the method and first path segment, such as
+# "POST /checkin", with LOG_SAMPLE_RATE used for any route that is not listed
+DEFAULT_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1 if is_dev else 0.01))
+SAMPLE_RATES: dict[str, float] = {
+    route: float(rate)
+    for route, rate in json.loads(os.environ.get("LOG_SAMPLE_RATES", "{}")).items()
+}
+
+
+def route_key(event: dict[str, Any], rule: str | None = None) -> str:
+    """Gets the key that a request is logged and sampled by
+
+    Args:
+        event (dict[str, Any]): The API Gateway REST proxy event
+        rule (str | None): The rule of the route that the request matched
+
+    Returns:
+        str: The method and the rule, such as "GET /dashboard/<guid>", or the method
+            and the first segment of the path if the request matched no route
+    """
+    if rule is not None:
+        return f"{event.get('httpMethod')} {rule}"
+    segment = (event.get("path") or "/").lstrip("/").split("/", 1)[0]
+    return f"{event.get('httpMethod')} /{segment}"
+
+
+def sample_rate(
+    event: dict[str, Any], status_code: int, rule: str | None = None
+) -> float:
+    """Gets the share of requests like this one that are logged
+
+    Args:
+        event (dict[str, Any]): The API Gateway REST proxy event
+        status_code (int): The status code of the response
+        rule (str | None): The rule of the route that the request matched
+
+    Returns:
+        float: The sample rate, server errors are always logged
+    """
+    if status_code >= 500:
+        return 1
+    rate = SAMPLE_RATES.get(route_key(event, rule))
+    if rate is None:
+        rate = SAMPLE_RATES.get(route_key(event), DEFAULT_SAMPLE_RATE)
+    return rate
+
+
+def log_request(
+    logger: Logger,
+    event: dict[str, Any],
+    response: dict[str, Any],
+    started: float,
+    consumed: capacity.Consumption | None = None,
+    rule: str | None = None,
+) -> None:
+    """Logs a sample of the requests handled by the API
+
+    Nothing about the request is formatted unless it is sampled, so requests that
+    are not logged cost a single random number. The sample rate is logged as well,
+    so that totals can be estimated from the sampled requests.
+
+    Args:
+        logger (Logger): The logger
+        event (dict[str, Any]): The API Gateway REST proxy event
+        response (dict[str, Any]): The API Gateway proxy response
+        started (float): When the request started, from time.perf_counter()
+        consumed (capacity.Consumption | None): The DynamoDB capacity the request
+            consumed
+        rule (str | None): The rule of the route that the request matched
+    """
+    status_code = int(response.get("statusCode", 0))
+    rate = sample_rate(event, status_code, rule)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+
+    logger.info(
+        "Handled request",
+        route=route_key(event, rule),
+        path=event.get("path"),
+        status_code=status_code,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        sample_rate=min(rate, 1),
+        **(consumed.log_fields() if consumed else {}),
+    )
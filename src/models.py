@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from aws_lambda_powertools.utilities.parser import BaseModel
 
@@ -13,6 +13,8 @@ class BaseRecord(BaseModel):
     id: str
     month: str = "_base"
     office_ips: List[str] = []
+    # Fingerprints of the client networks that check-ins from the office came from
+    office_networks: List[str] = []
     rounding: str = "up"
     timezone: str
     percentage: int = 50
@@ -20,6 +22,7 @@ class BaseRecord(BaseModel):
     created_at: str
     county: str = "AU-NSW"
     country: str = "Australia"
+    version: int = 0
 
 
 class MonthRecord(BaseModel):
@@ -28,3 +31,42 @@ class MonthRecord(BaseModel):
     days: Dict[str, str | None]
     business_days: int = 0
     holidays: Dict[str, str | None] = {}
+    leave: Dict[str, str | None] = {}
+    first_seen: Dict[str, str] = {}
+    last_seen: Dict[str, str] = {}
+    last_request_id: Optional[str] = None
+    version: int = 0
+
+
+class CheckinEvent(BaseModel):
+    id: str
+    month: str
+    ip: str
+    office: bool = False
+    expires_at: int
+
+
+class CheckinMessage(BaseModel):
+    id: str
+    # The local time of the check-in in the ISO format, including its UTC offset
+    at: str
+    ip: str
+    office: bool = False
+    request_id: Optional[str] = None
+
+
+class ArchivedMonth(BaseModel):
+    attended: int = 0
+    # Bit n is set when day n + 1 was attended
+    office_days: int = 0
+    business_days: int = 0
+    holidays: Dict[str, str | None] = {}
+    leave: Dict[str, str | None] = {}
+    version: int = 0
+
+
+class YearSummary(BaseModel):
+    id: str
+    month: str
+    months: Dict[str, ArchivedMonth] = {}
+    version: int = 0
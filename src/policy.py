@@ -0,0 +1,184 @@
+import math
+import threading
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable
+
+from aws_lambda_powertools.utilities.parser import BaseModel
+
+from models import BaseRecord, MonthRecord
+
+# Results are only recomputed when the month row, the user's policy or the day changes
+POLICY_CACHE_SIZE = 1024
+
+_results: OrderedDict[tuple, "MonthStats"] = OrderedDict()
+_results_lock = threading.Lock()
+
+
+class MonthStats(BaseModel):
+    month: str
+    # The share of the eligible days so far that were attended
+    attendance: float
+    # The eligible days that were attended
+    attended: int
+    eligible_days: int
+    eligible_days_to_date: int
+    required_days: int
+    remaining_days_needed: int
+    remaining_workable_days: int
+    projected_attendance: float
+    on_track: bool
+
+
+def round_days(days: float, rounding: str) -> int:
+    """Rounds a number of days using the user's rounding preference
+
+    Args:
+        days (float): The number of days
+        rounding (str): Either "up", "down" or "nearest"
+
+    Returns:
+        int: The rounded number of days
+    """
+    if rounding == "down":
+        return math.floor(days)
+    if rounding == "nearest":
+        return math.floor(days + 0.5)
+    return math.ceil(days)
+
+
+def eligible_days(month_record: MonthRecord, created: date | None = None) -> list[date]:
+    """Gets the business days of the month that are not holidays or leave
+
+    Args:
+        month_record (MonthRecord): The month row
+        created (date | None): The day the user signed up, earlier days are not
+            eligible
+
+    Returns:
+        list[date]: The days the user could be expected in the office
+    """
+    year, month = (int(part) for part in month_record.month.split("-"))
+    days = []
+    for day in range(1, monthrange(year, month)[1] + 1):
+        dt = date(year, month, day)
+        if dt.weekday() >= 5 or (created and dt < created):
+            continue
+        if dt.isoformat() in month_record.holidays or str(day) in month_record.leave:
+            continue
+        days.append(dt)
+
+    return days
+
+
+def _evaluate(
+    base_record: BaseRecord, month_record: MonthRecord, today: date
+) -> MonthStats:
+    eligible = eligible_days(month_record, date.fromisoformat(base_record.created_at))
+    attended_days = [
+        day for day in eligible if month_record.days.get(str(day.day)) is not None
+    ]
+    attended = len(attended_days)
+    elapsed = [day for day in eligible if day < today]
+    # Today only counts towards the attendance so far once it has been attended
+    to_date = len(elapsed) + sum(day >= today for day in attended_days)
+    # Today can still be worked unless it has already been attended
+    remaining = [
+        day
+        for day in eligible
+        if day > today or (day == today and not month_record.days[str(day.day)])
+    ]
+
+    required = round_days(
+        len(eligible) * base_record.percentage / 100, base_record.rounding
+    )
+    remaining_needed = max(required - attended, 0)
+
+    if not eligible:
+        return MonthStats(
+            month=month_record.month,
+            attendance=0.0,
+            attended=attended,
+            eligible_days=0,
+            eligible_days_to_date=0,
+            required_days=0,
+            remaining_days_needed=0,
+            remaining_workable_days=0,
+            projected_attendance=0.0,
+            on_track=True,
+        )
+
+    # Assume the user keeps attending at the same rate for the rest of the month
+    pace = attended / len(elapsed) if elapsed else 0.0
+    projected_days = min(attended + pace * len(remaining), len(eligible))
+    expected_so_far = math.floor(required * len(elapsed) / len(eligible))
+
+    return MonthStats(
+        month=month_record.month,
+        attendance=attended / to_date * 100 if to_date else 0.0,
+        attended=attended,
+        eligible_days=len(eligible),
+        eligible_days_to_date=to_date,
+        required_days=required,
+        remaining_days_needed=remaining_needed,
+        remaining_workable_days=len(remaining),
+        projected_attendance=projected_days / len(eligible) * 100,
+        on_track=attended >= expected_so_far and remaining_needed <= len(remaining),
+    )
+
+
+def evaluate_month(
+    base_record: BaseRecord, month_record: MonthRecord, today: date
+) -> MonthStats:
+    """Evaluates the user's attendance policy for a month
+
+    Args:
+        base_record (BaseRecord): The user's base row holding their policy
+        month_record (MonthRecord): The month row to evaluate
+        today (date): The current date of the user
+
+    Returns:
+        MonthStats: The statistics of the month
+    """
+    # Rows written before versioning can change without their version changing
+    if month_record.version == 0:
+        return _evaluate(base_record, month_record, today)
+
+    key = (
+        month_record.id,
+        month_record.month,
+        month_record.version,
+        base_record.percentage,
+        base_record.rounding,
+        base_record.created_at,
+        today,
+    )
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+
+    stats = _evaluate(base_record, month_record, today)
+    with _results_lock:
+        _results[key] = stats
+        while len(_results) > POLICY_CACHE_SIZE:
+            _results.popitem(last=False)
+
+    return stats
+
+
+def evaluate_months(
+    base_record: BaseRecord, month_records: Iterable[MonthRecord], today: date
+) -> list[MonthStats]:
+    """Evaluates the user's attendance policy for several months at once
+
+    Args:
+        base_record (BaseRecord): The user's base row holding their policy
+        month_records (Iterable[MonthRecord]): The month rows to evaluate
+        today (date): The current date of the user
+
+    Returns:
+        list[MonthStats]: The statistics of each month, in the same order
+    """
+    return [evaluate_month(base_record, record, today) for record in month_records]
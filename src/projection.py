@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from typing import Any, Iterable, Type
+
+from aws_lambda_powertools.shared.json_encoder import Encoder
+from aws_lambda_powertools.utilities.parser import BaseModel
+
+# Bodies smaller than this are sent uncompressed, as gzip would barely shrink them
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+
+# Always returned so that the client can identify the row and its version
+KEY_FIELDS = ("id", "month", "version")
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when a projection names a field the record does not have"""
+
+
+def parse_fields(
+    model: Type[BaseModel], fields: str | None, default: Iterable[str]
+) -> list[str]:
+    """Parses the fields= query string parameter of a request
+
+    Args:
+        model (Type[BaseModel]): The model of the record
+        fields (str | None): The comma separated field names, or "*" for every field
+        default (Iterable[str]): The fields to return when none were requested
+
+    Returns:
+        list[str]: The fields to return, in the order of the model
+    """
+    if fields is None:
+        requested = set(default)
+    elif fields.strip() == "*":
+        requested = set(model.__fields__)
+    else:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+
+    unknown = requested - set(model.__fields__)
+    if unknown:
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    requested.update(KEY_FIELDS)
+    return [field for field in model.__fields__ if field in requested]
+
+
+def projection_expression(fields: Iterable[str]) -> dict[str, Any]:
+    """Builds the DynamoDB arguments that only read the specified attributes
+
+    Args:
+        fields (Iterable[str]): The attribute names
+
+    Returns:
+        dict[str, Any]: The ProjectionExpression and ExpressionAttributeNames
+    """
+    # Placeholders are used for every name as attributes like month are reserved words
+    names = {f"#f{index}": field for index, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def project(
+    model: Type[BaseModel], item: dict[str, Any], fields: Iterable[str]
+) -> dict[str, Any]:
+    """Validates the projected attributes of an item against the model
+
+    Args:
+        model (Type[BaseModel]): The model of the record
+        item (dict[str, Any]): The item, which may only hold some of the attributes
+        fields (Iterable[str]): The fields to return
+
+    Returns:
+        dict[str, Any]: The validated fields, using the model's defaults for any
+            attribute that was not stored
+    """
+    projected: dict[str, Any] = {}
+    for field in fields:
+        model_field = model.__fields__[field]
+        if field not in item:
+            projected[field] = model_field.get_default()
+            continue
+
+        value, error = model_field.validate(item[field], projected, loc=field)
+        if error:
+            raise ValueError(f"Invalid stored value for {field}")
+        projected[field] = value
+
+    return projected
+
+
+def representation(fields: Iterable[str], default: Iterable[str]) -> str | None:
+    """Gets a short token identifying a non-default projection for use in an ETag
+
+    Args:
+        fields (Iterable[str]): The fields being returned
+        default (Iterable[str]): The fields of the default representation
+
+    Returns:
+        str | None: The token, or None for the default representation
+    """
+    fields = sorted(fields)
+    if fields == sorted(set(default) | set(KEY_FIELDS)):
+        return None
+    return hashlib.sha1(",".join(fields).encode()).hexdigest()[:8]
+
+
+def should_compress(body: Any) -> bool:
+    """Checks whether a JSON body is large enough to be worth compressing
+
+    Args:
+        body (Any): The body
+
+    Returns:
+        bool: Whether the body should be compressed
+    """
+    data = json.dumps(body, separators=(",", ":"), cls=Encoder)
+    return len(data) >= COMPRESS_MIN_BYTES
@@ -0,0 +1,112 @@
+import threading
+from contextvars import ContextVar
+from typing import Any
+
+from aws_lambda_powertools.event_handler import APIGatewayRestResolver
+from aws_lambda_powertools.utilities.data_classes import APIGatewayProxyEvent
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+
+class RequestScopedResolver(APIGatewayRestResolver):
+    """An API Gateway resolver that can resolve several requests at the same time
+
+    The Powertools resolver keeps the current event and the routing context on the
+    router, so requests resolved at the same time would see each other's. They are
+    kept in context variables instead, which each request has its own copy of when
+    it is resolved on its own thread, such as by the ASGI application.
+
+    This relies on private parts of the Powertools resolver, which are pinned by
+    tests/test_resolver.py so that an upgrade which changes them fails the tests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._current_event: ContextVar[APIGatewayProxyEvent] = ContextVar(
+            "current_event"
+        )
+        self._lambda_context: ContextVar[LambdaContext] = ContextVar("lambda_context")
+        self._context: ContextVar[dict[str, Any]] = ContextVar("context")
+        self._frames: ContextVar[list[str]] = ContextVar("processed_stack_frames")
+        self._matched_rule: ContextVar[str | None] = ContextVar(
+            "matched_rule", default=None
+        )
+        self._build_lock = threading.Lock()
+        self._stacks_built = False
+        super().__init__(*args, **kwargs)
+
+    @property
+    def current_event(self) -> APIGatewayProxyEvent:
+        return self._current_event.get()
+
+    @property
+    def lambda_context(self) -> LambdaContext:
+        return self._lambda_context.get()
+
+    @property
+    def context(self) -> dict[str, Any]:
+        return self._context.get()
+
+    @context.setter
+    def context(self, value: dict[str, Any]) -> None:
+        self._context.set(value)
+
+    @property
+    def processed_stack_frames(self) -> list[str]:
+        return self._frames.get()
+
+    @processed_stack_frames.setter
+    def processed_stack_frames(self, value: list[str]) -> None:
+        self._frames.set(value)
+
+    @property
+    def matched_rule(self) -> str | None:
+        """The rule that the last request resolved in this context matched"""
+        # Kept once the request is resolved, as Powertools clears its routing context
+        return self._matched_rule.get()
+
+    def resolve(self, event: dict[str, Any], context: LambdaContext) -> dict[str, Any]:
+        self._build_middleware_stacks()
+        self._matched_rule.set(None)
+        tokens = [
+            (
+                self._current_event,
+                self._current_event.set(super()._to_proxy_event(event)),
+            ),
+            (self._lambda_context, self._lambda_context.set(context)),
+            (self._context, self._context.set({})),
+            (self._frames, self._frames.set([])),
+        ]
+        try:
+            return super().resolve(event, context)
+        finally:
+            # Requests that raised never cleared their routing context
+            self._remember_rule()
+            for variable, token in reversed(tokens):
+                variable.reset(token)
+
+    def clear_context(self) -> None:
+        self._remember_rule()
+        super().clear_context()
+
+    def _remember_rule(self) -> None:
+        route = self.context.get("_route")
+        if route is not None:
+            self._matched_rule.set(route.path)
+
+    def _to_proxy_event(self, event: dict[str, Any]) -> APIGatewayProxyEvent:
+        # The event has already been converted for this request before resolving it
+        current_event = self._current_event.get(None)
+        if current_event is not None and current_event.raw_event is event:
+            return current_event
+        return super()._to_proxy_event(event)
+
+    def _build_middleware_stacks(self) -> None:
+        # Routes build their middleware stack on first use, which isn't thread safe
+        if self._stacks_built:
+            return
+        with self._build_lock:
+            for route in self._static_routes + self._dynamic_routes:
+                if not route._middleware_stack_built:
+                    route._build_middleware_stack(
+                        router_middlewares=self._router_middlewares
+                    )
+            self._stacks_built = True
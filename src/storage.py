@@ -0,0 +1,688 @@
+import copy
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+import capacity
+import projection
+
+STORAGE_BACKEND = os.environ.get("RTO_STORAGE", "dynamodb")
+SQLITE_PATH = os.environ.get("RTO_SQLITE_PATH", "rto.sqlite3")
+
+table_name = os.environ.get("RTO_TABLE_NAME", "rto-table")
+# With global tables, reads use the replica in the Lambda's own region while writes
+# can be pinned to a single region so that conflicts are settled by conditions
+write_region = os.environ.get("RTO_WRITE_REGION")
+
+# BatchWriteItem takes at most 25 items, and returns those it could not write
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_ATTEMPTS = int(os.environ.get("BATCH_WRITE_ATTEMPTS", 8))
+BATCH_WRITE_BACKOFF = float(os.environ.get("BATCH_WRITE_BACKOFF", 0.05))
+
+Item = dict[str, Any]
+
+
+class ConditionFailedError(Exception):
+    """Raised when a conditional write was rejected because of the stored row
+
+    Args:
+        item (Item | None): The stored row that failed the condition, if known
+    """
+
+    def __init__(self, item: Item | None = None):
+        super().__init__("The condition of the write was not met")
+        self.item = item
+
+
+class UnprocessedItemsError(Exception):
+    """Raised when a batch read or write still had unprocessed items after every attempt
+
+    Args:
+        request (dict[str, Any]): The unprocessed part of the request
+    """
+
+    def __init__(self, request: dict[str, Any]):
+        super().__init__("The batch request was not fully processed")
+        self.request = request
+
+
+class Repository(ABC):
+    """The rows of the tracker, keyed by the user's GUID and a sort key
+
+    The sort key is "_base" for the user's base row, the month in the YYYY-MM format
+    for month rows, and prefixed for check-in events and yearly summaries.
+    """
+
+    def get_base(self, guid: str, fields: Iterable[str] | None = None) -> Item | None:
+        """Gets the user's base row
+
+        Args:
+            guid (str): The GUID of the user
+            fields (Iterable[str] | None): The attributes to read, defaults to all
+
+        Returns:
+            Item | None: The row, if it exists
+        """
+        return self.get_month(guid, "_base", fields)
+
+    @abstractmethod
+    def get_month(
+        self, guid: str, month: str, fields: Iterable[str] | None = None
+    ) -> Item | None:
+        """Gets one of the user's rows by its sort key
+
+        Args:
+            guid (str): The GUID of the user
+            month (str): The sort key of the row
+            fields (Iterable[str] | None): The attributes to read, defaults to all
+
+        Returns:
+            Item | None: The row, if it exists
+        """
+
+    @abstractmethod
+    def batch_get(self, guid: str, months: Iterable[str]) -> dict[str, Item]:
+        """Gets several of the user's rows in a single round trip
+
+        Args:
+            guid (str): The GUID of the user
+            months (Iterable[str]): The sort keys of the rows
+
+        Returns:
+            dict[str, Item]: The rows that exist, keyed by their sort key
+        """
+
+    @abstractmethod
+    def query_months(self, guid: str, prefix: str) -> list[Item]:
+        """Gets the user's rows whose sort key starts with the prefix
+
+        Args:
+            guid (str): The GUID of the user
+            prefix (str): The start of the sort key, such as "2024-"
+
+        Returns:
+            list[Item]: The rows, ordered by their sort key
+        """
+
+    @abstractmethod
+    def batch_put(self, items: Iterable[Item]) -> None:
+        """Creates or replaces several rows
+
+        Args:
+            items (Iterable[Item]): The rows
+        """
+
+    @abstractmethod
+    def put_new(self, item: Item) -> bool:
+        """Creates a row unless it already exists
+
+        Args:
+            item (Item): The row
+
+        Returns:
+            bool: Whether the row was created
+        """
+
+    def record_checkin(
+        self, guid: str, month: str, day: str, ip: str, request_id: str | None
+    ) -> None:
+        """Records the office IP address against a day that has not been attended
+
+        Args:
+            guid (str): The GUID of the user
+            month (str): The month in the YYYY-MM format
+            day (str): The day of the month
+            ip (str): The office IP address
+            request_id (str | None): The Idempotency-Key of the check-in
+
+        Raises:
+            ConditionFailedError: The day has already been recorded, with the stored
+                month row when it is available
+        """
+        self.record_days(guid, month, {day: ip}, request_id)
+
+    @abstractmethod
+    def record_days(
+        self, guid: str, month: str, days: dict[str, str], request_id: str | None
+    ) -> None:
+        """Records office IP addresses against several days of a month row at once
+
+        Either every day is recorded or, if any of them has already been attended,
+        none are.
+
+        Args:
+            guid (str): The GUID of the user
+            month (str): The month in the YYYY-MM format
+            days (dict[str, str]): The office IP addresses keyed by day of the month
+            request_id (str | None): The Idempotency-Key of the latest check-in
+
+        Raises:
+            ConditionFailedError: A day has already been recorded, with the stored
+                month row when it is available
+        """
+
+    def set_leave(self, guid: str, month: str, leave: dict[str, str | None]) -> bool:
+        """Replaces the leave days of an existing month row
+
+        Args:
+            guid (str): The GUID of the user
+            month (str): The month in the YYYY-MM format
+            leave (dict[str, str | None]): The leave reasons keyed by day
+
+        Returns:
+            bool: Whether the month row exists
+        """
+        return self.set_attribute(guid, month, "leave", dict(leave))
+
+    def set_office_networks(
+        self, guid: str, networks: list[str], version: int | None = None
+    ) -> bool:
+        """Replaces the fingerprints of the networks the user has checked in from
+
+        Args:
+            guid (str): The GUID of the user
+            networks (list[str]): The network fingerprints
+            version (int | None): Only replaces them if the base row is still at
+                this version
+
+        Returns:
+            bool: Whether the base row exists
+
+        Raises:
+            ConditionFailedError: The base row is at another version, with the
+                stored row when it is available
+        """
+        return self.set_attribute(
+            guid, "_base", "office_networks", list(networks), version
+        )
+
+    @abstractmethod
+    def set_attribute(
+        self, guid: str, month: str, name: str, value: Any, version: int | None = None
+    ) -> bool:
+        """Replaces an attribute of an existing row and increments its version
+
+        Args:
+            guid (str): The GUID of the user
+            month (str): The sort key of the row
+            name (str): The name of the attribute
+            value (Any): The new value
+            version (int | None): Only replaces it if the row is still at this
+                version
+
+        Returns:
+            bool: Whether the row exists
+
+        Raises:
+            ConditionFailedError: The row is at another version, with the stored row
+                when it is available
+        """
+
+    def reconnect(self) -> None:
+        """Recreates any connections, such as after a snapshot is restored"""
+
+
+def create_tables():
+    """Creates the DynamoDB resource and the tables used for reads and writes"""
+    resource = boto3.resource("dynamodb")
+    table = resource.Table(table_name)
+    if write_region and write_region != resource.meta.client.meta.region_name:
+        return (
+            resource,
+            table,
+            boto3.resource("dynamodb", region_name=write_region).Table(table_name),
+        )
+
+    return resource, table, table
+
+
+class DynamoDBRepository(Repository):
+    """Stores the rows in the DynamoDB tracker table"""
+
+    def __init__(self):
+        self.reconnect()
+
+    def reconnect(self) -> None:
+        self.dynamodb, self.table, self.write_table = create_tables()
+        # The client of a resource converts items to and from the DynamoDB types
+        self.write_dynamodb = self.write_table.meta.client
+        capacity.instrument(self.dynamodb.meta.client)
+        capacity.instrument(self.write_dynamodb)
+
+    def get_base(self, guid: str, fields: Iterable[str] | None = None) -> Item | None:
+        base_row = self.get_month(guid, "_base", fields)
+        if base_row is None and self.write_table is not self.table:
+            # Users who have just signed up may not have been replicated here yet
+            kwargs = projection.projection_expression(fields) if fields else {}
+            base_row = self.write_table.get_item(
+                Key={"id": guid, "month": "_base"}, ConsistentRead=True, **kwargs
+            ).get("Item")
+        return base_row
+
+    def get_month(
+        self, guid: str, month: str, fields: Iterable[str] | None = None
+    ) -> Item | None:
+        kwargs = projection.projection_expression(fields) if fields else {}
+        return self.table.get_item(Key={"id": guid, "month": month}, **kwargs).get(
+            "Item"
+        )
+
+    def batch_get(self, guid: str, months: Iterable[str]) -> dict[str, Item]:
+        months = list(months)
+        rows = self._batch_get(self.dynamodb, self.table, guid, months)
+        if (
+            "_base" in months
+            and "_base" not in rows
+            and self.write_table is not self.table
+        ):
+            # Users who have just signed up may not have been replicated here yet
+            missing = [month for month in months if month not in rows]
+            rows.update(
+                self._batch_get(
+                    self.write_dynamodb, self.write_table, guid, missing, True
+                )
+            )
+        return rows
+
+    @staticmethod
+    def _batch_get(
+        dynamodb: Any,
+        table: Any,
+        guid: str,
+        months: list[str],
+        consistent: bool = False,
+    ) -> dict[str, Item]:
+        request = {
+            table.name: {
+                "Keys": [{"id": guid, "month": month} for month in months],
+                "ConsistentRead": consistent,
+            }
+        }
+        rows: dict[str, Item] = {}
+        for attempt in range(BATCH_WRITE_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response["Responses"].get(table.name, []):
+                rows[item["month"]] = item
+            request = response.get("UnprocessedKeys")
+            if not request:
+                return rows
+            # Unprocessed keys are returned when the partition is throttled, so
+            # wait with full jitter before reading them again
+            time.sleep(random.uniform(0, BATCH_WRITE_BACKOFF * 2**attempt))
+
+        raise UnprocessedItemsError(request)
+
+    def query_months(self, guid: str, prefix: str) -> list[Item]:
+        items: list[Item] = []
+        query = {
+            "KeyConditionExpression": Key("id").eq(guid)
+            & Key("month").begins_with(prefix),
+        }
+        while True:
+            response = self.table.query(**query)
+            items.extend(response["Items"])
+            if "LastEvaluatedKey" not in response:
+                return items
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def batch_put(self, items: Iterable[Item]) -> None:
+        items = list(items)
+        if len(items) == 1:
+            self.write_table.put_item(Item=items[0])
+            return
+
+        for start in range(0, len(items), BATCH_WRITE_SIZE):
+            request = {
+                self.write_table.name: [
+                    {"PutRequest": {"Item": item}}
+                    for item in items[start : start + BATCH_WRITE_SIZE]
+                ]
+            }
+            for attempt in range(BATCH_WRITE_ATTEMPTS):
+                response = self.write_dynamodb.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems")
+                if not request:
+                    break
+                # Unprocessed items are returned when the partition is throttled, so
+                # wait with full jitter before sending them again
+                time.sleep(random.uniform(0, BATCH_WRITE_BACKOFF * 2**attempt))
+            else:
+                raise UnprocessedItemsError(request)
+
+    def put_new(self, item: Item) -> bool:
+        try:
+            self.write_table.put_item(
+                Item=item, ConditionExpression="attribute_not_exists(id)"
+            )
+        except self.write_table.meta.client.exceptions.ConditionalCheckFailedException:
+            # Created concurrently, or elsewhere and not yet replicated to this region
+            return False
+
+        return True
+
+    def record_days(
+        self, guid: str, month: str, days: dict[str, str], request_id: str | None
+    ) -> None:
+        names = {f"#d{index}": day for index, day in enumerate(days)}
+        values = {f":ip{index}": ip for index, ip in enumerate(days.values())}
+        try:
+            # The request ID is stored alongside the days so that a retry racing the
+            # original can be recognised from the failed condition alone
+            self.write_table.update_item(
+                Key={"id": guid, "month": month},
+                UpdateExpression=(
+                    "SET "
+                    + ", ".join(
+                        f"days.{name} = :ip{index}" for index, name in enumerate(names)
+                    )
+                    + ", last_request_id = :request_id ADD version :one"
+                ),
+                ConditionExpression=" AND ".join(
+                    f"attribute_type(days.{name}, :null)" for name in names
+                ),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={
+                    **values,
+                    ":request_id": request_id,
+                    ":one": 1,
+                    ":null": "NULL",
+                },
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        except (
+            self.write_table.meta.client.exceptions.ConditionalCheckFailedException
+        ) as exc:
+            raise ConditionFailedError(_failed_item(exc)) from exc
+
+    def set_attribute(
+        self, guid: str, month: str, name: str, value: Any, version: int | None = None
+    ) -> bool:
+        condition = "attribute_exists(id)"
+        values = {":value": value, ":one": 1}
+        if version is not None:
+            condition += " AND version = :version"
+            values[":version"] = version
+        try:
+            self.write_table.update_item(
+                Key={"id": guid, "month": month},
+                UpdateExpression="SET #name = :value ADD version :one",
+                ConditionExpression=condition,
+                ExpressionAttributeNames={"#name": name},
+                ExpressionAttributeValues=values,
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        except (
+            self.write_table.meta.client.exceptions.ConditionalCheckFailedException
+        ) as exc:
+            stored = _failed_item(exc)
+            if stored is None:
+                return False
+            raise ConditionFailedError(stored) from exc
+
+        return True
+
+
+def _failed_item(exc: ClientError) -> Item | None:
+    # The old item of a failed condition is returned with its raw types
+    deserializer = TypeDeserializer()
+    stored = exc.response.get("Item")
+    if not stored:
+        return None
+    return {key: deserializer.deserialize(value) for key, value in stored.items()}
+
+
+def _unattended(item: Item, days: Iterable[str]) -> bool:
+    return all(item["days"].get(day, "missing") is None for day in days)
+
+
+def _select(item: Item, fields: Iterable[str] | None) -> Item:
+    if not fields:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+class MemoryRepository(Repository):
+    """Stores the rows in a dictionary, for tests, local development and load tests"""
+
+    def __init__(self):
+        self._rows: dict[tuple[str, str], Item] = {}
+        self._lock = threading.Lock()
+
+    def get_month(
+        self, guid: str, month: str, fields: Iterable[str] | None = None
+    ) -> Item | None:
+        with self._lock:
+            item = self._rows.get((guid, month))
+            return copy.deepcopy(_select(item, fields)) if item else None
+
+    def batch_get(self, guid: str, months: Iterable[str]) -> dict[str, Item]:
+        with self._lock:
+            return {
+                month: copy.deepcopy(self._rows[(guid, month)])
+                for month in months
+                if (guid, month) in self._rows
+            }
+
+    def query_months(self, guid: str, prefix: str) -> list[Item]:
+        with self._lock:
+            return [
+                copy.deepcopy(item)
+                for (row_guid, month), item in sorted(self._rows.items())
+                if row_guid == guid and month.startswith(prefix)
+            ]
+
+    def batch_put(self, items: Iterable[Item]) -> None:
+        with self._lock:
+            for item in items:
+                self._rows[(item["id"], item["month"])] = copy.deepcopy(item)
+
+    def put_new(self, item: Item) -> bool:
+        with self._lock:
+            key = (item["id"], item["month"])
+            if key in self._rows:
+                return False
+            self._rows[key] = copy.deepcopy(item)
+            return True
+
+    def record_days(
+        self, guid: str, month: str, days: dict[str, str], request_id: str | None
+    ) -> None:
+        with self._lock:
+            item = self._rows.get((guid, month))
+            if item is None or not _unattended(item, days):
+                raise ConditionFailedError(copy.deepcopy(item))
+
+            item["days"].update(days)
+            item["last_request_id"] = request_id
+            item["version"] = item.get("version", 0) + 1
+
+    def set_attribute(
+        self, guid: str, month: str, name: str, value: Any, version: int | None = None
+    ) -> bool:
+        with self._lock:
+            item = self._rows.get((guid, month))
+            if item is None:
+                return False
+            if version is not None and item.get("version", 0) != version:
+                raise ConditionFailedError(copy.deepcopy(item))
+
+            item[name] = copy.deepcopy(value)
+            item["version"] = item.get("version", 0) + 1
+            return True
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class SQLiteRepository(Repository):
+    """Stores the rows as JSON in a SQLite database, for self-hosting without AWS
+
+    The database uses write-ahead logging so that readers are not blocked by a
+    writer, and every statement is a constant so sqlite3 reuses its prepared form.
+
+    Args:
+        path (str): The path of the database file
+    """
+
+    _CREATE = (
+        "CREATE TABLE IF NOT EXISTS tracker ("
+        "id TEXT NOT NULL, month TEXT NOT NULL, item TEXT NOT NULL, "
+        "PRIMARY KEY (id, month)) WITHOUT ROWID"
+    )
+    _SELECT = "SELECT item FROM tracker WHERE id = ? AND month = ?"
+    _SELECT_RANGE = (
+        "SELECT item FROM tracker WHERE id = ? AND month >= ? AND month < ? "
+        "ORDER BY month"
+    )
+    _UPSERT = "INSERT OR REPLACE INTO tracker (id, month, item) VALUES (?, ?, ?)"
+    _INSERT = "INSERT OR IGNORE INTO tracker (id, month, item) VALUES (?, ?, ?)"
+    _UPDATE = "UPDATE tracker SET item = ? WHERE id = ? AND month = ?"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self.connection().execute(self._CREATE)
+
+    def connection(self) -> sqlite3.Connection:
+        """Gets the connection of the current thread
+
+        Returns:
+            sqlite3.Connection: The connection
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Transactions are managed explicitly so that reads never start one
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            self._local.connection = connection
+        return connection
+
+    def reconnect(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self.connection()
+        # Take the write lock up front so the read-modify-write cannot interleave
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _get(self, connection: sqlite3.Connection, guid: str, month: str):
+        row = connection.execute(self._SELECT, (guid, month)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_month(
+        self, guid: str, month: str, fields: Iterable[str] | None = None
+    ) -> Item | None:
+        item = self._get(self.connection(), guid, month)
+        return _select(item, fields) if item else None
+
+    def batch_get(self, guid: str, months: Iterable[str]) -> dict[str, Item]:
+        connection = self.connection()
+        rows = {}
+        for month in months:
+            item = self._get(connection, guid, month)
+            if item is not None:
+                rows[month] = item
+        return rows
+
+    def query_months(self, guid: str, prefix: str) -> list[Item]:
+        rows = self.connection().execute(
+            self._SELECT_RANGE, (guid, prefix, prefix + "\uffff")
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def batch_put(self, items: Iterable[Item]) -> None:
+        with self._transaction() as connection:
+            connection.executemany(
+                self._UPSERT,
+                [
+                    (item["id"], item["month"], json.dumps(item, default=_json_default))
+                    for item in items
+                ],
+            )
+
+    def put_new(self, item: Item) -> bool:
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                self._INSERT,
+                (item["id"], item["month"], json.dumps(item, default=_json_default)),
+            )
+            return cursor.rowcount == 1
+
+    def _update(
+        self, connection: sqlite3.Connection, guid: str, month: str, item: Item
+    ) -> None:
+        item["version"] = item.get("version", 0) + 1
+        connection.execute(
+            self._UPDATE, (json.dumps(item, default=_json_default), guid, month)
+        )
+
+    def record_days(
+        self, guid: str, month: str, days: dict[str, str], request_id: str | None
+    ) -> None:
+        with self._transaction() as connection:
+            item = self._get(connection, guid, month)
+            if item is None or not _unattended(item, days):
+                raise ConditionFailedError(item)
+
+            item["days"].update(days)
+            item["last_request_id"] = request_id
+            self._update(connection, guid, month, item)
+
+    def set_attribute(
+        self, guid: str, month: str, name: str, value: Any, version: int | None = None
+    ) -> bool:
+        with self._transaction() as connection:
+            item = self._get(connection, guid, month)
+            if item is None:
+                return False
+            if version is not None and item.get("version", 0) != version:
+                raise ConditionFailedError(item)
+
+            item[name] = value
+            self._update(connection, guid, month, item)
+            return True
+
+
+def create_repository(backend: str = STORAGE_BACKEND) -> Repository:
+    """Creates the repository of the configured storage backend
+
+    Args:
+        backend (str): Either "dynamodb", "memory" or "sqlite"
+
+    Returns:
+        Repository: The repository
+    """
+    if backend == "memory":
+        return MemoryRepository()
+    if backend == "sqlite":
+        return SQLiteRepository()
+    if backend == "dynamodb":
+        return DynamoDBRepository()
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -2,6 +2,7 @@ import datetime
 import json
 import os
 import sys
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from zoneinfo import ZoneInfo
@@ -31,6 +32,24 @@ def lambda_context():
     return LambdaContext()
 
 
+@pytest.fixture
+def sydney_location(monkeypatch):
+    """Answers IP location lookups without calling ip-api.com"""
+    import apigw
+
+    def mock_get_ip_location(ipaddr):
+        return apigw.location.IpApiResponse(
+            status="success",
+            country="Australia",
+            countryCode="AU",
+            region="NSW",
+            regionName="New South Wales",
+            timezone="Australia/Sydney",
+        )
+
+    monkeypatch.setattr(apigw.location, "get_ip_location", mock_get_ip_location)
+
+
 @pytest.fixture(scope="function")
 def aws_credentials():
     """Mocked AWS Credentials for moto."""
@@ -78,6 +97,15 @@ def setup_dynamodb(aws):
     ddb_client.delete_table(TableName="rto-table")
 
 
+@pytest.fixture(autouse=True)
+def reset_checkin_guard(aws):
+    import apigw
+
+    apigw.checkin_cache.clear()
+    apigw.rate_limiter.clear()
+    yield
+
+
 @pytest.fixture(scope="function")
 def setup_base_record(aws):
     rto_table = boto3.resource("dynamodb").Table("rto-table")
@@ -86,6 +114,8 @@ def setup_base_record(aws):
         "62FDC0E4-FB39-4820-A751-AA4D0080BB74", "Australia/Sydney"
     )
     base.office_ips.append("1.2.3.4")
+    # Signed up before the months the tests look at
+    base.created_at = "2024-01-01"
 
     rto_table.put_item(Item=base.dict())
     yield
@@ -154,6 +184,37 @@ def describe_post_ping():
         response = apigw.handler(event, lambda_context)
         assert response["statusCode"] == 200
 
+    @mock_aws
+    def logs_consumed_capacity(monkeypatch, lambda_context, setup_month_record):
+        import apigw
+        import log_config
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 1, tzinfo=ZoneInfo(timezone))
+
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+        monkeypatch.setattr(log_config, "DEFAULT_SAMPLE_RATE", 1.0)
+        monkeypatch.setattr(log_config, "SAMPLE_RATES", {})
+        logged = []
+        monkeypatch.setattr(
+            apigw.logger, "info", lambda msg, **fields: logged.append(fields)
+        )
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+        }
+        apigw.handler(event, lambda_context)
+
+        assert logged[-1]["route"] == "POST /checkin/<guid>"
+        assert logged[-1]["rcu"] > 0
+        assert logged[-1]["wcu"] > 0
+        assert logged[-1]["dynamodb_calls"]["UpdateItem"] == 1
+
     @mock_aws
     def returns_200_when_month_not_exists(
         monkeypatch, lambda_context, setup_base_record
@@ -261,6 +322,212 @@ def describe_post_ping():
         )["Item"]
         assert month_record["days"]["5"] is not None
 
+    @mock_aws
+    def event_appended_for_every_ping(monkeypatch, lambda_context, setup_month_record):
+        from boto3.dynamodb.conditions import Key
+
+        import apigw
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 6, 9, tzinfo=ZoneInfo(timezone))
+
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "5.6.7.8"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+        }
+        apigw.handler(event, lambda_context)
+
+        rto_table = boto3.resource("dynamodb").Table("rto-table")
+        events = rto_table.query(
+            KeyConditionExpression=Key("id").eq("62FDC0E4-FB39-4820-A751-AA4D0080BB74")
+            & Key("month").begins_with("evt#2024-05-06")
+        )["Items"]
+        month_record = rto_table.get_item(
+            Key={"id": "62FDC0E4-FB39-4820-A751-AA4D0080BB74", "month": "2024-05"}
+        )["Item"]
+
+        assert [(e["ip"], e["office"]) for e in events] == [("5.6.7.8", False)]
+        assert month_record["version"] == 0
+
+    @mock_aws
+    def flags_responses_once_office_day_recorded(
+        monkeypatch, lambda_context, setup_month_record
+    ):
+        import apigw
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 6, 9, tzinfo=ZoneInfo(timezone))
+
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "5.6.7.8"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+        }
+        response = apigw.handler(event, lambda_context)
+        assert "X-Office-Recorded" not in response["multiValueHeaders"]
+
+        event["requestContext"]["identity"]["sourceIp"] = "1.2.3.4"
+        response = apigw.handler(event, lambda_context)
+        assert response["multiValueHeaders"]["X-Office-Recorded"] == ["true"]
+
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 202
+        assert response["multiValueHeaders"]["X-Office-Recorded"] == ["true"]
+
+    @mock_aws
+    def returns_202_from_cache_without_reading_table(
+        monkeypatch, lambda_context, setup_month_record
+    ):
+        import apigw
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 6, tzinfo=ZoneInfo(timezone))
+
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+        }
+        assert apigw.handler(event, lambda_context)["statusCode"] == 200
+
+        rto_table = boto3.resource("dynamodb").Table("rto-table")
+        rto_table.delete_item(
+            Key={"id": "62FDC0E4-FB39-4820-A751-AA4D0080BB74", "month": "_base"}
+        )
+
+        assert apigw.handler(event, lambda_context)["statusCode"] == 202
+
+    @mock_aws
+    def retried_idempotency_key_returns_original_response(
+        monkeypatch, lambda_context, setup_month_record
+    ):
+        import apigw
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 6, tzinfo=ZoneInfo(timezone))
+
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+            "headers": {"Idempotency-Key": "retry-1"},
+        }
+        assert apigw.handler(event, lambda_context)["statusCode"] == 200
+        assert apigw.handler(event, lambda_context)["statusCode"] == 200
+
+        apigw.checkin_cache.clear()
+        assert apigw.handler(event, lambda_context)["statusCode"] == 200
+
+        rto_table = boto3.resource("dynamodb").Table("rto-table")
+        month_record = rto_table.get_item(
+            Key={"id": "62FDC0E4-FB39-4820-A751-AA4D0080BB74", "month": "2024-05"}
+        )["Item"]
+        assert month_record["last_request_id"] == "retry-1"
+        assert month_record["version"] == 1
+
+        event["headers"] = {"Idempotency-Key": "another"}
+        assert apigw.handler(event, lambda_context)["statusCode"] == 202
+
+    @mock_aws
+    def queues_checkin_when_queue_configured(
+        monkeypatch, lambda_context, setup_base_record
+    ):
+        import apigw
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 6, 9, tzinfo=ZoneInfo(timezone))
+
+        sqs = boto3.client("sqs")
+        queue_url = sqs.create_queue(QueueName="rto-checkins")["QueueUrl"]
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+        monkeypatch.setattr(apigw, "checkin_queue_url", queue_url)
+        monkeypatch.setattr(apigw, "sqs_client", sqs)
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+            "headers": {"Idempotency-Key": "queued-1"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 202
+        assert response["multiValueHeaders"]["X-Office-Recorded"] == ["queued"]
+        assert apigw.checkin_cache.get("62FDC0E4-FB39-4820-A751-AA4D0080BB74") is None
+
+        messages = sqs.receive_message(QueueUrl=queue_url)["Messages"]
+        assert json.loads(messages[0]["Body"]) == {
+            "id": "62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "at": "2024-05-06T09:00:00+10:00",
+            "ip": "1.2.3.4",
+            "office": True,
+            "request_id": "queued-1",
+        }
+
+        rto_table = boto3.resource("dynamodb").Table("rto-table")
+        month_record = rto_table.get_item(
+            Key={"id": "62FDC0E4-FB39-4820-A751-AA4D0080BB74", "month": "2024-05"}
+        )["Item"]
+        assert month_record["days"]["6"] is None
+
+        # Only a check-in after the consumer has written the day is told it is recorded
+        rto_table.update_item(
+            Key={"id": "62FDC0E4-FB39-4820-A751-AA4D0080BB74", "month": "2024-05"},
+            UpdateExpression="SET days.#day = :ip, last_request_id = :request_id",
+            ExpressionAttributeNames={"#day": "6"},
+            ExpressionAttributeValues={":ip": "1.2.3.4", ":request_id": "queued-1"},
+        )
+        event["headers"] = {"Idempotency-Key": "queued-2"}
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 202
+        assert response["multiValueHeaders"]["X-Office-Recorded"] == ["true"]
+
+    @mock_aws
+    def returns_429_when_rate_limited(monkeypatch, lambda_context, setup_base_record):
+        import apigw
+        from checkin_guard import RateLimiter
+
+        monkeypatch.setattr(
+            apigw, "rate_limiter", RateLimiter(capacity=1, refill_per_minute=1)
+        )
+
+        event = {
+            "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "POST",
+            "requestContext": {
+                "identity": {"sourceIp": "5.6.7.8"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+        }
+        assert apigw.handler(event, lambda_context)["statusCode"] == 200
+
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 429
+        assert response["multiValueHeaders"]["Retry-After"] == ["60"]
+
 
 def describe_get_stats():
     def returns_404_when_no_month_row(lambda_context):
@@ -297,7 +564,7 @@ def describe_get_stats():
                 "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
             }
             response = apigw.handler(event, lambda_context)
-            assert response["body"] == '{"attendance":0.0}'
+            assert json.loads(response["body"])["attendance"] == 0.0
 
         def is_13_when_3days_in_2024_may(
             monkeypatch, lambda_context, setup_month_record
@@ -326,6 +593,165 @@ def describe_get_stats():
             attendance = int(json.loads(response["body"])["attendance"])
             assert attendance == 13
 
+    def describe_policy():
+        def applies_percentage_and_leave(
+            monkeypatch, lambda_context, setup_month_record
+        ):
+            import apigw
+
+            def mock_get_current_date(timezone):
+                return datetime.datetime(2024, 5, 15, tzinfo=ZoneInfo(timezone))
+
+            monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+            leave = apigw.handler(
+                {
+                    "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05/leave",
+                    "httpMethod": "PUT",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                    "headers": {"Content-Type": "application/json"},
+                    "body": json.dumps({"days": {"1": "Annual leave", "2": None}}),
+                },
+                lambda_context,
+            )
+            assert leave["statusCode"] == 200
+
+            response = apigw.handler(
+                {
+                    "path": "/stats/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05",
+                    "httpMethod": "GET",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                },
+                lambda_context,
+            )
+            stats = json.loads(response["body"])
+            assert stats["eligible_days"] == 21
+            assert stats["required_days"] == 11
+            assert stats["remaining_workable_days"] == 13
+            assert stats["on_track"] is False
+
+        def applies_leave_to_future_months(
+            monkeypatch, lambda_context, setup_base_record
+        ):
+            import apigw
+
+            def mock_get_current_date(timezone):
+                return datetime.datetime(2024, 5, 15, tzinfo=ZoneInfo(timezone))
+
+            monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+            # Nobody has checked in to June yet, so it has no month row
+            leave = apigw.handler(
+                {
+                    "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/06/leave",
+                    "httpMethod": "PUT",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                    "headers": {"Content-Type": "application/json"},
+                    "body": json.dumps({"days": {"3": "Annual leave", "4": None}}),
+                },
+                lambda_context,
+            )
+            assert leave["statusCode"] == 200
+
+            response = apigw.handler(
+                {
+                    "path": "/stats/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/06",
+                    "httpMethod": "GET",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                },
+                lambda_context,
+            )
+            assert response["statusCode"] == 200
+            assert json.loads(response["body"])["eligible_days"] == 18
+
+        def returns_404_when_leave_user_missing(lambda_context, aws):
+            import apigw
+
+            response = apigw.handler(
+                {
+                    "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/06/leave",
+                    "httpMethod": "PUT",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                    "headers": {"Content-Type": "application/json"},
+                    "body": json.dumps({"days": {"3": None}}),
+                },
+                lambda_context,
+            )
+            assert response["statusCode"] == 404
+
+        def returns_422_when_leave_day_invalid(lambda_context, setup_month_record):
+            import apigw
+
+            response = apigw.handler(
+                {
+                    "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05/leave",
+                    "httpMethod": "PUT",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                    "headers": {"Content-Type": "application/json"},
+                    "body": json.dumps({"days": {"32": None}}),
+                },
+                lambda_context,
+            )
+            assert response["statusCode"] == 422
+
+    def describe_year():
+        def returns_every_month_of_year(lambda_context, setup_month_record):
+            import apigw
+
+            rto_table = boto3.resource("dynamodb").Table("rto-table")
+            rto_table.put_item(
+                Item=generate_tracker_month_entry(
+                    "62FDC0E4-FB39-4820-A751-AA4D0080BB74", 2024, 6
+                ).dict()
+            )
+
+            response = apigw.handler(
+                {
+                    "path": "/stats/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024",
+                    "httpMethod": "GET",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                },
+                lambda_context,
+            )
+            months = json.loads(response["body"])["months"]
+            assert [month["month"] for month in months] == ["2024-05", "2024-06"]
+
+        def includes_archived_months(lambda_context, setup_month_record):
+            import apigw
+            import archive
+
+            guid = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+            archive.archive_user(guid, "2024-06")
+            rto_table = boto3.resource("dynamodb").Table("rto-table")
+            rto_table.put_item(Item=generate_tracker_month_entry(guid, 2024, 6).dict())
+
+            response = apigw.handler(
+                {
+                    "path": f"/stats/{guid}/2024",
+                    "httpMethod": "GET",
+                    "requestContext": {
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"
+                    },
+                },
+                lambda_context,
+            )
+            months = json.loads(response["body"])["months"]
+            assert [month["month"] for month in months] == ["2024-05", "2024-06"]
+
 
 def describe_put_dashboard():
     def returns_200_when_created_without_timezone(lambda_context):
@@ -387,6 +813,117 @@ def describe_put_dashboard():
 
         assert "Item" in base_record and "Item" in month_record
 
+    @mock_aws
+    def speculative_holidays_used_when_country_matches(
+        monkeypatch, lambda_context, sydney_location
+    ):
+        import apigw
+
+        lookups = []
+
+        def mock_get_public_holidays(kwargs):
+            lookups.append(kwargs)
+            return {}
+
+        monkeypatch.setattr(apigw, "get_public_holidays", mock_get_public_holidays)
+        monkeypatch.setattr(
+            apigw, "timezone_countries", {"Australia/Sydney": "Australia"}
+        )
+
+        event = {
+            "path": "/dashboard",
+            "httpMethod": "PUT",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"timezone": "Australia/Sydney"}),
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert [args.country for args in lookups] == ["Australia"]
+
+    @mock_aws
+    def holidays_refetched_when_speculation_wrong(
+        monkeypatch, lambda_context, sydney_location
+    ):
+        import apigw
+
+        lookups = []
+
+        def mock_get_public_holidays(kwargs):
+            lookups.append(kwargs)
+            return {}
+
+        monkeypatch.setattr(apigw, "get_public_holidays", mock_get_public_holidays)
+        monkeypatch.setattr(
+            apigw, "timezone_countries", {"Australia/Sydney": "New Zealand"}
+        )
+
+        event = {
+            "path": "/dashboard",
+            "httpMethod": "PUT",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"timezone": "Australia/Sydney"}),
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert sorted(args.country for args in lookups) == [
+            "Australia",
+            "New Zealand",
+        ]
+        assert apigw.timezone_countries["Australia/Sydney"] == "Australia"
+
+    @mock_aws
+    def holidays_looked_up_alongside_location(monkeypatch, lambda_context):
+        import apigw
+
+        holidays_started = threading.Event()
+
+        def mock_get_ip_location(ipaddr):
+            # Only answers once the holiday lookup is running alongside it
+            assert holidays_started.wait(timeout=5)
+            return apigw.location.IpApiResponse(
+                status="success",
+                country="Australia",
+                countryCode="AU",
+                region="NSW",
+                regionName="New South Wales",
+                timezone="Australia/Sydney",
+            )
+
+        def mock_get_public_holidays(kwargs):
+            holidays_started.set()
+            return {}
+
+        monkeypatch.setattr(apigw.location, "get_ip_location", mock_get_ip_location)
+        monkeypatch.setattr(apigw, "get_public_holidays", mock_get_public_holidays)
+        monkeypatch.setattr(
+            apigw, "timezone_countries", {"Australia/Sydney": "Australia"}
+        )
+
+        # The request that the frontend sends, with the browser's timezone
+        event = {
+            "path": "/dashboard",
+            "httpMethod": "PUT",
+            "requestContext": {
+                "identity": {"sourceIp": "1.2.3.4"},
+                "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+            },
+            "headers": {
+                "Accept": "application/json, text/plain, */*",
+                "Content-Type": "application/json",
+            },
+            "body": '{"timezone":"Australia/Sydney"}',
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+
     def returns_422_when_invalid_timezone(lambda_context):
         import apigw
 
@@ -402,3 +939,237 @@ def describe_put_dashboard():
         }
         response = apigw.handler(event, lambda_context)
         assert response["statusCode"] == 422
+
+
+def describe_get_dashboard():
+    def returns_404_when_no_base_row(lambda_context):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 404
+
+    def returns_etag_when_base_exists(lambda_context, setup_base_record):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert response["multiValueHeaders"]["ETag"] == ['"_base.0"']
+        assert response["multiValueHeaders"]["Cache-Control"] == ["no-cache"]
+
+    def returns_304_when_etag_matches(lambda_context, setup_base_record):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+            "headers": {"If-None-Match": '"_base.0"'},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 304
+        assert not response["body"]
+
+    def leaves_out_holidays_by_default(lambda_context, setup_base_record):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        response = apigw.handler(event, lambda_context)
+        body = json.loads(response["body"])
+        assert "holidays" not in body
+        assert body["timezone"] == "Australia/Sydney"
+
+    def projects_requested_fields(lambda_context, setup_base_record):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+            "queryStringParameters": {"fields": "holidays"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert set(json.loads(response["body"])) == {
+            "id",
+            "month",
+            "holidays",
+            "version",
+        }
+        assert response["multiValueHeaders"]["ETag"] != ['"_base.0"']
+
+    def returns_422_for_unknown_fields(lambda_context, setup_base_record):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+            "queryStringParameters": {"fields": "timezone,secret"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 422
+
+    def compresses_large_bodies(monkeypatch, lambda_context, setup_base_record):
+        import apigw
+
+        monkeypatch.setattr(apigw.projection, "COMPRESS_MIN_BYTES", 10)
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+            "headers": {"Accept-Encoding": "gzip, br"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["isBase64Encoded"]
+        assert response["multiValueHeaders"]["Content-Encoding"] == ["gzip"]
+
+
+def describe_get_offices():
+    def returns_404_when_no_base_row(lambda_context):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/offices",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        assert apigw.handler(event, lambda_context)["statusCode"] == 404
+
+    def learns_networks_of_office_checkins(lambda_context, setup_month_record):
+        import apigw
+
+        def checkin(ip, fingerprint):
+            return apigw.handler(
+                {
+                    "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+                    "httpMethod": "POST",
+                    "requestContext": {
+                        "identity": {"sourceIp": ip},
+                        "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+                    },
+                    "headers": {"X-Network-Fingerprint": fingerprint},
+                },
+                lambda_context,
+            )
+
+        checkin("5.6.7.8", "a" * 64)
+        checkin("1.2.3.4", "not a fingerprint")
+        apigw.checkin_cache.clear()
+        checkin("1.2.3.4", "b" * 64)
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/offices",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"])["office_networks"] == ["b" * 64]
+
+        event["headers"] = {"If-None-Match": response["multiValueHeaders"]["ETag"][0]}
+        assert apigw.handler(event, lambda_context)["statusCode"] == 304
+
+    def keeps_networks_of_concurrent_office_checkins(
+        lambda_context, setup_month_record
+    ):
+        import apigw
+        from models import BaseRecord
+
+        base_record = BaseRecord(
+            **apigw.repository.get_base("62FDC0E4-FB39-4820-A751-AA4D0080BB74")
+        )
+        # Both check-ins read the base row before either added its network
+        apigw.remember_office_network(base_record, "a" * 64)
+        apigw.remember_office_network(base_record, "b" * 64)
+
+        base_row = apigw.repository.get_base("62FDC0E4-FB39-4820-A751-AA4D0080BB74")
+        assert base_row["office_networks"] == ["a" * 64, "b" * 64]
+
+
+def describe_get_month():
+    def reads_archived_month(lambda_context, setup_month_record):
+        import apigw
+        import archive
+
+        archive.archive_user("62FDC0E4-FB39-4820-A751-AA4D0080BB74", "2024-06")
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"])["month"] == "2024-05"
+
+    def returns_short_cache_for_past_month(lambda_context, setup_month_record):
+        import apigw
+        import http_cache
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert response["multiValueHeaders"]["Cache-Control"] == [
+            f"public, max-age={http_cache.PAST_MONTH_MAX_AGE}"
+        ]
+
+    def returns_304_when_etag_matches(lambda_context, setup_month_record):
+        import apigw
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+            "headers": {"If-None-Match": 'W/"2024-05.0", "other"'},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 304
+
+    @mock_aws
+    def etag_changes_after_checkin(monkeypatch, lambda_context, setup_month_record):
+        import apigw
+
+        def mock_get_current_date(timezone):
+            return datetime.datetime(2024, 5, 6, tzinfo=ZoneInfo(timezone))
+
+        monkeypatch.setattr(apigw, "get_current_date", mock_get_current_date)
+
+        apigw.handler(
+            {
+                "path": "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74",
+                "httpMethod": "POST",
+                "requestContext": {
+                    "identity": {"sourceIp": "1.2.3.4"},
+                    "requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411",
+                },
+            },
+            lambda_context,
+        )
+
+        event = {
+            "path": "/dashboard/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024/05",
+            "httpMethod": "GET",
+            "requestContext": {"requestId": "BF5A9727-2B7F-4A5F-A033-549C44588411"},
+            "headers": {"If-None-Match": '"2024-05.0"'},
+        }
+        response = apigw.handler(event, lambda_context)
+        assert response["statusCode"] == 200
+        assert response["multiValueHeaders"]["ETag"] == ['"2024-05.1"']
@@ -0,0 +1,202 @@
+import datetime
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from tracker import generate_tracker_base_entry, generate_tracker_month_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+OTHER_GUID = "0B6E4E52-8E1B-4D0C-9B5E-4F35A2C6E0B1"
+
+
+@dataclass
+class LambdaContext:
+    remaining_millis: int = 15 * 60 * 1000
+    function_name: str = "archive"
+    memory_limit_in_mb: int = 128
+    invoked_function_arn: str = (
+        "arn:aws:lambda:ap-southeast-2:123456789012:function:archive"
+    )
+    aws_request_id: str = "FB48BB8B-FD74-40D2-83F8-5E289249C4C0".lower()
+
+    def get_remaining_time_in_millis(self) -> int:
+        return self.remaining_millis
+
+
+@pytest.fixture
+def rto_table():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="rto-table",
+            KeySchema=[
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "month", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "month", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table = boto3.resource("dynamodb").Table("rto-table")
+        table.put_item(Item=generate_tracker_base_entry(GUID, "UTC").dict())
+        for month in [11, 12]:
+            month_record = generate_tracker_month_entry(GUID, 2022, month)
+            month_record.days["1"] = "1.2.3.4"
+            month_record.days["15"] = "1.2.3.4"
+            month_record.leave = {"2": "Annual leave"}
+            month_record.version = 3
+            table.put_item(Item=month_record.dict())
+        table.put_item(Item=generate_tracker_month_entry(GUID, 2023, 1).dict())
+        yield table
+
+
+def describe_bitmap():
+    def round_trips_days():
+        import archive
+
+        assert archive.pack_days([1, 3, 31]) == 0b1000000000000000000000000000101
+        assert archive.unpack_days(archive.pack_days([1, 3, 31])) == [1, 3, 31]
+
+    def is_0_when_no_days():
+        import archive
+
+        assert archive.unpack_days(archive.pack_days([])) == []
+
+
+def describe_archive_cutoff():
+    def spans_year_boundary():
+        import archive
+
+        now = datetime.datetime(2024, 3, 1, tzinfo=datetime.timezone.utc)
+        assert archive.archive_cutoff(now) == "2023-03"
+
+
+def describe_archive_user():
+    def moves_old_months_into_summary(rto_table):
+        import archive
+        import storage
+
+        assert archive.archive_user(GUID, "2023-01") == 2
+
+        remaining = [
+            item["month"]
+            for item in rto_table.scan()["Items"]
+            if item["month"].startswith("20")
+        ]
+        assert remaining == ["2023-01"]
+
+        month_record = archive.get_archived_month(
+            storage.DynamoDBRepository(), GUID, "2022-12"
+        )
+        assert month_record.days["1"] == archive.ARCHIVED_DAY
+        assert month_record.days["2"] is None
+        assert len(month_record.days) == 31
+        assert month_record.leave == {"2": "Annual leave"}
+        assert month_record.version == 3
+
+    def merges_into_existing_summary(rto_table):
+        import archive
+
+        archive.archive_user(GUID, "2022-12")
+        archive.archive_user(GUID, "2023-01")
+
+        summary = rto_table.get_item(Key={"id": GUID, "month": "sum#2022"})["Item"]
+        assert sorted(summary["months"]) == ["2022-11", "2022-12"]
+        assert summary["version"] == 2
+
+    def exports_rows_to_s3(monkeypatch, rto_table):
+        import archive
+
+        boto3.client("s3").create_bucket(
+            Bucket="rto-archive",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        monkeypatch.setattr(archive, "ARCHIVE_BUCKET", "rto-archive")
+
+        archive.archive_user(GUID, "2023-01")
+
+        body = (
+            boto3.client("s3")
+            .get_object(
+                Bucket="rto-archive", Key=f"{GUID}/2022/2022-11_2022-12.ndjson"
+            )["Body"]
+            .read()
+        )
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        assert [row["days"]["15"] for row in rows] == ["1.2.3.4", "1.2.3.4"]
+
+    def gives_up_after_repeated_conflicts(monkeypatch, rto_table):
+        import archive
+
+        summarise_month = archive.summarise_month
+        attempts = []
+
+        def conflicting_summarise_month(month_record):
+            attempts.append(month_record.month)
+            rto_table.update_item(
+                Key={"id": GUID, "month": "sum#2022"},
+                UpdateExpression="ADD version :one",
+                ExpressionAttributeValues={":one": 1},
+            )
+            return summarise_month(month_record)
+
+        monkeypatch.setattr(archive, "summarise_month", conflicting_summarise_month)
+
+        with pytest.raises(ClientError) as error:
+            archive.archive_user(GUID, "2022-12")
+        assert (
+            error.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+        )
+        assert attempts == ["2022-11"] * archive.SAVE_ATTEMPTS
+
+
+def describe_handler():
+    @pytest.fixture
+    def two_users(rto_table):
+        rto_table.put_item(Item=generate_tracker_base_entry(OTHER_GUID, "UTC").dict())
+        month_record = generate_tracker_month_entry(OTHER_GUID, 2022, 11)
+        rto_table.put_item(Item=month_record.dict())
+        yield rto_table
+
+    def archives_every_user(two_users):
+        import archive
+
+        archive.handler({"cutoff": "2023-01"}, LambdaContext())
+
+        months = sorted(item["month"] for item in two_users.scan()["Items"])
+        assert months == ["2023-01", "_base", "_base", "sum#2022", "sum#2022"]
+
+    def hands_off_when_time_runs_low(monkeypatch, two_users):
+        import archive
+
+        hand_offs = []
+        monkeypatch.setattr(
+            archive,
+            "hand_off",
+            lambda context, cutoff, cursor: hand_offs.append((cutoff, cursor)),
+        )
+
+        archive.handler({"cutoff": "2023-01"}, LambdaContext(remaining_millis=0))
+
+        first = next(archive.get_users())
+        assert hand_offs == [("2023-01", {"id": first, "month": "_base"})]
+        assert two_users.get_item(Key={"id": first, "month": "sum#2022"}).get("Item")
+
+    def continues_after_cursor(two_users):
+        import archive
+
+        first, second = archive.get_users()
+
+        assert list(archive.get_users({"id": first, "month": "_base"})) == [second]
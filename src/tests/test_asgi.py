@@ -0,0 +1,207 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from moto import mock_aws
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from tracker import generate_tracker_base_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    with mock_aws():
+        import apigw
+        import asgi
+        import storage
+
+        repository = storage.MemoryRepository()
+        write_coalescer = asgi.create_coalescer(repository)
+        monkeypatch.setattr(apigw, "repository", repository)
+        monkeypatch.setattr(apigw, "write_coalescer", write_coalescer)
+        apigw.checkin_cache.clear()
+        apigw.rate_limiter.clear()
+
+        base_row = generate_tracker_base_entry(GUID, "Australia/Sydney")
+        base_row.office_ips = ["1.2.3.4"]
+        month_row = apigw.create_new_month_entry(base_row, base_row.timezone)
+        repository.batch_put([base_row.dict(), month_row.dict()])
+        yield repository
+        write_coalescer.close()
+
+
+def request(method, path, query="", headers=None, body=b""):
+    return asyncio.run(send_request(method, path, query, headers, body))
+
+
+async def send_request(method, path, query="", headers=None, body=b""):
+    import asgi
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        "client": ("1.2.3.4", 50000),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    headers = {}
+    for name, value in sent[0]["headers"]:
+        headers.setdefault(name.decode(), []).append(value.decode())
+    return sent[0]["status"], headers, sent[1]["body"]
+
+
+def describe_app():
+    def serves_dashboard(repository):
+        status, headers, body = request("GET", f"/dashboard/{GUID}")
+
+        assert status == 200
+        assert json.loads(body)["id"] == GUID
+        assert headers["etag"] == ['"_base.0"']
+
+    def passes_query_string(repository):
+        status, _, body = request("GET", f"/dashboard/{GUID}", "fields=holidays")
+
+        assert status == 200
+        assert "holidays" in json.loads(body)
+
+    def decodes_compressed_bodies(monkeypatch, repository):
+        import apigw
+
+        monkeypatch.setattr(apigw.projection, "COMPRESS_MIN_BYTES", 10)
+        status, headers, body = request(
+            "GET", f"/dashboard/{GUID}", headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert status == 200
+        assert headers["content-encoding"] == ["gzip"]
+        assert json.loads(gzip.decompress(body))["id"] == GUID
+
+    def resolves_requests_concurrently(monkeypatch, repository):
+        import apigw
+
+        released = threading.Event()
+        get_base = repository.get_base
+
+        def slow_get_base(guid, fields=None):
+            if guid == GUID:
+                assert released.wait(timeout=5)
+            return get_base(guid, fields)
+
+        monkeypatch.setattr(repository, "get_base", slow_get_base)
+
+        async def requests():
+            slow = asyncio.create_task(send_request("GET", f"/dashboard/{GUID}"))
+            # Resolved while the first request is still waiting for storage
+            fast = await send_request("GET", "/dashboard/unknown", "fields=secret")
+            released.set()
+            return fast, await slow
+
+        (fast_status, _, _), (slow_status, _, body) = asyncio.run(requests())
+
+        assert fast_status == 422
+        assert slow_status == 200
+        assert json.loads(body)["id"] == GUID
+        assert apigw.app.context == {}
+
+    def records_checkin_from_client_address(repository):
+        import apigw
+
+        status, _, _ = request("POST", f"/checkin/{GUID}")
+
+        assert status == 200
+        dt = apigw.get_current_date("Australia/Sydney")
+        month_row = repository.get_month(GUID, f"{dt.year}-{dt.month:02d}")
+        assert month_row["days"][str(dt.day)] == "1.2.3.4"
+
+    def records_concurrent_checkins_once(repository):
+        import apigw
+
+        async def checkins():
+            return await asyncio.gather(
+                *(
+                    send_request(
+                        "POST", f"/checkin/{GUID}", headers={"Idempotency-Key": key}
+                    )
+                    for key in ("first", "second", "third")
+                )
+            )
+
+        statuses = sorted(status for status, _, _ in asyncio.run(checkins()))
+
+        assert statuses == [200, 202, 202]
+        dt = apigw.get_current_date("Australia/Sydney")
+        month_row = repository.get_month(GUID, f"{dt.year}-{dt.month:02d}")
+        assert month_row["version"] == 1
+
+    def settles_checkins_once_resolved(monkeypatch, repository):
+        import apigw
+
+        resolving = []
+        settle_write = apigw.settle_write
+
+        def mock_settle_write(write):
+            resolving.append(apigw.deferred_writes.get() is not None)
+            return settle_write(write)
+
+        monkeypatch.setattr(apigw, "settle_write", mock_settle_write)
+        status, headers, _ = request("POST", f"/checkin/{GUID}")
+
+        assert status == 200
+        assert headers["x-office-recorded"] == ["true"]
+        assert resolving == [False, False]
+        assert apigw.checkin_cache.get(GUID) is not None
+
+    def does_not_remember_failed_checkins(monkeypatch, repository):
+        import apigw
+
+        def fail(*args):
+            raise RuntimeError("write failed")
+
+        monkeypatch.setattr(repository, "record_days", fail)
+        status, headers, body = request("POST", f"/checkin/{GUID}")
+
+        assert status == 500
+        assert headers["content-type"] == ["application/json"]
+        assert json.loads(body) == {"error": "Internal Server Error"}
+        assert apigw.checkin_cache.get(GUID) is None
+
+    def logs_requests_whose_flush_failed(monkeypatch, repository):
+        import asgi
+
+        def fail(*args):
+            raise RuntimeError("write failed")
+
+        logged = []
+        monkeypatch.setattr(repository, "record_days", fail)
+        monkeypatch.setattr(
+            asgi.log_config,
+            "log_request",
+            lambda logger, event, response, *args: logged.append(response),
+        )
+        request("POST", f"/checkin/{GUID}")
+
+        assert [response["statusCode"] for response in logged] == [500]
@@ -0,0 +1,154 @@
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import capacity
+import capacity_report
+import storage
+from tracker import generate_tracker_month_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+OTHER_GUID = "0D4E7A4B-5A38-4E3B-9B4A-2A0B7E1A1C55"
+
+
+@pytest.fixture
+def repository():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="rto-table",
+            KeySchema=[
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "month", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "month", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield storage.DynamoDBRepository()
+
+
+def log_line(route, path, rcu=0, wcu=0, writes=0, sample_rate=1):
+    record = {
+        "level": "INFO",
+        "message": "Handled request",
+        "route": route,
+        "path": path,
+        "status_code": 200,
+        "sample_rate": sample_rate,
+        "rcu": rcu,
+        "wcu": wcu,
+        "writes": writes,
+    }
+    return f"2024-05-06T01:02:03 stream {json.dumps(record)}\n"
+
+
+def describe_measure():
+    def it_adds_up_reads_and_writes(repository):
+        with capacity.measure() as consumed:
+            repository.batch_put(
+                generate_tracker_month_entry(GUID, 2024, month).dict()
+                for month in (1, 2, 3)
+            )
+            repository.get_month(GUID, "2024-01")
+            repository.query_months(GUID, "2024-")
+
+        assert consumed.rcu > 0
+        assert consumed.wcu > 0
+        assert consumed.writes == 3
+        assert consumed.calls == {"BatchWriteItem": 1, "GetItem": 1, "Query": 1}
+
+    def it_ignores_calls_outside_of_a_request(repository):
+        with capacity.measure() as consumed:
+            pass
+        repository.get_month(GUID, "2024-01")
+        assert consumed.calls == {}
+
+    def it_logs_the_consumption():
+        consumed = capacity.Consumption()
+        consumed.add("UpdateItem", 3.0, 1)
+        assert consumed.log_fields() == {
+            "rcu": 0,
+            "wcu": 3.0,
+            "writes": 1,
+            "dynamodb_calls": {"UpdateItem": 1},
+        }
+
+
+def describe_capacity_report():
+    def it_weights_sampled_requests():
+        lines = [
+            log_line(
+                "GET /dashboard/<guid>", f"/dashboard/{GUID}", rcu=1, sample_rate=0.5
+            ),
+            "START RequestId: abc\n",
+            '{"message": "Unrelated"}\n',
+        ]
+        routes = capacity_report.summarise(capacity_report.parse_records(lines))
+        assert routes["GET /dashboard/<guid>"].requests == 2
+        assert routes["GET /dashboard/<guid>"].rcu == 2
+
+    def it_projects_routes_from_the_checkins():
+        lines = [
+            log_line("POST /checkin/<guid>", f"/checkin/{GUID}", wcu=1, writes=1)
+        ] * 2
+        lines.append(log_line("GET /dashboard/<guid>", f"/dashboard/{GUID}", rcu=0.5))
+        routes = capacity_report.summarise(capacity_report.parse_records(lines))
+
+        projected = capacity_report.project(routes, users=100, checkins=2, days=30)
+        assert projected["POST /checkin/<guid>"] == 6000
+        assert projected["GET /dashboard/<guid>"] == 3000
+
+    def it_needs_checkins_to_project():
+        routes = capacity_report.summarise(
+            capacity_report.parse_records([log_line("GET /", "/", rcu=1)])
+        )
+        with pytest.raises(ValueError):
+            capacity_report.project(routes, users=100, checkins=1, days=30)
+
+    def it_flags_full_item_rewrites():
+        lines = [
+            log_line(
+                "POST /checkin/<guid>", f"/checkin/{GUID}", rcu=1, wcu=6, writes=2
+            ),
+            log_line("GET /dashboard/<guid>", f"/dashboard/{GUID}", rcu=0.5),
+            log_line("GET /dashboard/<guid>", f"/dashboard/{OTHER_GUID}", rcu=0.5),
+            log_line(
+                "GET /stats/<guid>/<year>/<month>",
+                f"/stats/{OTHER_GUID}/2024/5",
+                rcu=0.5,
+            ),
+        ]
+        routes = capacity_report.summarise(capacity_report.parse_records(lines))
+        reasons = capacity_report.flag(
+            routes["POST /checkin/<guid>"],
+            routes,
+            capacity_report.READ_PRICE,
+            capacity_report.WRITE_PRICE,
+        )
+        assert len(reasons) == 2
+        assert "3.0 WCU" in reasons[0]
+        assert not capacity_report.flag(
+            routes["GET /dashboard/<guid>"],
+            routes,
+            capacity_report.READ_PRICE,
+            capacity_report.WRITE_PRICE,
+        )
+
+        out = io.StringIO()
+        args = capacity_report.parse_args(["--users", "10"])
+        capacity_report.report(routes, args, out)
+        assert "! each write consumes 3.0 WCU" in out.getvalue()
+        assert "GET /stats/<guid>/<year>/<month>" in out.getvalue()
+        assert GUID not in out.getvalue()
@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from checkin_guard import CheckinCache, RateLimiter
+
+
+def describe_checkin_cache():
+    def evicts_least_recently_used():
+        cache = CheckinCache(max_size=2)
+        cache.remember("a", "Australia/Sydney", "2024-05-06")
+        cache.remember("b", "Australia/Sydney", "2024-05-06")
+        cache.get("a")
+        cache.remember("c", "Australia/Sydney", "2024-05-06")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == ("Australia/Sydney", "2024-05-06", None)
+
+
+def describe_rate_limiter():
+    def allows_burst_up_to_capacity():
+        limiter = RateLimiter(capacity=3, refill_per_minute=1, clock=lambda: 0)
+
+        assert [limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+
+    def refills_over_time():
+        now = [0.0]
+        limiter = RateLimiter(capacity=1, refill_per_minute=1, clock=lambda: now[0])
+
+        assert limiter.allow("a")
+        assert not limiter.allow("a")
+        now[0] = 60.0
+        assert limiter.allow("a")
+
+    def buckets_are_per_key():
+        limiter = RateLimiter(capacity=1, refill_per_minute=1, clock=lambda: 0)
+
+        assert limiter.allow("a")
+        assert limiter.allow("b")
@@ -0,0 +1,139 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import storage
+from coalescer import WriteCoalescer
+from tracker import generate_tracker_month_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+OTHER_GUID = "0D4E7A4B-5A38-4E3B-9B4A-2A0B7E1A1C55"
+
+
+class RecordingRepository(storage.MemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def batch_put(self, items):
+        items = list(items)
+        self.calls.append(("batch_put", len(items)))
+        super().batch_put(items)
+
+    def record_days(self, guid, month, days, request_id):
+        self.calls.append(("record_days", guid, sorted(days)))
+        super().record_days(guid, month, days, request_id)
+
+
+@pytest.fixture
+def repository():
+    repository = RecordingRepository()
+    repository.batch_put(
+        [
+            generate_tracker_month_entry(GUID, 2024, 5).dict(),
+            generate_tracker_month_entry(OTHER_GUID, 2024, 5).dict(),
+        ]
+    )
+    repository.calls.clear()
+    return repository
+
+
+@pytest.fixture
+def coalescer(repository):
+    coalescer = WriteCoalescer(repository, window=60)
+    yield coalescer
+    coalescer.close()
+
+
+def describe_write_coalescer():
+    def batches_puts(repository, coalescer):
+        futures = [
+            coalescer.submit_put({"id": GUID, "month": f"checkin#{index}"})
+            for index in range(3)
+        ]
+        coalescer.flush()
+
+        assert all(future.result() is None for future in futures)
+        assert repository.calls == [("batch_put", 3)]
+
+    def merges_checkins_of_a_month_row(repository, coalescer):
+        futures = [
+            coalescer.submit_checkin(GUID, "2024-05", "6", "1.2.3.4", "first"),
+            coalescer.submit_checkin(GUID, "2024-05", "7", "1.2.3.4", "second"),
+            coalescer.submit_checkin(OTHER_GUID, "2024-05", "6", "1.2.3.4", None),
+        ]
+        coalescer.flush()
+
+        assert all(future.result() is None for future in futures)
+        assert sorted(repository.calls) == [
+            ("record_days", OTHER_GUID, ["6"]),
+            ("record_days", GUID, ["6", "7"]),
+        ]
+        month_row = repository.get_month(GUID, "2024-05")
+        assert month_row["last_request_id"] == "second"
+        assert month_row["version"] == 1
+
+    def fails_repeated_checkins_of_a_day(coalescer):
+        first = coalescer.submit_checkin(GUID, "2024-05", "6", "1.2.3.4", "first")
+        second = coalescer.submit_checkin(GUID, "2024-05", "6", "1.2.3.4", "second")
+        coalescer.flush()
+
+        assert first.result() is None
+        with pytest.raises(storage.ConditionFailedError) as exc:
+            second.result()
+        assert exc.value.item["last_request_id"] == "first"
+
+    def records_days_separately_when_one_was_recorded(repository, coalescer):
+        repository.record_checkin(GUID, "2024-05", "6", "1.2.3.4", "earlier")
+        recorded = coalescer.submit_checkin(GUID, "2024-05", "6", "1.2.3.4", "first")
+        new = coalescer.submit_checkin(GUID, "2024-05", "7", "1.2.3.4", "second")
+        coalescer.flush()
+
+        with pytest.raises(storage.ConditionFailedError) as exc:
+            recorded.result()
+        assert exc.value.item["last_request_id"] == "earlier"
+        assert new.result() is None
+        assert repository.get_month(GUID, "2024-05")["days"]["7"] == "1.2.3.4"
+
+    def fails_writes_of_a_failed_flush(monkeypatch, repository, coalescer):
+        def fail(items):
+            raise RuntimeError("throttled")
+
+        monkeypatch.setattr(repository, "batch_put", fail)
+        future = coalescer.submit_put({"id": GUID, "month": "checkin#1"})
+        coalescer.flush()
+
+        with pytest.raises(RuntimeError):
+            future.result()
+
+    def acknowledges_writes_once_flushed(repository):
+        coalescer = WriteCoalescer(repository, window=0.01)
+        results = []
+
+        def check_in(day):
+            coalescer.record_checkin(GUID, "2024-05", day, "1.2.3.4", day)
+            results.append(day)
+
+        threads = [threading.Thread(target=check_in, args=(day,)) for day in "12"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        coalescer.close()
+
+        assert sorted(results) == ["1", "2"]
+        days = repository.get_month(GUID, "2024-05")["days"]
+        assert days["1"] == days["2"] == "1.2.3.4"
+
+    def flushes_when_batch_is_full(repository):
+        coalescer = WriteCoalescer(repository, window=60, max_batch=2)
+
+        coalescer.batch_put(
+            [{"id": GUID, "month": "checkin#1"}, {"id": GUID, "month": "checkin#2"}]
+        )
+        coalescer.close()
+
+        assert repository.calls == [("batch_put", 2)]
@@ -0,0 +1,165 @@
+import datetime
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import boto3
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from tracker import generate_checkin_event, generate_tracker_month_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+
+
+def checkin_at(hour: int, minute: int, office: bool = True):
+    dt = datetime.datetime(
+        2024, 5, 6, hour, minute, tzinfo=ZoneInfo("Australia/Sydney")
+    )
+    return generate_checkin_event(GUID, dt, "1.2.3.4", office)
+
+
+@pytest.fixture
+def lambda_context():
+    @dataclass
+    class LambdaContext:
+        function_name: str = "compactor"
+        memory_limit_in_mb: int = 128
+        invoked_function_arn: str = (
+            "arn:aws:lambda:ap-southeast-2:123456789012:function:compactor"
+        )
+        aws_request_id: str = "FB48BB8B-FD74-40D2-83F8-5E289249C4C0".lower()
+
+    return LambdaContext()
+
+
+@pytest.fixture
+def rto_table():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="rto-table",
+            KeySchema=[
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "month", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "month", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table = boto3.resource("dynamodb").Table("rto-table")
+        table.put_item(Item=generate_tracker_month_entry(GUID, 2024, 5).dict())
+        yield table
+
+
+def describe_fold_events():
+    def records_first_and_last_seen():
+        import compactor
+
+        month_record = generate_tracker_month_entry(GUID, 2024, 5)
+        changed = compactor.fold_events(
+            month_record, [checkin_at(12, 30), checkin_at(9, 15), checkin_at(17, 0)]
+        )
+
+        assert changed
+        assert month_record.days["6"] == "1.2.3.4"
+        assert month_record.first_seen == {"6": "09:15:00"}
+        assert month_record.last_seen == {"6": "17:00:00"}
+
+    def ignores_events_away_from_office():
+        import compactor
+
+        month_record = generate_tracker_month_entry(GUID, 2024, 5)
+
+        assert not compactor.fold_events(month_record, [checkin_at(9, 0, False)])
+        assert month_record.days["6"] is None
+
+
+def describe_handler():
+    def compacts_streamed_events(rto_table, lambda_context):
+        import compactor
+
+        serializer = TypeSerializer()
+        records = []
+        for checkin in [checkin_at(9, 0), checkin_at(16, 45)]:
+            rto_table.put_item(Item=checkin.dict())
+            records.append(
+                {
+                    "eventName": "INSERT",
+                    "dynamodb": {
+                        "NewImage": {
+                            k: serializer.serialize(v)
+                            for k, v in checkin.dict().items()
+                        }
+                    },
+                }
+            )
+
+        compactor.handler({"Records": records}, lambda_context)
+
+        month_record = rto_table.get_item(Key={"id": GUID, "month": "2024-05"})["Item"]
+        assert month_record["days"]["6"] == "1.2.3.4"
+        assert month_record["first_seen"]["6"] == "09:00:00"
+        assert month_record["last_seen"]["6"] == "16:45:00"
+        assert month_record["version"] == 1
+
+    def rebuilds_from_stored_events(rto_table):
+        import compactor
+
+        rto_table.put_item(Item=checkin_at(8, 5).dict())
+
+        assert compactor.compact_month(GUID, "2024-05")
+        month_record = rto_table.get_item(Key={"id": GUID, "month": "2024-05"})["Item"]
+        assert month_record["first_seen"]["6"] == "08:05:00"
+
+    def only_writes_changed_attributes(rto_table):
+        import compactor
+
+        rto_table.put_item(Item=checkin_at(9, 0).dict())
+        assert compactor.compact_month(GUID, "2024-05")
+        # A write the compactor's read did not see, which it must not overwrite
+        rto_table.update_item(
+            Key={"id": GUID, "month": "2024-05"},
+            UpdateExpression="SET business_days = :days",
+            ExpressionAttributeValues={":days": 1},
+        )
+
+        assert compactor.compact_month(GUID, "2024-05", [checkin_at(17, 0)])
+        month_record = rto_table.get_item(Key={"id": GUID, "month": "2024-05"})["Item"]
+        assert month_record["last_seen"]["6"] == "17:00:00"
+        assert month_record["first_seen"]["6"] == "09:00:00"
+        assert month_record["business_days"] == 1
+        assert month_record["version"] == 2
+
+    def gives_up_after_repeated_conflicts(rto_table, monkeypatch):
+        import compactor
+
+        fold_events = compactor.fold_events
+        attempts = []
+
+        def conflicting_fold_events(month_record, events):
+            attempts.append(month_record.version)
+            rto_table.update_item(
+                Key={"id": GUID, "month": "2024-05"},
+                UpdateExpression="SET version = version + :one",
+                ExpressionAttributeValues={":one": 1},
+            )
+            return fold_events(month_record, events)
+
+        monkeypatch.setattr(compactor, "fold_events", conflicting_fold_events)
+
+        with pytest.raises(ClientError) as error:
+            compactor.compact_month(GUID, "2024-05", [checkin_at(9, 0)])
+        assert (
+            error.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+        )
+        assert attempts == [0, 1, 2]
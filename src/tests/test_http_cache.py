@@ -0,0 +1,34 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import http_cache
+
+
+def describe_is_not_modified():
+    def matches_strong_etag():
+        assert http_cache.is_not_modified('"2024-05.3"', '"2024-05.3"')
+
+    def matches_weak_etag_in_list():
+        assert http_cache.is_not_modified('"2024-05.3"', '"a", W/"2024-05.3"')
+
+    def does_not_match_old_version():
+        assert not http_cache.is_not_modified('"2024-05.3"', '"2024-05.2"')
+
+    def does_not_match_without_header():
+        assert not http_cache.is_not_modified('"2024-05.3"', None)
+
+
+def describe_is_past_month():
+    def previous_month_is_past():
+        now = datetime(2024, 6, 15, tzinfo=timezone.utc)
+        assert http_cache.is_past_month(2024, 5, now)
+
+    def current_month_is_not_past():
+        now = datetime(2024, 6, 15, tzinfo=timezone.utc)
+        assert not http_cache.is_past_month(2024, 6, now)
+
+    def month_not_past_while_behind_utc_timezones_catch_up():
+        now = datetime(2024, 6, 1, 6, tzinfo=timezone.utc)
+        assert not http_cache.is_past_month(2024, 5, now)
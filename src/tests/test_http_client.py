@@ -0,0 +1,156 @@
+import http.client
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import http_client
+
+
+class MockResponse:
+    def __init__(self, status, body, will_close=False):
+        self.status = status
+        self.body = body
+        self.will_close = will_close
+
+    def read(self):
+        return self.body
+
+
+class MockConnection:
+    """Records every connection made and replays the queued responses"""
+
+    created = []
+    responses = []
+
+    def __init__(self, host, timeout=None):
+        self.host = host
+        self.timeout = timeout
+        self.sock = None
+        self.closed = False
+        self.requests = 0
+        MockConnection.created.append(self)
+
+    def connect(self):
+        pass
+
+    def request(self, method, path, headers=None):
+        self.requests += 1
+
+    def getresponse(self):
+        response = MockConnection.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def mock_connection(monkeypatch):
+    MockConnection.created = []
+    MockConnection.responses = []
+    monkeypatch.setattr(http_client.http.client, "HTTPConnection", MockConnection)
+    monkeypatch.setattr(http_client.http.client, "HTTPSConnection", MockConnection)
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    yield MockConnection
+
+
+def describe_get_json():
+    def reuses_keepalive_connection(mock_connection):
+        mock_connection.responses = [
+            MockResponse(200, json.dumps({"a": 1}).encode()),
+            MockResponse(200, json.dumps({"a": 2}).encode()),
+        ]
+        client = http_client.HttpClient()
+
+        assert client.get_json("https://example.com/one") == {"a": 1}
+        assert client.get_json("https://example.com/two") == {"a": 2}
+        assert len(mock_connection.created) == 1
+        assert mock_connection.created[0].requests == 2
+
+    def does_not_reuse_closing_connection(mock_connection):
+        mock_connection.responses = [
+            MockResponse(200, b"{}", will_close=True),
+            MockResponse(200, b"{}"),
+        ]
+        client = http_client.HttpClient()
+
+        client.get_json("https://example.com/")
+        client.get_json("https://example.com/")
+        assert len(mock_connection.created) == 2
+
+    def retries_server_errors(mock_connection):
+        mock_connection.responses = [
+            MockResponse(503, b""),
+            MockResponse(200, b"[1]"),
+        ]
+        client = http_client.HttpClient(max_retries=1)
+
+        assert client.get_json("https://example.com/") == [1]
+
+    def does_not_retry_client_errors(mock_connection):
+        mock_connection.responses = [MockResponse(404, b"")]
+        client = http_client.HttpClient(max_retries=2)
+
+        with pytest.raises(http_client.HttpClientError) as excinfo:
+            client.get_json("https://example.com/")
+
+        assert excinfo.value.status == 404
+
+    def rejects_redirects(mock_connection):
+        mock_connection.responses = [MockResponse(301, b"<html></html>")]
+        client = http_client.HttpClient(max_retries=2)
+
+        with pytest.raises(http_client.HttpClientError) as excinfo:
+            client.get_json("http://example.com/")
+
+        assert excinfo.value.status == 301
+
+    def wraps_malformed_json(mock_connection):
+        mock_connection.responses = [MockResponse(200, b"<html></html>")]
+        client = http_client.HttpClient()
+
+        with pytest.raises(http_client.HttpClientError) as excinfo:
+            client.get_json("https://example.com/")
+
+        assert excinfo.value.status == 200
+
+    def reconnects_when_idle_connection_dropped(mock_connection):
+        mock_connection.responses = [
+            MockResponse(200, b"{}"),
+            http.client.RemoteDisconnected("closed"),
+            MockResponse(200, b"{}"),
+        ]
+        client = http_client.HttpClient(max_retries=0)
+
+        client.get_json("https://example.com/")
+        client.get_json("https://example.com/")
+        assert len(mock_connection.created) == 2
+
+
+def describe_circuit_breaker():
+    def opens_after_repeated_failures(mock_connection):
+        mock_connection.responses = [TimeoutError("timed out")] * 2
+        client = http_client.HttpClient(max_retries=0)
+        client._breakers["example.com"] = http_client.CircuitBreaker(
+            failure_threshold=2
+        )
+
+        for _ in range(2):
+            with pytest.raises(http_client.HttpClientError):
+                client.get_json("https://example.com/")
+
+        with pytest.raises(http_client.CircuitOpenError):
+            client.get_json("https://example.com/")
+
+        assert mock_connection.responses == []
+
+    def allows_trial_request_after_reset_timeout():
+        breaker = http_client.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+
+        assert breaker.allow()
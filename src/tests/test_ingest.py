@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import storage
+from coalescer import WriteCoalescer
+from tracker import generate_tracker_month_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+OTHER_GUID = "0D4E7A4B-5A38-4E3B-9B4A-2A0B7E1A1C55"
+
+
+@pytest.fixture
+def lambda_context():
+    @dataclass
+    class LambdaContext:
+        function_name: str = "ingest"
+        memory_limit_in_mb: int = 128
+        invoked_function_arn: str = (
+            "arn:aws:lambda:ap-southeast-2:123456789012:function:ingest"
+        )
+        aws_request_id: str = "FB48BB8B-FD74-40D2-83F8-5E289249C4C0".lower()
+
+    return LambdaContext()
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    import ingest
+
+    repository = storage.MemoryRepository()
+    monkeypatch.setattr(
+        ingest, "write_coalescer", WriteCoalescer(repository, background=False)
+    )
+    repository.batch_put(
+        [
+            generate_tracker_month_entry(GUID, 2024, 5).dict(),
+            generate_tracker_month_entry(OTHER_GUID, 2024, 5).dict(),
+        ]
+    )
+    return repository
+
+
+def sqs_event(*bodies):
+    return {
+        "Records": [
+            {
+                "messageId": f"message-{index}",
+                "body": body if isinstance(body, str) else json.dumps(body),
+                "eventSource": "aws:sqs",
+            }
+            for index, body in enumerate(bodies)
+        ]
+    }
+
+
+def checkin(guid, day, office=True, request_id=None):
+    return {
+        "id": guid,
+        "at": f"2024-05-{day:02d}T09:00:00+10:00",
+        "ip": "1.2.3.4" if office else "5.6.7.8",
+        "office": office,
+        "request_id": request_id,
+    }
+
+
+def describe_handler():
+    def records_office_days(lambda_context, repository):
+        import ingest
+
+        response = ingest.handler(
+            sqs_event(
+                checkin(GUID, 6, request_id="first"),
+                checkin(GUID, 7, request_id="second"),
+                checkin(OTHER_GUID, 6, office=False),
+            ),
+            lambda_context,
+        )
+
+        assert response == {"batchItemFailures": []}
+        month_row = repository.get_month(GUID, "2024-05")
+        assert month_row["days"]["6"] == month_row["days"]["7"] == "1.2.3.4"
+        assert month_row["version"] == 1
+        assert repository.get_month(OTHER_GUID, "2024-05")["days"]["6"] is None
+        assert len(repository.query_months(OTHER_GUID, "evt#")) == 1
+
+    def ignores_days_already_recorded(lambda_context, repository):
+        import ingest
+
+        repository.record_checkin(GUID, "2024-05", "6", "1.2.3.4", "earlier")
+
+        response = ingest.handler(
+            sqs_event(checkin(GUID, 6), checkin(GUID, 6)), lambda_context
+        )
+
+        assert response == {"batchItemFailures": []}
+        assert repository.get_month(GUID, "2024-05")["last_request_id"] == "earlier"
+
+    def reports_failed_messages(monkeypatch, lambda_context, repository):
+        import ingest
+
+        def throttled(guid, month, days, request_id):
+            if guid == OTHER_GUID:
+                raise RuntimeError("throttled")
+            storage.MemoryRepository.record_days(
+                repository, guid, month, days, request_id
+            )
+
+        monkeypatch.setattr(repository, "record_days", throttled)
+
+        response = ingest.handler(
+            sqs_event(checkin(GUID, 6), checkin(OTHER_GUID, 6), "not json"),
+            lambda_context,
+        )
+
+        assert response == {
+            "batchItemFailures": [
+                {"itemIdentifier": "message-2"},
+                {"itemIdentifier": "message-1"},
+            ]
+        }
+        assert repository.get_month(GUID, "2024-05")["days"]["6"] == "1.2.3.4"
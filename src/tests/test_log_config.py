@@ -0,0 +1,107 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import log_config
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.records = []
+
+    def info(self, msg, **kwargs):
+        self.records.append((msg, kwargs))
+
+
+def make_event(method, path):
+    return {"httpMethod": method, "path": path}
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    monkeypatch.setattr(log_config, "DEFAULT_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(log_config, "SAMPLE_RATES", {"POST /checkin": 0.0})
+
+
+def describe_is_enabled():
+    @pytest.mark.parametrize("value", ["1", "true", "True", "yes", " on "])
+    def it_accepts_true_values(value):
+        assert log_config.is_enabled(value)
+
+    @pytest.mark.parametrize("value", [None, "", "0", "false", "no"])
+    def it_rejects_other_values(value):
+        assert not log_config.is_enabled(value)
+
+
+def describe_route_key():
+    def it_uses_the_first_path_segment():
+        event = make_event("POST", "/checkin/62FDC0E4-FB39-4820-A751-AA4D0080BB74")
+        assert log_config.route_key(event) == "POST /checkin"
+
+    def it_handles_the_root_path():
+        assert log_config.route_key(make_event("GET", "/")) == "GET /"
+
+    def it_uses_the_matched_rule():
+        event = make_event("GET", "/stats/62FDC0E4-FB39-4820-A751-AA4D0080BB74/2024")
+        rule = "/stats/<guid>/<year>"
+        assert log_config.route_key(event, rule) == "GET /stats/<guid>/<year>"
+
+
+def describe_sample_rate():
+    def it_prefers_the_rate_of_the_rule(monkeypatch):
+        monkeypatch.setattr(
+            log_config,
+            "SAMPLE_RATES",
+            {"GET /stats/<guid>/<year>": 0.5, "GET /stats": 0.1},
+        )
+        event = make_event("GET", "/stats/abc/2024")
+        assert log_config.sample_rate(event, 200, "/stats/<guid>/<year>") == 0.5
+        assert log_config.sample_rate(event, 200, "/stats/<guid>/<year>/<month>") == 0.1
+
+
+def describe_log_request():
+    def it_logs_sampled_requests(rates):
+        logger = RecordingLogger()
+        response = {"statusCode": 200}
+        log_config.log_request(
+            logger, make_event("GET", "/dashboard/abc"), response, time.perf_counter()
+        )
+        assert len(logger.records) == 1
+        msg, fields = logger.records[0]
+        assert fields["route"] == "GET /dashboard"
+        assert fields["status_code"] == 200
+        assert fields["duration_ms"] >= 0
+
+    def it_logs_the_matched_rule(rates):
+        logger = RecordingLogger()
+        log_config.log_request(
+            logger,
+            make_event("GET", "/dashboard/abc"),
+            {"statusCode": 200},
+            time.perf_counter(),
+            rule="/dashboard/<guid>",
+        )
+        assert logger.records[0][1]["route"] == "GET /dashboard/<guid>"
+
+    def it_skips_routes_that_are_not_sampled(rates):
+        logger = RecordingLogger()
+        log_config.log_request(
+            logger,
+            make_event("POST", "/checkin/abc"),
+            {"statusCode": 201},
+            time.perf_counter(),
+        )
+        assert logger.records == []
+
+    def it_always_logs_server_errors(rates):
+        logger = RecordingLogger()
+        log_config.log_request(
+            logger,
+            make_event("POST", "/checkin/abc"),
+            {"statusCode": 500},
+            time.perf_counter(),
+        )
+        assert len(logger.records) == 1
@@ -0,0 +1,112 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import policy
+from tracker import generate_tracker_base_entry, generate_tracker_month_entry
+
+
+def base(percentage=50, rounding="up"):
+    record = generate_tracker_base_entry("guid", "Australia/Sydney")
+    record.percentage = percentage
+    record.rounding = rounding
+    record.created_at = "2024-01-01"
+    return record
+
+
+def describe_round_days():
+    def rounds_up():
+        assert policy.round_days(10.1, "up") == 11
+
+    def rounds_down():
+        assert policy.round_days(10.9, "down") == 10
+
+    def rounds_nearest():
+        assert policy.round_days(10.5, "nearest") == 11
+        assert policy.round_days(10.4, "nearest") == 10
+
+
+def describe_evaluate_month():
+    def excludes_weekday_holidays_and_leave():
+        month = generate_tracker_month_entry("guid", 2024, 5)
+        month.holidays = {"2024-05-06": "May Day", "2024-05-04": "Weekend"}
+        month.leave = {"7": "Annual leave"}
+
+        stats = policy.evaluate_month(base(), month, date(2024, 6, 1))
+        assert stats.eligible_days == 21
+        assert stats.required_days == 11
+
+    def handles_month_without_eligible_days():
+        month = generate_tracker_month_entry("guid", 2024, 5)
+        month.leave = {str(day): None for day in range(1, 32)}
+
+        stats = policy.evaluate_month(base(), month, date(2024, 5, 1))
+        assert stats.attendance == 0.0
+        assert stats.eligible_days == 0
+
+    def projects_current_pace():
+        month = generate_tracker_month_entry("guid", 2024, 5)
+        for day in ("1", "2"):
+            month.days[day] = "1.2.3.4"
+
+        stats = policy.evaluate_month(base(), month, date(2024, 5, 3))
+        assert stats.remaining_workable_days == 21
+        assert stats.projected_attendance == 100.0
+        assert stats.on_track
+
+    def measures_attendance_to_date():
+        month = generate_tracker_month_entry("guid", 2024, 5)
+        for day in ("1", "2"):
+            month.days[day] = "1.2.3.4"
+
+        stats = policy.evaluate_month(base(), month, date(2024, 5, 3))
+        assert stats.eligible_days_to_date == 2
+        assert stats.attendance == 100.0
+
+        month.days["3"] = "1.2.3.4"
+        stats = policy.evaluate_month(base(), month, date(2024, 5, 3))
+        assert stats.eligible_days_to_date == 3
+
+    def only_counts_attended_eligible_days():
+        month = generate_tracker_month_entry("guid", 2024, 6)
+        # A weekend before three weekdays that were not attended
+        for day in ("1", "2"):
+            month.days[day] = "1.2.3.4"
+
+        stats = policy.evaluate_month(base(), month, date(2024, 6, 6))
+        assert stats.attended == 0
+        assert stats.eligible_days_to_date == 3
+        assert stats.attendance == 0.0
+        assert not stats.on_track
+
+    def ignores_attended_leave_days():
+        month = generate_tracker_month_entry("guid", 2024, 5)
+        month.days["1"] = "1.2.3.4"
+        month.leave = {"1": "Annual leave"}
+
+        stats = policy.evaluate_month(base(), month, date(2024, 5, 2))
+        assert stats.attended == 0
+        assert stats.eligible_days_to_date == 0
+        assert stats.attendance == 0.0
+
+    def excludes_days_before_sign_up():
+        record = base()
+        record.created_at = "2024-05-15"
+        month = generate_tracker_month_entry("guid", 2024, 5)
+
+        stats = policy.evaluate_month(record, month, date(2024, 5, 16))
+        assert stats.eligible_days == 13
+        assert stats.eligible_days_to_date == 1
+        assert stats.required_days == 7
+
+    def memoises_per_version():
+        month = generate_tracker_month_entry("memo", 2024, 5)
+        month.version = 1
+        first = policy.evaluate_month(base(), month, date(2024, 6, 1))
+
+        month.days["1"] = "1.2.3.4"
+        assert policy.evaluate_month(base(), month, date(2024, 6, 1)) is first
+
+        month.version = 2
+        assert policy.evaluate_month(base(), month, date(2024, 6, 1)).attended == 1
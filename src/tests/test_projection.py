@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models import BaseRecord
+from projection import (
+    InvalidFieldsError,
+    parse_fields,
+    project,
+    projection_expression,
+    representation,
+)
+
+DEFAULT = ["timezone", "percentage"]
+
+
+def describe_parse_fields():
+    def uses_default_with_key_fields():
+        assert parse_fields(BaseRecord, None, DEFAULT) == [
+            "id",
+            "month",
+            "timezone",
+            "percentage",
+            "version",
+        ]
+
+    def returns_every_field_for_wildcard():
+        assert parse_fields(BaseRecord, "*", DEFAULT) == list(BaseRecord.__fields__)
+
+    def rejects_unknown_fields():
+        with pytest.raises(InvalidFieldsError):
+            parse_fields(BaseRecord, "timezone,password", DEFAULT)
+
+
+def describe_projection_expression():
+    def uses_placeholders_for_reserved_words():
+        assert projection_expression(["id", "month"]) == {
+            "ProjectionExpression": "#f0, #f1",
+            "ExpressionAttributeNames": {"#f0": "id", "#f1": "month"},
+        }
+
+
+def describe_project():
+    def coerces_stored_values_and_fills_defaults():
+        from decimal import Decimal
+
+        projected = project(
+            BaseRecord,
+            {"id": "guid", "percentage": Decimal("60")},
+            ["id", "percentage", "version"],
+        )
+        assert projected == {"id": "guid", "percentage": 60, "version": 0}
+
+
+def describe_representation():
+    def is_none_for_default():
+        assert representation(parse_fields(BaseRecord, None, DEFAULT), DEFAULT) is None
+
+    def differs_between_projections():
+        holidays = representation(
+            parse_fields(BaseRecord, "holidays", DEFAULT), DEFAULT
+        )
+        everything = representation(parse_fields(BaseRecord, "*", DEFAULT), DEFAULT)
+        assert holidays and everything and holidays != everything
@@ -0,0 +1,172 @@
+import sys
+from calendar import monthrange
+from datetime import date
+from pathlib import Path
+
+from hypothesis import given
+from hypothesis import strategies as st
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models import BaseRecord, BaseRecordHolidays
+from policy import eligible_days, evaluate_month, round_days
+from tracker import generate_tracker_month_entry, get_month_holidays
+
+COUNTIES = ["AU-NSW", "AU-VIC", "AU-QLD"]
+
+years = st.integers(min_value=1900, max_value=2100)
+months = st.integers(min_value=1, max_value=12)
+roundings = st.sampled_from(["up", "down", "nearest"])
+
+
+@st.composite
+def month_dates(draw):
+    year, month = draw(years), draw(months)
+    day = draw(st.integers(min_value=1, max_value=monthrange(year, month)[1]))
+    return date(year, month, day)
+
+
+@st.composite
+def holidays(draw):
+    return draw(
+        st.dictionaries(
+            month_dates().map(date.isoformat),
+            st.builds(
+                BaseRecordHolidays,
+                name=st.text(min_size=1, max_size=10),
+                is_global=st.booleans(),
+                counties=st.one_of(
+                    st.none(), st.lists(st.sampled_from(COUNTIES), unique=True)
+                ),
+            ),
+            max_size=20,
+        )
+    )
+
+
+@st.composite
+def month_records(draw):
+    year, month = draw(years), draw(months)
+    month_record = generate_tracker_month_entry("guid", year, month)
+    days = list(month_record.days)
+    attended = draw(st.lists(st.sampled_from(days), unique=True))
+    for day in attended:
+        month_record.days[day] = "1.2.3.4"
+    for day in draw(st.lists(st.sampled_from(days), unique=True)):
+        month_record.holidays[date(year, month, int(day)).isoformat()] = "Holiday"
+    for day in draw(st.lists(st.sampled_from(days), unique=True)):
+        month_record.leave[day] = None
+    month_record.version = draw(st.integers(min_value=0, max_value=3))
+    return month_record
+
+
+def describe_generate_tracker_month_entry():
+    @given(years, months)
+    def has_every_day_of_month(year, month):
+        month_record = generate_tracker_month_entry("guid", year, month)
+
+        days_in_month = monthrange(year, month)[1]
+        assert month_record.month == f"{year:04d}-{month:02d}"
+        assert list(month_record.days) == [
+            str(day) for day in range(1, days_in_month + 1)
+        ]
+        assert all(ip is None for ip in month_record.days.values())
+
+    @given(years, months)
+    def counts_weekdays_as_business_days(year, month):
+        month_record = generate_tracker_month_entry("guid", year, month)
+
+        weekdays = [
+            day
+            for day in range(1, monthrange(year, month)[1] + 1)
+            if date(year, month, day).weekday() < 5
+        ]
+        assert month_record.business_days == len(weekdays)
+        assert 20 <= month_record.business_days <= 23
+
+
+def describe_get_month_holidays():
+    @given(holidays(), years, months, st.sampled_from(COUNTIES))
+    def keeps_only_the_month_and_county(all_holidays, year, month, county):
+        base_record = BaseRecord(
+            id="guid",
+            timezone="UTC",
+            created_at="1900-01-01",
+            county=county,
+            holidays=all_holidays,
+        )
+        month_key = f"{year:04d}-{month:02d}"
+
+        result = get_month_holidays(base_record, month_key)
+
+        expected = {
+            day: holiday.name
+            for day, holiday in all_holidays.items()
+            if day.startswith(f"{month_key}-")
+            and (holiday.is_global or county in (holiday.counties or []))
+        }
+        assert result == expected
+
+
+def describe_round_days():
+    @given(st.floats(min_value=0, max_value=31), roundings)
+    def rounds_to_a_neighbouring_whole_day(days, rounding):
+        rounded = round_days(days, rounding)
+
+        assert round_days(days, "down") <= rounded <= round_days(days, "up")
+        assert round_days(days, "up") - round_days(days, "down") <= 1
+
+
+def describe_evaluate_month():
+    @given(
+        month_records(),
+        month_dates(),
+        st.integers(min_value=0, max_value=100),
+        roundings,
+    )
+    def stays_within_bounds(month_record, today, percentage, rounding):
+        base_record = BaseRecord(
+            id="guid",
+            timezone="UTC",
+            created_at="1900-01-01",
+            percentage=percentage,
+            rounding=rounding,
+        )
+
+        stats = evaluate_month(base_record, month_record, today)
+
+        assert 0 <= stats.eligible_days <= month_record.business_days
+        assert 0 <= stats.required_days <= stats.eligible_days
+        assert 0 <= stats.remaining_days_needed <= stats.required_days
+        assert 0 <= stats.remaining_workable_days <= stats.eligible_days
+        assert 0 <= stats.projected_attendance <= 100
+        assert 0 <= stats.attendance <= 100
+        assert 0 <= stats.eligible_days_to_date <= stats.eligible_days
+        if stats.eligible_days == 0:
+            assert stats.on_track
+
+    @given(month_records(), month_dates())
+    def only_counts_attended_eligible_days(month_record, today):
+        base_record = BaseRecord(id="guid", timezone="UTC", created_at="1900-01-01")
+        # Unversioned rows are never memoised, as the drawn rows share their keys
+        month_record.version = 0
+
+        stats = evaluate_month(base_record, month_record, today)
+
+        eligible = eligible_days(month_record, date(1900, 1, 1))
+        assert stats.attended == sum(
+            month_record.days[str(day.day)] is not None for day in eligible
+        )
+        assert stats.attended <= stats.eligible_days_to_date
+
+    @given(month_records(), month_dates(), month_dates())
+    def excludes_days_before_sign_up(month_record, today, created):
+        base_record = BaseRecord(
+            id="guid", timezone="UTC", created_at=created.isoformat()
+        )
+        month_record.version = 0
+
+        stats = evaluate_month(base_record, month_record, today)
+
+        eligible = eligible_days(month_record, created)
+        assert all(day >= created for day in eligible)
+        assert stats.eligible_days == len(eligible)
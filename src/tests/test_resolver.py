@@ -0,0 +1,137 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from aws_lambda_powertools.event_handler import APIGatewayRestResolver, Response
+from aws_lambda_powertools.event_handler.api_gateway import BaseRouter
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from resolver import RequestScopedResolver
+
+
+def event(path):
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": "GET",
+        "headers": {},
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "pathParameters": None,
+        "stageVariables": None,
+        "requestContext": {
+            "path": path,
+            "httpMethod": "GET",
+            "identity": {"sourceIp": "127.0.0.1"},
+        },
+        "body": None,
+        "isBase64Encoded": False,
+    }
+
+
+@pytest.fixture
+def app():
+    app = RequestScopedResolver()
+
+    @app.get("/path")
+    def get_path():
+        return {"path": app.current_event.path}
+
+    @app.get("/items/<item>")
+    def get_item(item):
+        return {"item": item, "path": app.current_event.path}
+
+    def middleware(app, next_middleware):
+        return next_middleware(app)
+
+    app.use([middleware])
+    return app
+
+
+def describe_request_scoped_resolver():
+    def resolves_routes(app):
+        response = app.resolve(event("/items/1"), {})
+        assert response["statusCode"] == 200
+        assert response["body"] == '{"item":"1","path":"/items/1"}'
+
+    def relies_on_powertools_internals(app):
+        # These private parts of the Powertools resolver are used to build the
+        # middleware stacks up front, so an upgrade that changes them must fail here
+        routes = app._static_routes + app._dynamic_routes
+        assert len(routes) == 2
+        assert isinstance(app._router_middlewares, list)
+        assert all(route._middleware_stack_built is False for route in routes)
+
+        app._build_middleware_stacks()
+
+        assert all(route._middleware_stack_built is True for route in routes)
+        for route in routes:
+            route._build_middleware_stack(router_middlewares=app._router_middlewares)
+
+    def shadows_router_current_event(app):
+        # Powertools assigns the current event to the BaseRouter class, which
+        # the resolver's properties must keep hiding
+        first_resolved = threading.Event()
+
+        @app.get("/slow")
+        def get_slow():
+            first_resolved.wait(5)
+            assert BaseRouter.current_event.path == "/path"
+            return {"path": app.current_event.path}
+
+        with ThreadPoolExecutor(2) as executor:
+            slow = executor.submit(app.resolve, event("/slow"), {})
+            assert executor.submit(app.resolve, event("/path"), {}).result(5)
+            first_resolved.set()
+            response = slow.result(5)
+
+        assert response["statusCode"] == 200
+        assert response["body"] == '{"path":"/slow"}'
+
+    def converts_events_once(app, monkeypatch):
+        to_proxy_event = APIGatewayRestResolver._to_proxy_event
+        converted = []
+
+        def counted(self, raw_event):
+            converted.append(raw_event)
+            return to_proxy_event(self, raw_event)
+
+        monkeypatch.setattr(APIGatewayRestResolver, "_to_proxy_event", counted)
+        app.resolve(event("/path"), {})
+
+        assert len(converted) == 1
+
+    def clears_request_state(app):
+        app.resolve(event("/path"), {})
+
+        with pytest.raises(LookupError):
+            assert app.current_event is None
+
+    def keeps_routing_context_per_request(app):
+        @app.get("/context")
+        def get_context():
+            app.append_context(path=app.current_event.path)
+            return Response(200, "text/plain", app.context["path"])
+
+        response = app.resolve(event("/context"), {})
+
+        assert response["body"] == "/context"
+
+    def remembers_the_matched_rule(app):
+        app.resolve(event("/items/1"), {})
+        assert app.matched_rule == "/items/<item>"
+
+        app.resolve(event("/unknown"), {})
+        assert app.matched_rule is None
+
+    def remembers_the_rule_of_failed_requests(app):
+        @app.get("/fail")
+        def fail():
+            raise RuntimeError("failed")
+
+        with pytest.raises(RuntimeError):
+            app.resolve(event("/fail"), {})
+        assert app.matched_rule == "/fail"
@@ -0,0 +1,252 @@
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import storage
+from tracker import generate_tracker_base_entry, generate_tracker_month_entry
+
+GUID = "62FDC0E4-FB39-4820-A751-AA4D0080BB74"
+
+
+@pytest.fixture
+def aws():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="rto-table",
+            KeySchema=[
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "month", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "month", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield
+
+
+@pytest.fixture(params=["dynamodb", "memory", "sqlite"])
+def repository(request, tmp_path, aws):
+    if request.param == "sqlite":
+        repository = storage.SQLiteRepository(str(tmp_path / "rto.sqlite3"))
+    else:
+        repository = storage.create_repository(request.param)
+
+    repository.batch_put(
+        [
+            generate_tracker_base_entry(GUID, "UTC").dict(),
+            generate_tracker_month_entry(GUID, 2024, 4).dict(),
+            generate_tracker_month_entry(GUID, 2024, 5).dict(),
+        ]
+    )
+    yield repository
+
+
+def describe_repository():
+    def gets_rows(repository):
+        assert repository.get_base(GUID)["timezone"] == "UTC"
+        assert repository.get_month(GUID, "2024-05")["month"] == "2024-05"
+        assert repository.get_month(GUID, "2024-06") is None
+
+    def projects_fields(repository):
+        assert set(repository.get_base(GUID, ["id", "version"])) == {"id", "version"}
+
+    def batch_gets_existing_rows(repository):
+        rows = repository.batch_get(GUID, ["_base", "2024-05", "2024-06"])
+        assert sorted(rows) == ["2024-05", "_base"]
+
+    def queries_by_prefix(repository):
+        months = [item["month"] for item in repository.query_months(GUID, "2024-")]
+        assert months == ["2024-04", "2024-05"]
+
+    def only_puts_new_rows(repository):
+        month_row = generate_tracker_month_entry(GUID, 2024, 6).dict()
+        assert repository.put_new(month_row)
+        assert not repository.put_new(month_row)
+
+    def records_checkin_once(repository):
+        repository.record_checkin(GUID, "2024-05", "6", "1.2.3.4", "first")
+
+        with pytest.raises(storage.ConditionFailedError) as exc:
+            repository.record_checkin(GUID, "2024-05", "6", "1.2.3.4", "second")
+
+        assert exc.value.item["last_request_id"] == "first"
+        month_row = repository.get_month(GUID, "2024-05")
+        assert month_row["days"]["6"] == "1.2.3.4"
+        assert month_row["version"] == 1
+
+    def records_all_days_or_none(repository):
+        repository.record_checkin(GUID, "2024-05", "7", "1.2.3.4", "first")
+
+        with pytest.raises(storage.ConditionFailedError):
+            repository.record_days(
+                GUID, "2024-05", {"6": "1.2.3.4", "7": "1.2.3.4"}, "second"
+            )
+        repository.record_days(
+            GUID, "2024-05", {"8": "1.2.3.4", "9": "1.2.3.4"}, "third"
+        )
+
+        month_row = repository.get_month(GUID, "2024-05")
+        assert month_row["days"]["6"] is None
+        assert month_row["days"]["8"] == month_row["days"]["9"] == "1.2.3.4"
+        assert month_row["last_request_id"] == "third"
+        assert month_row["version"] == 2
+
+    def batch_puts_many_rows(repository):
+        repository.batch_put(
+            generate_tracker_month_entry(GUID, year, month).dict()
+            for year in (2021, 2022, 2023)
+            for month in range(1, 13)
+        )
+
+        assert len(repository.query_months(GUID, "202")) == 38
+
+    def sets_office_networks_of_existing_users(repository):
+        assert repository.set_office_networks(GUID, ["a" * 64])
+        assert not repository.set_office_networks("missing", ["a" * 64])
+
+        base_row = repository.get_base(GUID)
+        assert base_row["office_networks"] == ["a" * 64]
+        assert base_row["version"] == 1
+
+    def rejects_office_networks_of_another_version(repository):
+        repository.set_office_networks(GUID, ["a" * 64], version=0)
+
+        with pytest.raises(storage.ConditionFailedError) as exc_info:
+            repository.set_office_networks(GUID, ["b" * 64], version=0)
+        assert exc_info.value.item["office_networks"] == ["a" * 64]
+        assert not repository.set_office_networks("missing", ["a" * 64], version=0)
+
+        assert repository.set_office_networks(GUID, ["a" * 64, "b" * 64], version=1)
+        assert repository.get_base(GUID)["office_networks"] == ["a" * 64, "b" * 64]
+
+    def sets_leave_of_existing_months(repository):
+        assert repository.set_leave(GUID, "2024-05", {"2": "Annual leave"})
+        assert not repository.set_leave(GUID, "2024-06", {"2": "Annual leave"})
+        assert repository.get_month(GUID, "2024-05")["leave"] == {"2": "Annual leave"}
+
+
+def describe_dynamodb_repository():
+    def retries_unprocessed_items(monkeypatch, aws):
+        monkeypatch.setattr(storage, "BATCH_WRITE_BACKOFF", 0)
+        repository = storage.DynamoDBRepository()
+        batch_write_item = repository.write_dynamodb.batch_write_item
+        calls = []
+
+        def throttled(RequestItems):
+            calls.append(RequestItems)
+            if len(calls) == 1:
+                return {"UnprocessedItems": RequestItems}
+            return batch_write_item(RequestItems=RequestItems)
+
+        monkeypatch.setattr(repository.write_dynamodb, "batch_write_item", throttled)
+        repository.batch_put(
+            generate_tracker_month_entry(GUID, 2024, month).dict() for month in (1, 2)
+        )
+
+        assert len(calls) == 2
+        assert len(repository.query_months(GUID, "2024-")) == 2
+
+    def raises_when_items_stay_unprocessed(monkeypatch, aws):
+        monkeypatch.setattr(storage, "BATCH_WRITE_BACKOFF", 0)
+        repository = storage.DynamoDBRepository()
+        monkeypatch.setattr(
+            repository.write_dynamodb,
+            "batch_write_item",
+            lambda RequestItems: {"UnprocessedItems": RequestItems},
+        )
+
+        with pytest.raises(storage.UnprocessedItemsError):
+            repository.batch_put(
+                generate_tracker_month_entry(GUID, 2024, month).dict()
+                for month in (1, 2)
+            )
+
+    def reads_new_users_from_write_region(monkeypatch, aws):
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName="rto-table",
+            KeySchema=[
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "month", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "month", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        monkeypatch.setattr(storage, "write_region", "us-east-1")
+        repository = storage.DynamoDBRepository()
+
+        # Written to the write region and not replicated to the local table yet
+        repository.batch_put([generate_tracker_base_entry(GUID, "UTC").dict()])
+
+        assert repository.get_base(GUID, ["timezone"]) == {"timezone": "UTC"}
+        assert repository.get_month(GUID, "_base") is None
+        assert repository.get_base("unknown") is None
+        rows = repository.batch_get(GUID, ["_base", "2024-05"])
+        assert sorted(rows) == ["_base"]
+        assert repository.batch_get("unknown", ["_base"]) == {}
+
+    def retries_unprocessed_keys(monkeypatch, aws):
+        monkeypatch.setattr(storage, "BATCH_WRITE_BACKOFF", 0)
+        repository = storage.DynamoDBRepository()
+        repository.batch_put(
+            generate_tracker_month_entry(GUID, 2024, month).dict() for month in (1, 2)
+        )
+        batch_get_item = repository.dynamodb.batch_get_item
+        calls = []
+
+        def throttled(RequestItems):
+            calls.append(RequestItems)
+            if len(calls) == 1:
+                return {"Responses": {}, "UnprocessedKeys": RequestItems}
+            return batch_get_item(RequestItems=RequestItems)
+
+        monkeypatch.setattr(repository.dynamodb, "batch_get_item", throttled)
+        rows = repository.batch_get(GUID, ["2024-01", "2024-02"])
+
+        assert len(calls) == 2
+        assert sorted(rows) == ["2024-01", "2024-02"]
+
+    def raises_when_keys_stay_unprocessed(monkeypatch, aws):
+        monkeypatch.setattr(storage, "BATCH_WRITE_BACKOFF", 0)
+        repository = storage.DynamoDBRepository()
+        monkeypatch.setattr(
+            repository.dynamodb,
+            "batch_get_item",
+            lambda RequestItems: {"Responses": {}, "UnprocessedKeys": RequestItems},
+        )
+
+        with pytest.raises(storage.UnprocessedItemsError):
+            repository.batch_get(GUID, ["2024-01"])
+
+
+def describe_sqlite_repository():
+    def uses_write_ahead_logging(tmp_path):
+        repository = storage.SQLiteRepository(str(tmp_path / "rto.sqlite3"))
+        mode = repository.connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+
+def describe_create_tables():
+    def reads_and_writes_locally_by_default(aws):
+        _, read_table, write_table = storage.create_tables()
+        assert read_table is write_table
+
+    def pins_writes_to_write_region(monkeypatch, aws):
+        monkeypatch.setattr(storage, "write_region", "us-east-1")
+
+        _, read_table, write_table = storage.create_tables()
+        assert read_table.meta.client.meta.region_name == "ap-southeast-2"
+        assert write_table.meta.client.meta.region_name == "us-east-1"
+        assert write_table.name == read_table.name
@@ -0,0 +1,95 @@
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+import storage
+from models import BaseRecord, MonthRecord, YearSummary
+
+END = date(2024, 5, 31)
+
+
+@pytest.fixture
+def synthetic():
+    # The generator imports the archiver, which creates its client on import
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "ap-southeast-2"
+    import synthetic
+
+    return synthetic
+
+
+def attendance(users):
+    attended = eligible = 0
+    for rows in users:
+        for row in rows:
+            if row["month"][0].isdigit():
+                month_record = MonthRecord(**row)
+                attended += sum(ip is not None for ip in month_record.days.values())
+                eligible += month_record.business_days
+    return attended / eligible
+
+
+def describe_generate():
+    def it_is_deterministic(synthetic):
+        config = synthetic.DatasetConfig(users=5, years=1, end=END)
+        assert list(synthetic.generate(config)) == list(synthetic.generate(config))
+
+    def it_generates_valid_rows(synthetic):
+        config = synthetic.DatasetConfig(users=20, years=2, end=END)
+        for rows in synthetic.generate(config):
+            base_record = BaseRecord(**rows[-1])
+            assert base_record.created_at <= END.isoformat()
+            months = [MonthRecord(**row) for row in rows[:-1]]
+            assert months[-1].month == "2024-05"
+            for month_record in months:
+                assert not set(month_record.leave) & {
+                    day for day, ip in month_record.days.items() if ip
+                }
+
+    def it_follows_the_attendance_pattern(synthetic):
+        office = synthetic.DatasetConfig(
+            users=20, years=1, patterns={"office": 1}, end=END
+        )
+        remote = synthetic.DatasetConfig(
+            users=20, years=1, patterns={"remote": 1}, end=END
+        )
+        assert attendance(synthetic.generate(office)) > 0.5
+        assert attendance(synthetic.generate(remote)) < 0.1
+
+    def it_rolls_up_old_months(synthetic):
+        config = synthetic.DatasetConfig(
+            users=20, years=3, archive_after_months=12, end=END
+        )
+        for rows in synthetic.generate(config):
+            months = [row["month"] for row in rows]
+            assert all(month >= "2023-05" for month in months if month[0].isdigit())
+            for row in rows:
+                if row["month"].startswith("sum#"):
+                    assert YearSummary(**row).months
+
+
+def describe_holiday_calendar():
+    def it_has_regional_holidays(synthetic):
+        holidays = synthetic.holiday_calendar(0, 12, 0.5, "Australia", 2024)
+        assert len(holidays) == 12
+        assert any(not holiday.is_global for holiday in holidays.values())
+        assert holidays["2024-12-25"].is_global
+
+
+def describe_load():
+    def it_writes_every_row(synthetic):
+        repository = storage.MemoryRepository()
+        config = synthetic.DatasetConfig(users=30, years=1, end=END)
+        users = list(synthetic.generate(config))
+
+        written = synthetic.load(repository, users, workers=4, batch_size=10)
+
+        assert written == sum(len(rows) for rows in users)
+        guid = users[0][-1]["id"]
+        assert repository.get_base(guid) == users[0][-1]
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import timezones
+
+
+def describe_is_valid_timezone():
+    def accepts_known_timezone():
+        assert timezones.is_valid_timezone("Australia/Sydney")
+
+    def rejects_unknown_timezone():
+        assert not timezones.is_valid_timezone("Narnia/Cair Paravel")
+
+    def rejects_missing_timezone():
+        assert not timezones.is_valid_timezone(None)
+
+    def builds_zone_set_once():
+        assert timezones.available_timezones() is timezones.available_timezones()
+
+
+def describe_get_zone():
+    def memoises_zone():
+        assert timezones.get_zone("Australia/Sydney") is timezones.get_zone(
+            "Australia/Sydney"
+        )
+
+
+def describe_local_now():
+    def uses_memoised_zone():
+        assert timezones.local_now("UTC").tzinfo is timezones.get_zone("UTC")
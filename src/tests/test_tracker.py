@@ -1,8 +1,6 @@
 import datetime
-import json
 import sys
 import uuid
-from contextlib import contextmanager
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
@@ -42,40 +40,32 @@ def describe_generate_tracker_base_entry():
         assert base.created_at == "2024-05-01"
 
 
-class MockUrlOpenResponseClass:
-    data = None
-
-    def __init__(self, data):
-        self.data = data
-
-    def read(self):
-        return self.data
-
-
 def describe_get_public_holidays():
+    @pytest.fixture(autouse=True)
+    def country_codes(monkeypatch):
+        """Answers the country code lookup without calling Nager.Date"""
+        tracker.get_country_codes.cache_clear()
+        monkeypatch.setattr(tracker, "get_country_codes", lambda: {"Australia": "AU"})
+        yield
+
     def valid_result_australia(monkeypatch):
-        @contextmanager
-        def mock_urlopen(url):
-            yield MockUrlOpenResponseClass(
-                json.dumps(
-                    [
-                        {
-                            "date": "2024-01-01",
-                            "localName": "New Year's Day",
-                            "global": True,
-                            "counties": None,
-                        },
-                        {
-                            "date": "2024-12-25",
-                            "localName": "Christmas Day",
-                            "global": True,
-                            "counties": None,
-                        },
-                    ]
-                )
-            )
-
-        monkeypatch.setattr(tracker.urllib.request, "urlopen", mock_urlopen)
+        def mock_get_json(url):
+            return [
+                {
+                    "date": "2024-01-01",
+                    "localName": "New Year's Day",
+                    "global": True,
+                    "counties": None,
+                },
+                {
+                    "date": "2024-12-25",
+                    "localName": "Christmas Day",
+                    "global": True,
+                    "counties": None,
+                },
+            ]
+
+        monkeypatch.setattr(tracker.http_client, "get_json", mock_get_json)
 
         holidays = tracker.get_public_holidays("Australia", 2024)
         assert holidays == {
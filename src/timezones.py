@@ -0,0 +1,50 @@
+import zoneinfo
+from datetime import datetime
+from functools import cache
+
+
+@cache
+def available_timezones() -> frozenset[str]:
+    """Gets the timezones that can be used, built once per container
+
+    Returns:
+        frozenset[str]: The valid timezone keys
+    """
+    return frozenset(zoneinfo.available_timezones())
+
+
+def is_valid_timezone(timezone: str | None) -> bool:
+    """Checks whether the timezone is a known IANA timezone
+
+    Args:
+        timezone (str | None): The timezone
+
+    Returns:
+        bool: Whether the timezone is valid
+    """
+    return timezone is not None and timezone in available_timezones()
+
+
+@cache
+def get_zone(timezone: str) -> zoneinfo.ZoneInfo:
+    """Gets the memoised ZoneInfo for the timezone
+
+    Args:
+        timezone (str): The timezone
+
+    Returns:
+        zoneinfo.ZoneInfo: The timezone information
+    """
+    return zoneinfo.ZoneInfo(timezone)
+
+
+def local_now(timezone: str) -> datetime:
+    """Gets the current time in the specified timezone
+
+    Args:
+        timezone (str): The timezone
+
+    Returns:
+        datetime: The current time
+    """
+    return datetime.now(get_zone(timezone))
@@ -1,20 +1,30 @@
-import json
-import urllib.request
-import zoneinfo
+import os
 from calendar import monthrange
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import cache
 from typing import Any
 
-from models import BaseRecord, MonthRecord
+import http_client
+import timezones
+from models import BaseRecord, CheckinEvent, MonthRecord
+
+CHECKIN_EVENT_TTL_DAYS = int(os.environ.get("CHECKIN_EVENT_TTL_DAYS", 90))
+CHECKIN_EVENT_PREFIX = "evt#"
+
 
 # Country and holidays functionality provided by the Nager.Date project
 # https://github.com/nager/Nager.Date
-available_countries = json.loads(
-    urllib.request.urlopen("https://date.nager.at/api/v3/AvailableCountries").read()
-)
-country_codes: dict[str, str] = {
-    country["name"]: country["countryCode"] for country in available_countries
-}
+@cache
+def get_country_codes() -> dict[str, str]:
+    """Gets the country codes supported by Nager.Date, fetched once per container
+
+    Returns:
+        dict[str, str]: The country codes keyed by the country name
+    """
+    available_countries = http_client.get_json(
+        "https://date.nager.at/api/v3/AvailableCountries"
+    )
+    return {country["name"]: country["countryCode"] for country in available_countries}
 
 
 def get_public_holidays(country: str, year: int) -> dict[str, dict[str, Any]]:
@@ -27,12 +37,12 @@ def get_public_holidays(country: str, year: int) -> dict[str, dict[str, Any]]:
     Returns:
         dict[str, str]: The public holidays
     """
+    country_codes = get_country_codes()
     if country not in country_codes:
         raise ValueError(f"Invalid country: {country}")
 
     url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/{country_codes[country]}"
-    with urllib.request.urlopen(url) as response:
-        data = json.loads(response.read())
+    data = http_client.get_json(url)
 
     holidays: dict[str, dict[str, Any]] = {
         holiday["date"]: {
@@ -54,7 +64,7 @@ def get_current_date(timezone: str) -> datetime:
     Returns:
         int: The current date
     """
-    return datetime.now(zoneinfo.ZoneInfo(timezone))
+    return timezones.local_now(timezone)
 
 
 def generate_tracker_base_entry(guid: str, timezone: str) -> BaseRecord:
@@ -91,3 +101,48 @@ def generate_tracker_month_entry(guid: str, year: int, month: int) -> MonthRecor
             data.business_days += 1
 
     return data
+
+
+def get_month_holidays(base_record: BaseRecord, month: str) -> dict[str, str]:
+    """Gets the user's public holidays that fall within the month
+
+    Args:
+        base_record (BaseRecord): The user's base row holding the year's holidays
+        month (str): The month in the YYYY-MM format
+
+    Returns:
+        dict[str, str]: The holiday names keyed by ISO date
+    """
+    holidays = {}
+    for day, holiday in base_record.holidays.items():
+        if not day.startswith(f"{month}-"):
+            continue
+        if not holiday.is_global and base_record.county not in (holiday.counties or []):
+            continue
+        holidays[day] = holiday.name
+
+    return holidays
+
+
+def generate_checkin_event(
+    guid: str, dt: datetime, ip: str, office: bool
+) -> CheckinEvent:
+    """Generates a check-in event row to append to the database
+
+    Args:
+        guid (str): The GUID of the user
+        dt (datetime): The local time of the check-in
+        ip (str): The IP address the check-in came from
+        office (bool): Whether the IP address is an office IP address
+
+    Returns:
+        CheckinEvent: The check-in event row
+    """
+    expires_at = dt + timedelta(days=CHECKIN_EVENT_TTL_DAYS)
+    return CheckinEvent(
+        id=guid,
+        month=f"{CHECKIN_EVENT_PREFIX}{dt.isoformat()}",
+        ip=ip,
+        office=office,
+        expires_at=int(expires_at.timestamp()),
+    )